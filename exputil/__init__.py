@@ -24,13 +24,23 @@ from .shell import (
     LocalShell,
     RemoteShell,
     OutputRedirect,
+    HostInfo,
+    HostInfoCache,
+    ShellExecWaiter,
+    broadcast_file,
+    ShellTracer,
+    enable_shell_tracing,
+    disable_shell_tracing,
     FailedCommandError,
     InvalidCommandError
 )
 
 from .input_output import (
     InstantWriter,
+    register_flush_at_exit,
+    unregister_flush_at_exit,
     PropertiesConfig,
+    CsvSchema,
     parse_int,
     parse_float,
     parse_positive_int,
@@ -38,5 +48,39 @@ from .input_output import (
     parse_float_between_0_and_1,
     parse_positive_int_less_than,
     read_csv_direct_in_columns,
+    read_csv_in_column_chunks,
+    read_csv_files_in_columns,
+    write_csv_columns,
     plain_replace_in_file_in_place
 )
+
+from .async_writer import (
+    AsyncWriter
+)
+
+from .csv_row_index import (
+    CsvRowIndex,
+    read_csv_rows_in_columns
+)
+
+from .csv_tail_reader import (
+    CsvTailReader
+)
+
+from .column_statistics import (
+    QuantileSketch,
+    ColumnStatistics,
+    compute_csv_column_statistics
+)
+
+from .step_runner import (
+    StepRunner
+)
+
+from .ssh_simulator import (
+    SimulatedRemoteShell
+)
+
+from .job_pool import (
+    LocalJobPool
+)
@@ -0,0 +1,105 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Stand-alone script (only depending on the standard library, such that it starts quickly)
+# which is run by the SimulatedRemoteShell in place of "ssh user@host command" (or of "scp").
+
+import os
+import sys
+import time
+import random
+import argparse
+import subprocess
+
+
+def _throttled_write(stream, data, bandwidth_byte_per_s):
+    """
+    Write the data to the stream at the given bandwidth.
+
+    :param stream:                  Binary output stream
+    :param data:                    Data bytes
+    :param bandwidth_byte_per_s:    Bandwidth (in byte/s)
+    """
+    chunk_size = max(1, int(bandwidth_byte_per_s / 100))
+    for i in range(0, len(data), chunk_size):
+        chunk = data[i:(i + chunk_size)]
+        time.sleep(len(chunk) / bandwidth_byte_per_s)
+        stream.write(chunk)
+        stream.flush()
+
+
+def main(args=None):
+    """
+    Run a single command as if on the simulated host (the counterpart of "ssh user@host command"),
+    or copy a file to the simulated host (the counterpart of "scp source user@host:target").
+
+    :param args:    Command line arguments (if None, sys.argv is used)
+
+    :return: Exit code
+    """
+    parser = argparse.ArgumentParser(description="Simulated SSH command execution")
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--host-dir", required=True)
+    parser.add_argument("--latency-s", type=float, default=0.0)
+    parser.add_argument("--bandwidth-byte-per-s", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--copy-source")
+    parser.add_argument("--copy-target")
+    parser.add_argument("command", nargs="?")
+    parsed = parser.parse_args(args)
+    if (parsed.command is None) == (parsed.copy_source is None or parsed.copy_target is None):
+        parser.error("either a command or both a copy source and target must be given")
+
+    # Connection setup
+    time.sleep(parsed.latency_s)
+    if random.random() < parsed.failure_rate:
+        sys.stderr.write("ssh: connect to host %s port 22: Connection refused\n" % parsed.host)
+        return 255
+
+    # Copy the file to the host
+    if parsed.command is None:
+        try:
+            with open(parsed.copy_source, "rb") as f_in, open(parsed.copy_target, "wb") as f_out:
+                for block in iter(lambda: f_in.read(1 << 20), b""):
+                    if parsed.bandwidth_byte_per_s <= 0:
+                        f_out.write(block)
+                    else:
+                        _throttled_write(f_out, block, parsed.bandwidth_byte_per_s)
+        except OSError as e:
+            sys.stderr.write("scp: %s\n" % str(e))
+            return 1
+        return 0
+
+    # Run the command in the host directory
+    env = dict(os.environ)
+    env["HOME"] = parsed.host_dir
+    if parsed.bandwidth_byte_per_s <= 0:
+        return subprocess.call(parsed.command, shell=True, cwd=parsed.host_dir, env=env)
+    proc = subprocess.run(parsed.command, shell=True, cwd=parsed.host_dir, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _throttled_write(sys.stdout.buffer, proc.stdout, parsed.bandwidth_byte_per_s)
+    _throttled_write(sys.stderr.buffer, proc.stderr, parsed.bandwidth_byte_per_s)
+    return proc.returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+import collections
+from .input_output import register_flush_at_exit, unregister_flush_at_exit
+
+
+BACKPRESSURE_MODES = ("block", "drop", "grow")
+
+
+class AsyncWriter:
+
+    def __init__(self, f, max_queue_size=10000, backpressure="block", flush_after_each_batch=True):
+        """
+        Writer which hands over writes to a dedicated background thread, such that a slow or
+        stalling disk does not end up on the critical path of the caller. The background thread
+        coalesces all writes queued up at that moment into a single write to the file handle.
+
+        :param f:                       File handle (or anything with write(), flush() and close(),
+                                        e.g. an InstantWriter with its own flush policy)
+        :param max_queue_size:          Maximum number of queued writes (ignored if backpressure is "grow")
+        :param backpressure:            What a write does if the queue is full: "block" (wait until there
+                                        is space), "drop" (discard the write) or "grow" (never full)
+        :param flush_after_each_batch:  True iff to flush the file handle after each coalesced write
+        """
+        if backpressure not in BACKPRESSURE_MODES:
+            raise ValueError("Unknown backpressure mode: " + str(backpressure))
+        if max_queue_size <= 0:
+            raise ValueError("Maximum queue size must be positive: " + str(max_queue_size))
+        self.file_handle = f
+        self.max_queue_size = max_queue_size
+        self.backpressure = backpressure
+        self.flush_after_each_batch = flush_after_each_batch
+
+        # Metrics
+        self.num_writes = 0
+        self.num_dropped_writes = 0
+        self.num_batches = 0
+        self.max_queue_depth = 0
+
+        # Appending and popping at either end of a deque is thread-safe. The lock serializes the writes
+        # of multiple producer threads (such that the metrics are exact), the condition is only used
+        # to wait for space (block) or for the queue to be written (checkpoint).
+        self._queue = collections.deque()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._progress = threading.Condition()
+        self._num_queued = 0
+        self._num_done = 0
+        self._closing = False
+        self._closed = False
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="AsyncWriter", daemon=True)
+        self._thread.start()
+        register_flush_at_exit(self)
+
+    @property
+    def queue_depth(self):
+        """
+        :return: Number of writes currently queued (not yet handed to the file handle)
+        """
+        return len(self._queue)
+
+    def write(self, s):
+        """
+        Queue a write.
+
+        :param s:   String (or bytes, matching the mode of the file handle) to write
+
+        :return: True iff the write was queued (False iff it was dropped because the queue was full)
+        """
+        if self._closing:
+            raise ValueError("Cannot write to a closed AsyncWriter")
+        self._raise_error()
+        while True:
+            with self._lock:
+                depth = len(self._queue)
+                if depth < self.max_queue_size or self.backpressure == "grow":
+                    self._queue.append(s)
+                    self._num_queued += 1
+                    self.num_writes += 1
+                    if depth >= self.max_queue_depth:
+                        self.max_queue_depth = depth + 1
+                    break
+                if self.backpressure == "drop":
+                    self.num_dropped_writes += 1
+                    return False
+
+            # Block until there is space (another producer can still take it first)
+            with self._progress:
+                while len(self._queue) >= self.max_queue_size and self._error is None:
+                    self._progress.wait()
+            self._raise_error()
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+        return True
+
+    def checkpoint(self):
+        """
+        Wait until all queued writes have been written, and flush the file handle.
+        """
+        if self._closed:
+            return
+        num_queued = self._num_queued
+        with self._progress:
+            while self._num_done < num_queued and self._error is None:
+                self._wakeup.set()
+                self._progress.wait()
+        self._raise_error()
+        self.file_handle.flush()
+
+    def flush(self):
+        self.checkpoint()
+
+    def close(self):
+        """
+        Write out everything still queued, stop the background thread and close the file handle.
+        """
+        if self._closed:
+            return
+        self._closing = True
+        self._wakeup.set()
+        self._thread.join()
+        self._closed = True
+        unregister_flush_at_exit(self)
+        try:
+            self._raise_error()
+            self.file_handle.flush()
+        finally:
+            self.file_handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            closing = self._closing
+
+            # Coalesce everything queued at this moment into a single write
+            pieces = []
+            pop = self._queue.popleft
+            for _ in range(len(self._queue)):
+                pieces.append(pop())
+            if pieces:
+                try:
+                    self.file_handle.write(pieces[0][:0].join(pieces))
+                    if self.flush_after_each_batch:
+                        self.file_handle.flush()
+                except BaseException as e:
+                    self._error = e
+                self.num_batches += 1
+            with self._progress:
+                self._num_done += len(pieces)
+                self._progress.notify_all()
+            if self._error is not None or (closing and not self._queue):
+                return
+            if closing:
+                self._wakeup.set()
@@ -0,0 +1,294 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+import random
+import bisect
+from .input_output import read_csv_in_column_chunks, _to_csv_schema, _csv_projection
+
+
+class QuantileSketch:
+
+    def __init__(self, k=200, seed=0):
+        """
+        Mergeable quantile sketch (KLL) of a stream of values, of which the size stays bounded
+        (about 3k values) regardless of the number of values added. The rank error of a
+        quantile is roughly 1.7 / k of the number of values.
+
+        Values are kept in levels: a value at level i stands in for 2^i values. When a level
+        reaches its capacity, it is sorted and every other value (at a random offset) is
+        promoted to the next level.
+
+        :param k:       Capacity of the highest level (accuracy parameter)
+        :param seed:    Seed of the random offsets (for reproducibility)
+        """
+        if k < 2:
+            raise ValueError("Sketch parameter k must be at least 2: " + str(k))
+        self.k = k
+        self.count = 0
+        self.levels = [[]]
+        self._random = random.Random(seed)
+
+    def _capacity(self, level):
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** (len(self.levels) - level - 1))))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) >= self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                values = sorted(self.levels[level])
+                leftover = [values.pop()] if len(values) % 2 == 1 else []
+                self.levels[level + 1].extend(values[self._random.randint(0, 1)::2])
+                self.levels[level] = leftover
+            level += 1
+
+    def add(self, value):
+        """
+        Add a value.
+
+        :param value:   Value
+        """
+        self.levels[0].append(value)
+        self.count += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def extend(self, values):
+        """
+        Add values.
+
+        :param values:  Iterable of values
+        """
+        num_before = len(self.levels[0])
+        self.levels[0].extend(values)
+        self.count += len(self.levels[0]) - num_before
+        self._compress()
+
+    def merge(self, other):
+        """
+        Merge another sketch into this one, after which this sketch summarizes the values of both.
+
+        :param other:   QuantileSketch
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level in range(len(other.levels)):
+            self.levels[level].extend(other.levels[level])
+        self.count += other.count
+        self._compress()
+
+    def quantile(self, q):
+        """
+        Approximate quantile.
+
+        :param q:   Quantile in [0.0, 1.0] (e.g., 0.5 for the median)
+
+        :return: Value (None if no values were added)
+        """
+        if q < 0.0 or q > 1.0:
+            raise ValueError("Quantile must be in [0.0, 1.0]: " + str(q))
+        if self.count == 0:
+            return None
+        weighted = sorted((value, 1 << level) for level in range(len(self.levels)) for value in self.levels[level])
+        target = q * self.count
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+
+class ColumnStatistics:
+
+    def __init__(self, numeric=True, sketch_k=200, histogram_bin_edges=None):
+        """
+        Statistics of the values of a column, which are updated in one pass and are mergeable
+        (such that the statistics of chunks, files or workers can be combined).
+
+        Missing values (None) are only counted. For a non-numeric column, only the count,
+        minimum and maximum are determined.
+
+        :param numeric:                 True iff the values are numbers
+        :param sketch_k:                Accuracy parameter of the quantile sketch (see QuantileSketch)
+        :param histogram_bin_edges:     Increasing bin edges of the histogram (None: no histogram), such that
+                                        bin i counts the values in [edge i, edge i + 1) and the last bin
+                                        includes its upper edge (values outside the edges are not counted)
+        """
+        if histogram_bin_edges is not None and (
+                len(histogram_bin_edges) < 2
+                or any(histogram_bin_edges[i] >= histogram_bin_edges[i + 1]
+                       for i in range(len(histogram_bin_edges) - 1))
+        ):
+            raise ValueError("Histogram bin edges must be at least two increasing values: " + str(histogram_bin_edges))
+        self.numeric = numeric
+        self.count = 0
+        self.num_missing = 0
+        self.min = None
+        self.max = None
+        self.mean = None
+        self._m2 = 0.0
+        self.sketch = QuantileSketch(sketch_k) if numeric else None
+        self.histogram_bin_edges = None if histogram_bin_edges is None else list(histogram_bin_edges)
+        self.histogram_counts = None if histogram_bin_edges is None else [0] * (len(histogram_bin_edges) - 1)
+
+    def update(self, values):
+        """
+        Update the statistics with values.
+
+        :param values:  Iterable of values (e.g., a column of a chunk)
+        """
+        values = list(values)
+        num_values = len(values)
+        values = [v for v in values if v is not None]
+        self.num_missing += num_values - len(values)
+        if len(values) == 0:
+            return
+        chunk_min = min(values)
+        chunk_max = max(values)
+        chunk = ColumnStatistics(self.numeric)
+        chunk.count = len(values)
+        chunk.min = chunk_min
+        chunk.max = chunk_max
+        if self.numeric:
+            chunk.mean = math.fsum(values) / len(values)
+            chunk._m2 = math.fsum((v - chunk.mean) ** 2 for v in values)
+            self.sketch.extend(values)
+            if self.histogram_counts is not None:
+                last_bin = len(self.histogram_counts) - 1
+                for v in values:
+                    i = bisect.bisect_right(self.histogram_bin_edges, v) - 1
+                    if 0 <= i <= last_bin:
+                        self.histogram_counts[i] += 1
+                    elif v == self.histogram_bin_edges[-1]:
+                        self.histogram_counts[last_bin] += 1
+        self._merge_moments(chunk)
+
+    def _merge_moments(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        if self.numeric:
+            if self.count == 0:
+                self.mean, self._m2 = other.mean, other._m2
+            else:
+                total = self.count + other.count
+                delta = other.mean - self.mean
+                self.mean += delta * other.count / total
+                self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.count += other.count
+
+    def merge(self, other):
+        """
+        Merge the statistics of another part of the column into these statistics.
+
+        :param other:   ColumnStatistics (with the same numeric setting and histogram bin edges)
+        """
+        if self.numeric != other.numeric or self.histogram_bin_edges != other.histogram_bin_edges:
+            raise ValueError("Column statistics can only be merged if they have the same numeric setting "
+                             "and histogram bin edges")
+        self.num_missing += other.num_missing
+        if self.numeric:
+            self.sketch.merge(other.sketch)
+            if self.histogram_counts is not None:
+                self.histogram_counts = [a + b for a, b in zip(self.histogram_counts, other.histogram_counts)]
+        self._merge_moments(other)
+
+    def variance(self, ddof=0):
+        """
+        :param ddof:    Delta degrees of freedom (0: population variance, 1: sample variance)
+
+        :return: Variance (None if there are not more than ddof values or the column is not numeric)
+        """
+        if not self.numeric or self.count <= ddof:
+            return None
+        return self._m2 / (self.count - ddof)
+
+    def std(self, ddof=0):
+        """
+        :param ddof:    Delta degrees of freedom (0: population, 1: sample)
+
+        :return: Standard deviation (None if the variance is None)
+        """
+        variance = self.variance(ddof)
+        return None if variance is None else math.sqrt(variance)
+
+    def quantile(self, q):
+        """
+        :param q:   Quantile in [0.0, 1.0]
+
+        :return: Approximate quantile, which is exact for 0.0 (minimum) and 1.0 (maximum)
+                 (None if there are no values or the column is not numeric)
+        """
+        if not self.numeric or self.count == 0:
+            return None
+        if q == 0.0:
+            return self.min
+        elif q == 1.0:
+            return self.max
+        return self.sketch.quantile(q)
+
+
+def compute_csv_column_statistics(csv_filename, line_values_format, row_filter_keep_function=None, columns=None,
+                                  header=False, row_filters=None, chunk_num_lines=100000, sketch_k=200,
+                                  histogram_bin_edges=None):
+    """
+    Compute the statistics of the columns of the CSV file in one pass, reading it chunk-by-chunk
+    such that memory use does not depend on the size of the file.
+
+    :param csv_filename:                CSV filename
+    :param line_values_format:          Line format (or a CsvSchema), see read_csv_direct_in_columns()
+    :param row_filter_keep_function     function(row) -> True/False (see read_csv_direct_in_columns())
+    :param columns:                     List of column indices or names (None: all columns)
+    :param header:                      True iff the first line is a header with the column names
+    :param row_filters:                 Declarative row filter (see read_csv_direct_in_columns())
+    :param chunk_num_lines:             Number of lines read at once
+    :param sketch_k:                    Accuracy parameter of the quantile sketches (see QuantileSketch)
+    :param histogram_bin_edges:         List of the histogram bin edges of each (selected) column,
+                                        with None for a column without histogram (None: no histograms)
+
+    :return: List of ColumnStatistics (one for each selected column)
+    """
+    schema = _to_csv_schema(line_values_format)
+    projected_schema, _ = _csv_projection(csv_filename, schema, columns, header)
+    if histogram_bin_edges is not None and len(histogram_bin_edges) != len(projected_schema.columns):
+        raise ValueError("There must be histogram bin edges (or None) for each column")
+    statistics = [
+        ColumnStatistics(
+            schema.is_numeric(projected_schema.columns[k]), sketch_k,
+            None if histogram_bin_edges is None else histogram_bin_edges[k]
+        )
+        for k in range(len(projected_schema.columns))
+    ]
+    for data_columns in read_csv_in_column_chunks(
+        csv_filename, schema, chunk_num_lines, row_filter_keep_function, columns=columns, header=header,
+        row_filters=row_filters
+    ):
+        for k in range(len(data_columns)):
+            statistics[k].update(data_columns[k])
+    return statistics
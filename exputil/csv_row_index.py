@@ -0,0 +1,210 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import json
+import mmap
+import array
+from .input_output import (
+    _to_csv_schema,
+    _csv_projection,
+    _csv_compression,
+    _read_lines_in_columns,
+    _import_numpy,
+    _parse_block_numpy,
+    _filter_columns_numpy,
+    _concatenate_numpy
+)
+
+
+class CsvRowIndex:
+
+    def __init__(self, csv_filename, every_num_rows, header, num_rows, offsets, key):
+        """
+        Index of the byte offsets of the rows of a CSV file, of which every K-th row is recorded.
+        Use CsvRowIndex.build() or CsvRowIndex.load_or_build() to create it.
+
+        :param csv_filename:    CSV filename
+        :param every_num_rows:  K: the offset of every K-th row is recorded
+        :param header:          True iff the first line is a header (which is not a row)
+        :param num_rows:        Number of rows
+        :param offsets:         array.array("q") of the byte offset of row 0, K, 2K, ...
+        :param key:             Identification of the version of the CSV file which was indexed
+        """
+        self.csv_filename = csv_filename
+        self.every_num_rows = every_num_rows
+        self.header = header
+        self.num_rows = num_rows
+        self.offsets = offsets
+        self.key = key
+
+    @staticmethod
+    def index_filename(csv_filename):
+        """
+        :param csv_filename:    CSV filename
+
+        :return: Sidecar index filename ([csv_filename].exputil_index)
+        """
+        return csv_filename + ".exputil_index"
+
+    @staticmethod
+    def _key(csv_filename, every_num_rows, header):
+        stat = os.stat(csv_filename)
+        return {
+            "size_byte": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "every_num_rows": every_num_rows,
+            "header": header
+        }
+
+    @staticmethod
+    def build(csv_filename, every_num_rows=1000, header=False):
+        """
+        Scan the CSV file once (memory-mapped) to record the byte offset of every K-th row,
+        and save the index into the sidecar file.
+
+        :param csv_filename:    CSV filename (uncompressed)
+        :param every_num_rows:  K: the offset of every K-th row is recorded
+        :param header:          True iff the first line is a header (which is not a row)
+
+        :return: CsvRowIndex
+        """
+        if every_num_rows < 1:
+            raise ValueError("Number of rows between recorded offsets must be at least 1: " + str(every_num_rows))
+        if _csv_compression(csv_filename) is not None:
+            raise ValueError("A row index can only be built for an uncompressed CSV file: " + csv_filename)
+        key = CsvRowIndex._key(csv_filename, every_num_rows, header)
+        offsets = array.array("q")
+        num_rows = 0
+        with open(csv_filename, "rb") as csv_file:
+            size_byte = os.fstat(csv_file.fileno()).st_size
+            if size_byte > 0:
+                with mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    position = 0
+                    if header:
+                        newline = data.find(b"\n")
+                        position = size_byte if newline == -1 else newline + 1
+                    while position < size_byte:
+                        if num_rows % every_num_rows == 0:
+                            offsets.append(position)
+                        newline = data.find(b"\n", position)
+                        position = size_byte if newline == -1 else newline + 1
+                        num_rows += 1
+        index = CsvRowIndex(csv_filename, every_num_rows, header, num_rows, offsets, key)
+        index.save()
+        return index
+
+    def save(self):
+        """
+        Save the index into the sidecar file (a JSON metadata line followed by the offsets as 64-bit integers).
+        """
+        index_filename = CsvRowIndex.index_filename(self.csv_filename)
+        with open(index_filename + ".temp", "wb+") as f_out:
+            f_out.write((json.dumps({"key": self.key, "num_rows": self.num_rows}) + "\n").encode("utf-8"))
+            f_out.write(self.offsets.tobytes())
+        os.replace(index_filename + ".temp", index_filename)
+
+    @staticmethod
+    def load_or_build(csv_filename, every_num_rows=1000, header=False):
+        """
+        Load the index from the sidecar file, or (re)build it if it does not exist or is stale
+        (i.e., the CSV file changed or it was built with different parameters).
+
+        :param csv_filename:    CSV filename (uncompressed)
+        :param every_num_rows:  K: the offset of every K-th row is recorded
+        :param header:          True iff the first line is a header (which is not a row)
+
+        :return: CsvRowIndex
+        """
+        key = CsvRowIndex._key(csv_filename, every_num_rows, header)
+        try:
+            with open(CsvRowIndex.index_filename(csv_filename), "rb") as f_in:
+                meta = json.loads(f_in.readline().decode("utf-8"))
+                if meta["key"] == key:
+                    offsets = array.array("q")
+                    offsets.frombytes(f_in.read())
+                    return CsvRowIndex(csv_filename, every_num_rows, header, meta["num_rows"], offsets, key)
+        except (OSError, ValueError, KeyError):
+            pass
+        return CsvRowIndex.build(csv_filename, every_num_rows, header)
+
+    def read_lines(self, start_row, end_row):
+        """
+        Read the lines of a range of rows: it seeks to the closest recorded offset, such that
+        at most K - 1 lines are skipped before the range.
+
+        :param start_row:   First row (inclusive)
+        :param end_row:     Last row (exclusive), which is capped at the number of rows
+
+        :return: Lines (bytes, ending with a newline except possibly the last line of the file)
+        """
+        if start_row < 0 or end_row < start_row:
+            raise ValueError("Invalid row range: [%d, %d)" % (start_row, end_row))
+        end_row = min(end_row, self.num_rows)
+        if start_row >= end_row:
+            return b""
+        with open(self.csv_filename, "rb") as csv_file:
+            csv_file.seek(self.offsets[start_row // self.every_num_rows])
+            for _ in range(start_row % self.every_num_rows):
+                csv_file.readline()
+            return b"".join(csv_file.readline() for _ in range(end_row - start_row))
+
+
+def read_csv_rows_in_columns(csv_filename, line_values_format, start_row, end_row, row_filter_keep_function=None,
+                             engine="python", columns=None, header=False, row_filters=None, every_num_rows=1000):
+    """
+    Read in only a range of rows of the CSV file, using its row index sidecar file (which is built
+    automatically if it does not exist or is stale). Reading a range takes O(K + range) time instead of
+    parsing all the rows before it. As the index integer column equals the row number, this is also
+    how rows are looked up by their idx_int key.
+
+    :param csv_filename:                CSV filename (uncompressed)
+    :param line_values_format:          Line format (or a CsvSchema), see read_csv_direct_in_columns()
+    :param start_row:                   First row (inclusive)
+    :param end_row:                     Last row (exclusive), which is capped at the number of rows
+    :param row_filter_keep_function     function(row) -> True/False (see read_csv_direct_in_columns())
+    :param engine:                      "python", "numpy" or "compact" (see read_csv_direct_in_columns())
+    :param columns:                     List of column indices or names to return
+    :param header:                      True iff the first line is a header with the column names
+    :param row_filters:                 Declarative row filter (see read_csv_direct_in_columns())
+    :param every_num_rows:              K: the offset of every K-th row is recorded in the index
+
+    :return: Array of data column arrays (of the rows in the range)
+    """
+    schema, _ = _csv_projection(csv_filename, _to_csv_schema(line_values_format), columns, header, row_filters)
+    if engine == "compact":
+        schema = schema.compact()
+    elif engine != "python" and engine != "numpy":
+        raise ValueError("Engine must be one of: python, numpy, compact")
+    index = CsvRowIndex.load_or_build(csv_filename, every_num_rows, header)
+    block = index.read_lines(start_row, end_row)
+    if engine == "numpy":
+        numpy = _import_numpy()
+        if len(block) == 0:
+            return _concatenate_numpy(numpy, schema, [[] for _ in schema.columns])
+        return _filter_columns_numpy(
+            numpy, _parse_block_numpy(numpy, block, schema, start_row), row_filter_keep_function
+        )
+    lines = block.decode("utf-8").split("\n")
+    if block[-1:] == b"\n" or len(block) == 0:
+        lines.pop()
+    return _read_lines_in_columns(lines, schema, row_filter_keep_function, start_row)
@@ -0,0 +1,124 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+from .input_output import (
+    _to_csv_schema,
+    _csv_projection,
+    _csv_compression,
+    _parse_csv_block,
+    _count_block_lines,
+    _import_numpy,
+    _concatenate_numpy
+)
+
+
+class CsvTailReader:
+
+    def __init__(self, csv_filename, line_values_format, row_filter_keep_function=None, engine="python",
+                 columns=None, header=False, row_filters=None):
+        """
+        Incremental reader of a CSV file which is still being appended to (e.g., the output of a
+        running experiment). Each call to read_new() only parses the complete lines which were
+        appended since the previous call, such that polling cost is proportional to the new data.
+
+        :param csv_filename:                CSV filename (uncompressed)
+        :param line_values_format:          Line format (or a CsvSchema), see read_csv_direct_in_columns()
+        :param row_filter_keep_function     function(row) -> True/False (see read_csv_direct_in_columns())
+        :param engine:                      "python", "numpy" or "compact" (see read_csv_direct_in_columns())
+        :param columns:                     List of column indices or names to return
+        :param header:                      True iff the first line is a header with the column names
+        :param row_filters:                 Declarative row filter (see read_csv_direct_in_columns())
+        """
+        if engine != "python" and engine != "numpy" and engine != "compact":
+            raise ValueError("Engine must be one of: python, numpy, compact")
+        self.csv_filename = csv_filename
+        self.schema = _to_csv_schema(line_values_format)
+        self.row_filter_keep_function = row_filter_keep_function
+        self.engine = engine
+        self.columns = columns
+        self.header = header
+        self.row_filters = row_filters
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the reader such that the next call to read_new() reads the file from the start.
+        """
+        self.byte_offset = 0
+        self.line_idx = 0
+        self._projected_schema = None
+
+    def _empty_data_columns(self):
+        if self.engine == "numpy":
+            return _concatenate_numpy(
+                _import_numpy(), self._projected_schema, [[] for _ in self._projected_schema.columns]
+            )
+        return self._projected_schema.new_data_columns()
+
+    def read_new(self, final=False):
+        """
+        Read in the rows of the complete lines which were appended since the previous call.
+        A trailing partial line (without newline yet) is left for a later call, unless final is True.
+        If the file became smaller than what was already read (i.e., it was replaced or truncated),
+        the reader is reset and the file is read from the start.
+
+        :param final:   True iff the file is complete, such that a last line without newline is also read
+
+        :return: Array of data column arrays (of the new rows), or None if the file does not exist yet
+                 or its header line is not complete yet
+        """
+        if not os.path.exists(self.csv_filename):
+            return None
+        size_byte = os.path.getsize(self.csv_filename)
+        if size_byte < self.byte_offset:
+            self.reset()
+
+        # The header line must be complete before the schema can be determined
+        if self._projected_schema is None:
+            if size_byte > 0 and _csv_compression(self.csv_filename) is not None:
+                raise ValueError("Only uncompressed CSV files can be read incrementally: " + self.csv_filename)
+            if self.header:
+                with open(self.csv_filename, "rb") as csv_file:
+                    if not final and not csv_file.readline().endswith(b"\n"):
+                        return None
+            self._projected_schema, self.byte_offset = _csv_projection(
+                self.csv_filename, self.schema, self.columns, self.header, self.row_filters
+            )
+            if self.engine == "compact":
+                self._projected_schema = self._projected_schema.compact()
+
+        # Only the complete lines which were appended
+        with open(self.csv_filename, "rb") as csv_file:
+            csv_file.seek(self.byte_offset)
+            block = csv_file.read(size_byte - self.byte_offset)
+        if not final:
+            block = block[:block.rfind(b"\n") + 1]
+        if len(block) == 0:
+            return self._empty_data_columns()
+        data_columns = _parse_csv_block(
+            block, self.line_idx, self._projected_schema, self.row_filter_keep_function,
+            "numpy" if self.engine == "numpy" else "python"
+        )
+        self.byte_offset += len(block)
+        self.line_idx += _count_block_lines(block)
+        return data_columns
@@ -21,16 +21,229 @@
 # SOFTWARE.
 
 import os
+import io
+import re
+import glob
+import sys
+import time
+import array
+import atexit
+import bz2
+import copy
+import gzip
+import json
+import lzma
+import heapq
+import queue
+import threading
+import operator
+import datetime
+import hashlib
+import weakref
+import itertools
+import collections
+import concurrent.futures
+
+
+# Writers which still need a final flush when the interpreter exits
+_instant_writers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_instant_writers_at_exit():
+    for writer in list(_instant_writers):
+        try:
+            writer.checkpoint()
+        except (OSError, ValueError):
+            pass
+
+
+def register_flush_at_exit(writer):
+    """
+    Register a writer of which checkpoint() is called when the interpreter exits (if it still exists then),
+    such that whatever it still buffers is written out.
+
+    :param writer:  Writer with a checkpoint() method (only weakly referenced)
+    """
+    _instant_writers.add(writer)
+
+
+def unregister_flush_at_exit(writer):
+    """
+    Unregister a writer (e.g., once it is closed) such that it is no longer flushed when the interpreter exits.
+
+    :param writer:  Writer
+    """
+    _instant_writers.discard(writer)
+
+
+# Pending deadline flushes of writers with a time-based flush policy: heap of
+# (deadline, sequence number, weak reference to writer, flush generation of writer when armed)
+_deadline_flushes = []
+_deadline_flush_sequence = itertools.count()
+_deadline_flush_condition = threading.Condition()
+_deadline_flusher = None
+
+
+def _run_deadline_flusher():
+    while True:
+        with _deadline_flush_condition:
+            while len(_deadline_flushes) == 0 or _deadline_flushes[0][0] > time.monotonic():
+                if len(_deadline_flushes) == 0:
+                    _deadline_flush_condition.wait()
+                else:
+                    _deadline_flush_condition.wait(_deadline_flushes[0][0] - time.monotonic())
+            _, _, writer_ref, flush_generation = heapq.heappop(_deadline_flushes)
+        writer = writer_ref()
+        if writer is not None:
+            try:
+                writer._deadline_flush(flush_generation)
+            except (OSError, ValueError):
+                pass
+
+
+def _arm_deadline_flush(writer, deadline, flush_generation):
+    """
+    Have the shared background flusher thread flush the writer at the deadline,
+    unless the writer was flushed in the meantime.
+
+    :param writer:              InstantWriter
+    :param deadline:            Deadline (time.monotonic())
+    :param flush_generation:    Flush generation of the writer at the moment of arming
+    """
+    global _deadline_flusher
+    with _deadline_flush_condition:
+        if _deadline_flusher is None:
+            _deadline_flusher = threading.Thread(target=_run_deadline_flusher, name="InstantWriterFlusher",
+                                                 daemon=True)
+            _deadline_flusher.start()
+        sequence = next(_deadline_flush_sequence)
+        heapq.heappush(_deadline_flushes, (deadline, sequence, weakref.ref(writer), flush_generation))
+        if _deadline_flushes[0][1] == sequence:
+            _deadline_flush_condition.notify()
 
 
 class InstantWriter:
 
-    def __init__(self, f):
+    def __init__(self, f, flush_every_num_bytes=None, flush_every_ms=None, flush_on_newline=False, fsync_every_ms=None):
+        """
+        Writer which makes whatever is written to the file handle visible on disk (nearly) instantly.
+
+        By default, the file handle is flushed after every write. If any flush policy is given,
+        the file handle is only flushed once one of them is met, or upon an explicit checkpoint(),
+        close() or exit of the interpreter.
+
+        :param f:                       File handle (opened for writing)
+        :param flush_every_num_bytes:   Flush once at least this many bytes (characters in text mode)
+                                        have been written since the last flush (None to disable)
+        :param flush_every_ms:          Flush what is written at the latest this many milliseconds after the
+                                        last flush (by a shared background thread if no further write comes)
+                                        (None to disable)
+        :param flush_on_newline:        True iff to flush upon each write which contains a newline
+        :param fsync_every_ms:          After a flush, additionally fsync the file if at least this many
+                                        milliseconds have passed since the last fsync (None to never fsync,
+                                        0 to fsync after every flush)
+        """
+        if flush_every_num_bytes is not None and flush_every_num_bytes <= 0:
+            raise ValueError("Number of bytes between flushes must be positive: " + str(flush_every_num_bytes))
+        if flush_every_ms is not None and flush_every_ms < 0:
+            raise ValueError("Milliseconds between flushes cannot be negative: " + str(flush_every_ms))
+        if fsync_every_ms is not None and fsync_every_ms < 0:
+            raise ValueError("Milliseconds between fsyncs cannot be negative: " + str(fsync_every_ms))
         self.file_handle = f
+        self.flush_every_num_bytes = flush_every_num_bytes
+        self.flush_every_ms = flush_every_ms
+        self.flush_on_newline = flush_on_newline
+        self.fsync_every_ms = fsync_every_ms
+        self._flush_always = flush_every_num_bytes is None and flush_every_ms is None and not flush_on_newline
+        self._num_unflushed_bytes = 0
+        self._flush_generation = 0
+        self._last_flush_time = time.monotonic()
+        self._last_fsync_time = self._last_flush_time
+
+        # Only with a time-based flush policy can a flush happen concurrently (from the background thread)
+        self._lock = None if flush_every_ms is None else threading.RLock()
+        register_flush_at_exit(self)
 
     def write(self, s):
+        if self._lock is None:
+            self._write(s)
+        else:
+            with self._lock:
+                self._write(s)
+
+    def _write(self, s):
         self.file_handle.write(s)
+        if self._flush_always:
+            self.flush()
+            return
+        self._num_unflushed_bytes += len(s)
+        if (
+                (self.flush_every_num_bytes is not None and self._num_unflushed_bytes >= self.flush_every_num_bytes)
+                or (self.flush_on_newline and ("\n" if isinstance(s, str) else b"\n") in s)
+                or (self.flush_every_ms is not None
+                    and (time.monotonic() - self._last_flush_time) * 1000.0 >= self.flush_every_ms)
+        ):
+            self.flush()
+        elif self.flush_every_ms is not None and self._num_unflushed_bytes == len(s):
+            # First unflushed write: make sure it is flushed by the deadline even if no further write comes
+            _arm_deadline_flush(self, self._last_flush_time + self.flush_every_ms / 1000.0, self._flush_generation)
+
+    def _deadline_flush(self, flush_generation):
+        with self._lock:
+            if flush_generation == self._flush_generation and not self.file_handle.closed:
+                self.flush()
+
+    def flush(self):
+        """
+        Flush the file handle, followed by an fsync if the fsync cadence requires it.
+        """
+        if self._lock is not None:
+            with self._lock:
+                self._flush()
+        else:
+            self._flush()
+
+    def _flush(self):
         self.file_handle.flush()
+        self._num_unflushed_bytes = 0
+        self._flush_generation += 1
+        self._last_flush_time = time.monotonic()
+        if self.fsync_every_ms is not None \
+                and (self._last_flush_time - self._last_fsync_time) * 1000.0 >= self.fsync_every_ms:
+            os.fsync(self.file_handle.fileno())
+            self._last_fsync_time = self._last_flush_time
+
+    def checkpoint(self, fsync=False):
+        """
+        Flush everything written so far, regardless of the flush policy.
+
+        :param fsync:   True iff to also fsync the file, regardless of the fsync cadence
+        """
+        if self.file_handle.closed:
+            return
+        self.flush()
+        if fsync:
+            os.fsync(self.file_handle.fileno())
+            self._last_fsync_time = self._last_flush_time
+
+    def close(self):
+        """
+        Flush (and fsync if an fsync cadence is set) everything written, and close the file handle.
+        """
+        self.checkpoint(fsync=self.fsync_every_ms is not None)
+        if self._lock is not None:
+            with self._lock:
+                self.file_handle.close()
+        else:
+            self.file_handle.close()
+        unregister_flush_at_exit(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 class PropertiesConfig:
@@ -142,76 +355,1519 @@ def parse_positive_int_less_than(str_value, less_than_int_value):
         return res
 
 
-def read_csv_direct_in_columns(csv_filename, line_values_format, row_filter_keep_function=None):
+def _parse_bool(str_value):
+    stripped = str_value.strip().lower()
+    if stripped == "true" or stripped == "1":
+        return True
+    elif stripped == "false" or stripped == "0":
+        return False
+    else:
+        raise ValueError("Not a boolean value (true, false, 1 or 0): " + str_value)
+
+
+def _parse_hex_int(str_value):
+    return int(str_value, 16)
+
+
+def _parse_timestamp(str_value):
+    return datetime.datetime.fromisoformat(str_value.strip())
+
+
+def _values_picker(columns):
+    """
+    Function which picks the values of the columns from a split line.
+
+    :param columns:     List of column indices
+
+    :return: Function(list) -> sequence of values
+    """
+    if len(columns) == 0:
+        return operator.itemgetter(slice(0, 0))
+    elif len(columns) == 1:
+        return operator.itemgetter(slice(columns[0], columns[0] + 1))
+    return operator.itemgetter(*columns)
+
+
+# Whitespace at the start or end of a value, of values joined by the null character
+_SURROUNDING_WHITESPACE = re.compile(r"(?:^|\x00)\s|\s(?:\x00|$)")
+
+
+def _format_bool(value):
+    if not isinstance(value, bool):
+        raise ValueError("Not a boolean value: " + str(value))
+    return "true" if value else "false"
+
+
+def _format_hex_int(value):
+    return "%x" % value
+
+
+def _format_timestamp(value):
+    return value.isoformat()
+
+
+def _parse_interned_string(str_value):
+    return sys.intern(str_value.strip())
+
+
+class _NullableConverter:
+
+    def __init__(self, converter):
+        self.converter = converter
+
+    def __call__(self, str_value):
+        if len(str_value.strip()) == 0:
+            return None
+        return self.converter(str_value)
+
+
+# Row filter comparison operators: name -> function(value, filter value) -> True/False
+# (applied to both Python values and NumPy arrays)
+_ROW_FILTER_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class _RowFilterComparison:
+
+    def __init__(self, column, operator_name, value):
+        self.column = column
+        self.operator_name = operator_name
+        self.value = value
+        self.position = None  # Position of the column among the filter columns
+
+    def columns(self):
+        return [self.column]
+
+    def bind(self, positions):
+        self.position = positions[self.column]
+
+    def is_ordering(self):
+        return self.operator_name in ("<", "<=", ">", ">=", "between")
+
+    def expression(self, constants):
+        constants.append(self.value)
+        c = "c%d" % (len(constants) - 1)
+        if self.operator_name == "between":
+            expression = "%s[0] <= v[%d] <= %s[1]" % (c, self.position, c)
+        else:
+            expression = "v[%d] %s %s" % (self.position, self.operator_name, c)
+
+        # A missing value (of a nullable column) does not match any ordering
+        if self.is_ordering():
+            return "(v[%d] is not None and %s)" % (self.position, expression)
+        return "(%s)" % expression
+
+    def mask(self, numpy, columns):
+        c = columns[self.position]
+        if self.operator_name == "in":
+            return numpy.isin(c, list(self.value))
+        elif self.operator_name == "not in":
+            return ~numpy.isin(c, list(self.value))
+        if c.dtype == object and self.is_ordering():
+            present = numpy.not_equal(c, None)
+            keep = numpy.zeros(len(c), dtype=bool)
+            keep[present] = self._compare(numpy, c[present])
+            return keep
+        return self._compare(numpy, c)
+
+    def _compare(self, numpy, c):
+        if self.operator_name == "between":
+            return numpy.asarray((c >= self.value[0]) & (c <= self.value[1]), dtype=bool)
+        return numpy.asarray(_ROW_FILTER_OPERATORS[self.operator_name](c, self.value), dtype=bool)
+
+
+class _RowFilterCombination:
+
+    def __init__(self, combination, filters):
+        self.combination = combination
+        self.filters = filters
+
+    def columns(self):
+        return [j for f in self.filters for j in f.columns()]
+
+    def bind(self, positions):
+        for f in self.filters:
+            f.bind(positions)
+
+    def expression(self, constants):
+        if self.combination == "not":
+            return "(not %s)" % self.filters[0].expression(constants)
+        return "(%s)" % (" %s " % self.combination).join(f.expression(constants) for f in self.filters)
+
+    def mask(self, numpy, columns):
+        if self.combination == "not":
+            return ~self.filters[0].mask(numpy, columns)
+        masks = [f.mask(numpy, columns) for f in self.filters]
+        return numpy.logical_and.reduce(masks) if self.combination == "and" else numpy.logical_or.reduce(masks)
+
+
+def _row_filter_predicate(row_filter):
+    """
+    Compile the row filter into a single Python predicate function, such that evaluating it for a row
+    does not require walking the filter tree.
+
+    :param row_filter:  Compiled row filter (of which the filter column positions are bound)
+
+    :return: Function(list of filter column values) -> True/False
+    """
+    constants = []
+    expression = row_filter.expression(constants)
+    return eval("lambda v: " + expression, {"c%d" % k: constants[k] for k in range(len(constants))})
+
+
+def _compile_row_filter(row_filter, column_index):
+    """
+    Compile the declarative row filter.
+
+    :param row_filter:      Row filter, which is one of:
+                            (column, operator, value) with operator one of: ==, !=, <, <=, >, >=, in, not in, between
+                            ("and", [row filters]), ("or", [row filters]), ("not", row filter),
+                            or a list of row filters which must all hold
+                            (a missing value of a nullable column does not match any ordering or between)
+    :param column_index:    Function(column) -> column index
+
+    :return: Compiled row filter
+    """
+    if isinstance(row_filter, list):
+        row_filter = ("and", row_filter)
+    if not isinstance(row_filter, tuple) or len(row_filter) not in (2, 3):
+        raise ValueError("Invalid row filter: " + str(row_filter))
+    if len(row_filter) == 2:
+        combination, filters = row_filter
+        if combination == "not":
+            return _RowFilterCombination("not", [_compile_row_filter(filters, column_index)])
+        if combination not in ("and", "or") or not isinstance(filters, (list, tuple)) or len(filters) == 0:
+            raise ValueError("Invalid row filter combination (must be and, or, not): " + str(row_filter))
+        return _RowFilterCombination(combination, [_compile_row_filter(f, column_index) for f in filters])
+    column, operator_name, value = row_filter
+    if operator_name in ("in", "not in"):
+        value = set(value)
+    elif operator_name == "between":
+        if len(value) != 2:
+            raise ValueError("Row filter between value must be (low, high): " + str(value))
+        value = tuple(value)
+    elif operator_name not in _ROW_FILTER_OPERATORS:
+        raise ValueError(
+            "Row filter operator must be one of: " + ", ".join(list(_ROW_FILTER_OPERATORS) + ["in", "not in", "between"])
+        )
+    return _RowFilterComparison(column_index(column), operator_name, value)
+
+
+class CsvSchema:
+
+    # Built-in value formats, for which the NumPy engine has a vectorized implementation
+    BUILT_IN_FORMATS = ["int", "idx_int", "pos_int", "float", "pos_float", "string"]
+
+    # Registered value formats: name -> (converter function(str) -> value, NumPy dtype or None for object,
+    #                                     formatter function(value) -> str)
+    _value_formats = {
+        "int": (int, "int64", str),
+        "idx_int": (int, "int64", str),
+        "pos_int": (parse_positive_int, "int64", str),
+        "float": (float, "float64", repr),
+        "pos_float": (parse_positive_float, "float64", repr),
+        "string": (str.strip, "str", str),
+        "bool": (_parse_bool, "bool", _format_bool),
+        "hex_int": (_parse_hex_int, "int64", _format_hex_int),
+        "float_0_1": (parse_float_between_0_and_1, "float64", repr),
+        "timestamp": (_parse_timestamp, None, _format_timestamp),
+    }
+
+    def __init__(self, line_values_format):
+        """
+        Schema of the values on each CSV line, which is compiled once into a converter function for each column.
+        It can be passed instead of the line values format string to the CSV reading functions.
+
+        Each value format is one of the registered formats (built-in: int, idx_int, pos_int, float, pos_float,
+        string, bool, hex_int, float_0_1, timestamp), optionally prefixed with "nullable_" such that
+        empty values become None.
+
+        :param line_values_format:  Line format (e.g., "idx_int,pos_int,float,string,nullable_bool")
+        """
+        self.line_values_format = line_values_format
+        self.formats = line_values_format.split(",")
+        self.compact_storage = False
+        self.converters = []
+        for f in self.formats:
+            base = f[len("nullable_"):] if f.startswith("nullable_") else f
+            if base not in CsvSchema._value_formats or base == "idx_int" and base != f:
+                raise ValueError(
+                    "Value format must be one of: %s (optionally prefixed with nullable_, "
+                    "separated by comma without whitespace)" % ", ".join(sorted(CsvSchema._value_formats))
+                )
+            converter = CsvSchema._value_formats[base][0]
+            self.converters.append(_NullableConverter(converter) if base != f else converter)
+        self._compile(list(range(len(self.formats))))
+
+    def _compile(self, columns, row_filter=None):
+        """
+        Compile the row conversion of the selected columns.
+
+        :param columns:     List of column indices which are converted (in order of the resulting row)
+        :param row_filter:  Compiled row filter (or None to keep all rows)
+        """
+        self.columns = columns
+        self.row_filter = row_filter
+        self.filter_columns = []
+        if row_filter is not None:
+            self.filter_columns = sorted(set(row_filter.columns()))
+            row_filter.bind({j: k for k, j in enumerate(self.filter_columns)})
+            self._row_predicate = _row_filter_predicate(row_filter)
+        self._filter_converters = [self.converters[j] for j in self.filter_columns]
+        self._pick_filter_values = _values_picker(self.filter_columns)
+        self.idx_columns = [k for k in range(len(columns)) if self.formats[columns[k]] == "idx_int"]
+
+        # Positive constraints are checked after conversion, such that the built-in conversion is called directly
+        self._row_converters = [
+            int if self.formats[j] == "pos_int" else float if self.formats[j] == "pos_float"
+            else _parse_interned_string if self.formats[j] == "string" and self.compact_storage
+            else self.converters[j]
+            for j in columns
+        ]
+        self._positive_columns = [
+            k for k in range(len(columns)) if self.formats[columns[k]] in ("pos_int", "pos_float")
+        ]
+
+        # Values of the selected columns are picked from the split line (all of them: no picking needed)
+        self._pick_values = None if columns == list(range(len(self.formats))) else _values_picker(columns)
+
+    @staticmethod
+    def register_format(name, converter, numpy_dtype=None, formatter=str):
+        """
+        Register a new value format.
+
+        :param name:            Format name (e.g., "percentage")
+        :param converter:       Function(str) -> value, which raises a ValueError if the value is invalid
+                                (must be picklable, i.e., a module-level function, for parallel reading)
+        :param numpy_dtype:     NumPy dtype name for the NumPy engine (e.g., "float64"), or None for object
+        :param formatter:       Function(value) -> str for writing (the inverse of the converter)
+        """
+        if name in CsvSchema.BUILT_IN_FORMATS:
+            raise ValueError("Cannot override built-in value format: " + name)
+        if len(name) == 0 or "," in name or name != name.strip() or name.startswith("nullable_"):
+            raise ValueError("Invalid value format name: " + name)
+        CsvSchema._value_formats[name] = (converter, numpy_dtype, formatter)
+
+    def numpy_dtype(self, j):
+        """
+        :param j:   Column index
+
+        :return: NumPy dtype name of the column (None for object)
+        """
+        if self.formats[j].startswith("nullable_"):
+            return None
+        return CsvSchema._value_formats[self.formats[j]][1]
+
+    def is_numeric(self, j):
+        """
+        :param j:   Column index
+
+        :return: True iff the values of the column are numbers (int64 or float64 NumPy dtype,
+                 possibly nullable)
+        """
+        base = self.formats[j][len("nullable_"):] if self.formats[j].startswith("nullable_") else self.formats[j]
+        return CsvSchema._value_formats[base][1] in ("int64", "float64")
+
+    def select(self, columns):
+        """
+        Schema of only the selected columns, in which the index integer constraint is no longer checked
+        (as the line index no longer corresponds to the column value after selection).
+
+        :param columns:     List of column indices
+
+        :return: CsvSchema
+        """
+        return CsvSchema(",".join("int" if self.formats[j] == "idx_int" else self.formats[j] for j in columns))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_row_predicate", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.row_filter is not None:
+            self._row_predicate = _row_filter_predicate(self.row_filter)
+
+    def compact(self):
+        """
+        Schema which stores the columns compactly: int64 and float64 columns (see numpy_dtype()) in
+        an array.array (typecode "q" respectively "d") instead of a list of Python objects, and the
+        values of string columns interned (such that repeated values are stored only once).
+
+        :return: CsvSchema
+        """
+        compacted = copy.copy(self)
+        compacted.compact_storage = True
+        compacted._compile(self.columns, self.row_filter)
+        return compacted
+
+    def new_data_columns(self):
+        """
+        :return: List of empty data columns (of the selected columns)
+        """
+        if not self.compact_storage:
+            return [[] for _ in self.columns]
+        return [
+            array.array("q") if self.numpy_dtype(j) == "int64" else array.array("d")
+            if self.numpy_dtype(j) == "float64" else []
+            for j in self.columns
+        ]
+
+    def project(self, columns):
+        """
+        Schema which only converts the selected columns: the values of the other columns are skipped
+        (not converted, and as such not checked to be well-formed), though the number of values
+        on each line is still checked against the full line format.
+
+        :param columns:     List of column indices
+
+        :return: CsvSchema
+        """
+        for j in columns:
+            if not isinstance(j, int) or j < 0 or j >= len(self.formats):
+                raise ValueError("Column index out of range: " + str(j))
+        projected = copy.copy(self)
+        projected._compile(list(columns), self.row_filter)
+        return projected
+
+    def filter_rows(self, row_filter, column_names=None):
+        """
+        Schema which only keeps the rows for which the declarative row filter holds.
+        The filter columns are converted first, and the other columns of a row are only
+        converted if it is kept (rows which are filtered out are only checked for their shape
+        and their filter column values).
+
+        :param row_filter:  Row filter (column indices refer to the full line format), which is one of:
+                            (column, operator, value) with operator one of: ==, !=, <, <=, >, >=,
+                            in (value is a collection), not in, between (value is (low, high), inclusive)
+                            ("and", [row filters]), ("or", [row filters]), ("not", row filter),
+                            or a list of row filters which must all hold
+                            (e.g., [(2, ">=", 0), ("or", [(3, "in", ["a", "b"]), ("not", (1, "between", (0, 9)))])])
+        :param column_names:    List of column names (if given, the filter columns can also be selected by name)
+
+        :return: CsvSchema
+        """
+        def column_index(j):
+            if isinstance(j, str):
+                if column_names is None or j not in column_names:
+                    raise ValueError("Row filter column name not in header: " + j)
+                return column_names.index(j)
+            if not isinstance(j, int) or j < 0 or j >= len(self.formats):
+                raise ValueError("Row filter column index out of range: " + str(j))
+            return j
+        filtered = copy.copy(self)
+        filtered._compile(self.columns, _compile_row_filter(row_filter, column_index))
+        return filtered
+
+    def format_values(self, j, values, first_line_idx=0):
+        """
+        Format the values of a column for writing, after checking that they are valid for its value format
+        (such that reading them back results in the same values).
+
+        :param j:                   Column index
+        :param values:              List of values
+        :param first_line_idx:      Line index of the first value (for the index integer constraint)
+
+        :return: List of value strings
+        """
+        value_format = self.formats[j]
+        nullable = value_format.startswith("nullable_")
+        base = value_format[len("nullable_"):] if nullable else value_format
+        present = [v for v in values if v is not None] if nullable else values
+        if len(present) != len(values) and not nullable:
+            raise ValueError("Value is None in column %d which is not nullable (%s)" % (j, value_format))
+        if len(present) > 0:
+            types = set(map(type, present))
+            if base in ("int", "idx_int", "pos_int", "hex_int") and not types <= {int}:
+                raise ValueError("Column %d (%s) has values which are not integers: %s" % (j, value_format, types))
+            if base in ("float", "pos_float", "float_0_1") and not types <= {int, float}:
+                raise ValueError("Column %d (%s) has values which are not numbers: %s" % (j, value_format, types))
+            if base in ("pos_int", "pos_float", "float_0_1") and min(present) < 0:
+                raise ValueError("Column %d (%s) has a value which is not positive: %s"
+                                 % (j, value_format, str(min(present))))
+            if base == "float_0_1" and max(present) > 1:
+                raise ValueError("Column %d (%s) has a value which is not in range [0.0, 1.0]: %s"
+                                 % (j, value_format, str(max(present))))
+            if base == "idx_int" and present != list(range(first_line_idx, first_line_idx + len(present))):
+                raise ValueError("Column %d (%s) violates the index integer constraint" % (j, value_format))
+            if base == "string":
+                if not types <= {str}:
+                    raise ValueError("Column %d (%s) has values which are not strings: %s" % (j, value_format, types))
+                joined = "\x00".join(present)
+                if "," in joined or "\n" in joined or "\r" in joined:
+                    raise ValueError("Column %d (%s) has a value with a comma or newline" % (j, value_format))
+                if _SURROUNDING_WHITESPACE.search(joined) is not None:
+                    raise ValueError("Column %d (%s) has a value with surrounding whitespace" % (j, value_format))
+        formatter = CsvSchema._value_formats[base][2]
+        if nullable:
+            return ["" if v is None else formatter(v) for v in values]
+        return list(map(formatter, values))
+
+    def parse_row(self, spl, line_idx):
+        """
+        Convert the split values of a line into a row (of the selected columns).
+
+        :param spl:         List of value strings (of the same length as the formats)
+        :param line_idx:    Line index (for the index integer constraint)
+
+        :return: List of values (or None if the row is filtered out by the row filter)
+        """
+        if self.row_filter is not None:
+            filter_values = [c(v) for c, v in zip(self._filter_converters, self._pick_filter_values(spl))]
+            if not self._row_predicate(filter_values):
+                return None
+        values = spl if self._pick_values is None else self._pick_values(spl)
+        row = [converter(value) for converter, value in zip(self._row_converters, values)]
+        for k in self.idx_columns:
+            if row[k] != line_idx:
+                raise ValueError("Index integer constraint violated on line %d" % line_idx)
+        for k in self._positive_columns:
+            if row[k] < 0:
+                self.converters[self.columns[k]](values[k])
+        return row
+
+
+def _to_csv_schema(line_values_format):
+    if isinstance(line_values_format, CsvSchema):
+        return line_values_format
+    return CsvSchema(line_values_format)
+
+
+def _read_lines_in_columns(lines, schema, row_filter_keep_function=None, first_line_idx=0):
+    """
+    Parse the CSV lines into columns.
+
+    :param lines:                       Iterable of lines
+    :param schema:                      CsvSchema
+    :param row_filter_keep_function     function(row) -> True/False (or None to keep all rows)
+    :param first_line_idx:              Line index of the first line
+
+    :return: Array of data column arrays
+    """
+
+    # Data will be stored in columns
+    num_columns = len(schema.formats)
+    num_selected_columns = len(schema.columns)
+    data_columns = schema.new_data_columns()
+
+    # Go over the lines one-by-one
+    i = first_line_idx
+    for line in lines:
+        spl = line.split(",")
+
+        # Check split size
+        if len(spl) != num_columns:
+            raise ValueError(
+                "Error on line %d: line split length does not match format length\nLine: %s\nFormat: %s"
+                % (i, line.strip(), schema.line_values_format)
+            )
+
+        # Save into the data columns
+        row = schema.parse_row(spl, i)
+
+        # Only add to columns if the filters allow it
+        if row is not None and (row_filter_keep_function is None or row_filter_keep_function(row)):
+            try:
+                for j in range(num_selected_columns):
+                    data_columns[j].append(row[j])
+            except OverflowError as e:
+                raise ValueError("Value out of range on line %d: %s" % (i, str(e)))
+
+        i += 1
+
+    return data_columns
+
+
+def _import_numpy():
+    """
+    Import NumPy, which is an optional dependency.
+
+    :return: numpy module
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is required for this functionality (python3 -m pip install numpy)")
+    return numpy
+
+
+# Magic bytes at the start of a compressed file
+_CSV_COMPRESSION_MAGIC = [
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+]
+
+
+def _csv_compression(csv_filename):
+    """
+    Determine the compression of the file by its magic bytes.
+
+    :param csv_filename:    CSV filename
+
+    :return: Compression (gzip, bz2, xz or zstd), or None if it is not compressed
+    """
+    with open(csv_filename, "rb") as csv_file:
+        magic = csv_file.read(6)
+    for prefix, compression in _CSV_COMPRESSION_MAGIC:
+        if magic.startswith(prefix):
+            return compression
+    return None
+
+
+def _open_zstd(csv_filename):
+    """
+    Open a zstd-compressed file for stream decompression, using compression.zstd (Python 3.14+)
+    or otherwise the zstandard module.
+
+    :param csv_filename:    CSV filename
+
+    :return: Binary file object
+    """
+    try:
+        from compression import zstd
+        return zstd.open(csv_filename, "rb")
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("The zstandard module is required to read zstd-compressed files "
+                          "(python3 -m pip install zstandard)")
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(csv_filename, "rb"), closefd=True))
+
+
+def _open_csv(csv_filename, mode="rb"):
+    """
+    Open the CSV file for reading, which is stream-decompressed if it is compressed
+    (detected by its magic bytes: gzip, bz2, xz or zstd).
+
+    :param csv_filename:    CSV filename
+    :param mode:            "rb" (binary) or "r" (text)
+
+    :return: File object
+    """
+    compression = _csv_compression(csv_filename)
+    if compression is None:
+        return open(csv_filename, mode)
+    elif compression == "gzip":
+        binary_file = gzip.open(csv_filename, "rb")
+    elif compression == "bz2":
+        binary_file = bz2.open(csv_filename, "rb")
+    elif compression == "xz":
+        binary_file = lzma.open(csv_filename, "rb")
+    else:
+        binary_file = _open_zstd(csv_filename)
+    return binary_file if mode == "rb" else io.TextIOWrapper(binary_file, encoding="utf-8")
+
+
+def _skip_to(csv_file, start_byte):
+    """
+    Move the CSV file object to the start byte, also if it is a decompression stream which cannot seek
+    (in which case the bytes before it are read and discarded).
+
+    :param csv_file:    Binary file object (at its start)
+    :param start_byte:  Byte to move to
+    """
+    if csv_file.seekable():
+        csv_file.seek(start_byte)
+        return
+    remaining = start_byte
+    while remaining > 0:
+        skipped = len(csv_file.read(min(remaining, 1024 * 1024)))
+        if skipped == 0:
+            break
+        remaining -= skipped
+
+
+def _iter_prefetched(iterator, max_prefetched):
+    """
+    Iterate over the iterator in a background thread, which stays ahead up to a number of items.
+    For a compressed file, this overlaps decompression (the decompressors release the GIL) with parsing.
+
+    :param iterator:            Iterator
+    :param max_prefetched:      Maximum number of items which are prefetched
+
+    :return: Generator of the items of the iterator
+    """
+    items = queue.Queue(maxsize=max_prefetched)
+    done = object()
+    stop = threading.Event()
+
+    def prefetch():
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    return
+                items.put((item, None))
+            items.put((done, None))
+        except BaseException as e:
+            items.put((done, e))
+
+    thread = threading.Thread(target=prefetch, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+        while thread.is_alive():
+            try:
+                items.get(timeout=0.01)
+            except queue.Empty:
+                pass
+
+
+def _iter_csv_blocks(csv_file, compressed, block_size_byte):
+    """
+    Iterate over the line-aligned blocks of the CSV file, which are prefetched in the background if it is compressed.
+
+    :param csv_file:            File opened in binary mode (by _open_csv())
+    :param compressed:          True iff the file is compressed
+    :param block_size_byte:     Approximate block size (in bytes)
+
+    :return: Generator of non-empty blocks (bytes)
+    """
+    blocks = _iter_line_aligned_blocks(csv_file, block_size_byte)
+    return _iter_prefetched(blocks, 2) if compressed else blocks
+
+
+def _iter_line_aligned_blocks(binary_file, block_size_byte):
+    """
+    Read the file in blocks which each end at the end of a line (or at the end of the file).
+
+    :param binary_file:         File opened in binary mode
+    :param block_size_byte:     Approximate block size (in bytes)
+
+    :return: Generator of non-empty blocks (bytes)
+    """
+    while True:
+        block = binary_file.read(block_size_byte)
+        if len(block) == 0:
+            return
+        if block[-1:] != b"\n":
+            block += binary_file.readline()
+        yield block
+
+
+def _count_block_lines(block):
+    """
+    :param block:   Block of lines (bytes)
+
+    :return: Number of lines in the block (the last line does not need to end with a newline)
+    """
+    return block.count(b"\n") + (0 if block[-1:] == b"\n" else 1)
+
+
+def _parse_block_numpy(numpy, block, schema, first_line_idx):
+    """
+    Parse a block of complete CSV lines into typed NumPy arrays using bulk conversion.
+
+    :param numpy:                   numpy module
+    :param block:                   Block of lines (bytes)
+    :param schema:                  CsvSchema
+    :param first_line_idx:          Line index of the first line in the block
+
+    :return: List of column arrays
+    """
+    formats = schema.formats
+    if block[-1:] == b"\n":
+        block = block[:-1]
+
+    # Check split size of every line at once using the comma and newline positions
+    buf = numpy.frombuffer(block, dtype=numpy.uint8)
+    newline_positions = numpy.flatnonzero(buf == ord("\n"))
+    comma_positions = numpy.flatnonzero(buf == ord(","))
+    line_ends = numpy.append(newline_positions, len(block))
+    commas_per_line = numpy.diff(numpy.searchsorted(comma_positions, line_ends), prepend=0)
+    wrong_lines = numpy.flatnonzero(commas_per_line != len(formats) - 1)
+    if len(wrong_lines) > 0:
+        k = int(wrong_lines[0])
+        start = 0 if k == 0 else int(line_ends[k - 1]) + 1
+        raise ValueError(
+            "Error on line %d: line split length does not match format length\nLine: %s\nFormat: %s"
+            % (first_line_idx + k, block[start:int(line_ends[k])].decode("utf-8").strip(), schema.line_values_format)
+        )
+    num_lines = len(line_ends)
+
+    # Row filter: convert the filter columns first to determine which lines are kept
+    fields = block.replace(b"\n", b",").split(b",")
+    line_indices = numpy.arange(first_line_idx, first_line_idx + num_lines)
+    keep = None
+    if schema.row_filter is not None:
+        filter_columns = [
+            _convert_column_numpy(numpy, schema, j, fields[j::len(formats)], line_indices)
+            for j in schema.filter_columns
+        ]
+        keep = schema.row_filter.mask(numpy, filter_columns)
+        line_indices = line_indices[keep]
+
+    # Convert each column in bulk (only the lines which are kept)
+    columns = []
+    for j in schema.columns:
+        if keep is not None and j in schema.filter_columns:
+            columns.append(filter_columns[schema.filter_columns.index(j)][keep])
+            continue
+        raw = fields[j::len(formats)]
+        if keep is not None:
+            raw = list(itertools.compress(raw, keep))
+        columns.append(_convert_column_numpy(numpy, schema, j, raw, line_indices))
+    return columns
+
+
+def _convert_column_numpy(numpy, schema, j, raw, line_indices):
+    """
+    Convert the raw values of a column into a typed NumPy array using bulk conversion
+    (the C-level conversion directly fills the typed array), and check the constraints.
+
+    :param numpy:           numpy module
+    :param schema:          CsvSchema
+    :param j:               Column index
+    :param raw:             List of raw values (bytes)
+    :param line_indices:    Array of the line index of each raw value
+
+    :return: Column array
+    """
+    value_format = schema.formats[j]
+    if value_format == "string":
+        return numpy.array([x.strip().decode("utf-8") for x in raw], dtype=numpy.str_)
+    if value_format not in CsvSchema.BUILT_IN_FORMATS:
+        values = map(schema.converters[j], [x.decode("utf-8") for x in raw])
+        if schema.numpy_dtype(j) is None:
+            return numpy.array(list(values) + [None], dtype=object)[:-1]
+        return numpy.fromiter(values, dtype=schema.numpy_dtype(j), count=len(raw))
+    try:
+        if value_format == "float" or value_format == "pos_float":
+            column = numpy.fromiter(map(float, raw), dtype=numpy.float64, count=len(raw))
+        else:
+            column = numpy.fromiter(map(int, raw), dtype=numpy.int64, count=len(raw))
+    except OverflowError as e:
+        raise ValueError(str(e))
+    if value_format == "pos_int" or value_format == "pos_float":
+        negative = numpy.flatnonzero(column < 0)
+        if len(negative) > 0:
+            raise ValueError("Value is not positive on line %d: %s" % (
+                int(line_indices[negative[0]]), str(column[negative[0]])
+            ))
+    elif value_format == "idx_int":
+        violated = numpy.flatnonzero(column != line_indices)
+        if len(violated) > 0:
+            raise ValueError("Index integer constraint violated on line %d" % int(line_indices[violated[0]]))
+    return column
+
+
+def _filter_columns_numpy(numpy, columns, row_filter_keep_function):
+    """
+    Filter the rows of the NumPy columns using the filter function, which is applied to each row (as Python values).
+
+    :param numpy:                       numpy module
+    :param columns:                     List of column arrays
+    :param row_filter_keep_function     function(row) -> True/False (or None to keep all rows)
+
+    :return: List of filtered column arrays
+    """
+    if row_filter_keep_function is None:
+        return columns
+    keep = numpy.array(
+        [bool(row_filter_keep_function(list(row))) for row in zip(*[c.tolist() for c in columns])],
+        dtype=bool
+    )
+    return [c[keep] for c in columns]
+
+
+def _concatenate_numpy(numpy, schema, column_blocks):
+    """
+    Concatenate the blocks of each NumPy column.
+
+    :param numpy:           numpy module
+    :param schema:          CsvSchema
+    :param column_blocks:   For each column, a list of column arrays
+
+    :return: List of column arrays
+    """
+    return [
+        numpy.concatenate(column_blocks[k]) if len(column_blocks[k]) > 0
+        else numpy.array([], dtype=object if schema.numpy_dtype(j) is None else schema.numpy_dtype(j))
+        for k, j in enumerate(schema.columns)
+    ]
+
+
+def _read_csv_numpy(csv_filename, schema, row_filter_keep_function, block_size_byte=64 * 1024 * 1024,
+                    start_byte=0):
+    """
+    Read in the entire CSV file into typed NumPy arrays (int64 for int formats, float64 for float formats,
+    and unicode strings for string), processing it in line-aligned blocks to bound the temporary memory.
+
+    :param csv_filename:                CSV filename
+    :param schema:                      CsvSchema
+    :param row_filter_keep_function     function(row) -> True/False (or None to keep all rows)
+    :param block_size_byte:             Approximate size of each block (in bytes)
+    :param start_byte:                  Byte at which the first line starts (after the header)
+
+    :return: List of column arrays
+    """
+    numpy = _import_numpy()
+    column_blocks = [[] for _ in schema.columns]
+    line_idx = 0
+    with _open_csv(csv_filename) as csv_file:
+        _skip_to(csv_file, start_byte)
+        for block in _iter_csv_blocks(csv_file, _csv_compression(csv_filename) is not None, block_size_byte):
+            columns = _parse_block_numpy(numpy, block, schema, line_idx)
+            line_idx += _count_block_lines(block)
+            columns = _filter_columns_numpy(numpy, columns, row_filter_keep_function)
+            for j in range(len(schema.columns)):
+                column_blocks[j].append(columns[j])
+    return _concatenate_numpy(numpy, schema, column_blocks)
+
+
+def _csv_byte_ranges(csv_filename, num_ranges, start_byte=0):
+    """
+    Split the CSV file into (at most) the number of byte ranges, each starting at the start of a line.
+
+    :param csv_filename:    CSV filename
+    :param num_ranges:      Number of ranges
+    :param start_byte:      Byte at which the first line starts (after the header)
+
+    :return: List of (start byte, end byte (exclusive), line index of the first line in the range)
+    """
+    size_byte = os.path.getsize(csv_filename)
+    boundaries = [start_byte]
+    with open(csv_filename, "rb") as csv_file:
+
+        # Align the boundaries to the start of the next line
+        for k in range(1, num_ranges):
+            csv_file.seek(max(start_byte, start_byte + (size_byte - start_byte) * k // num_ranges - 1))
+            csv_file.readline()
+            if boundaries[-1] < csv_file.tell() < size_byte:
+                boundaries.append(csv_file.tell())
+        boundaries.append(size_byte)
+
+        # Line index of the first line of each range
+        ranges = []
+        line_idx = 0
+        for k in range(len(boundaries) - 1):
+            ranges.append((boundaries[k], boundaries[k + 1], line_idx))
+            csv_file.seek(boundaries[k])
+            remaining = boundaries[k + 1] - boundaries[k]
+            while remaining > 0:
+                block = csv_file.read(min(remaining, 64 * 1024 * 1024))
+                line_idx += block.count(b"\n")
+                remaining -= len(block)
+
+    return ranges
+
+
+def _parse_csv_block(block, first_line_idx, schema, row_filter_keep_function, engine):
+    """
+    Parse a block of complete CSV lines (run in a worker process).
+
+    :return: Array of data column arrays (Python lists or NumPy arrays depending on the engine)
+    """
+    if engine == "numpy":
+        numpy = _import_numpy()
+        return _filter_columns_numpy(
+            numpy, _parse_block_numpy(numpy, block, schema, first_line_idx), row_filter_keep_function
+        )
+    lines = block.decode("utf-8").split("\n")
+    if block[-1:] == b"\n":
+        lines.pop()
+    return _read_lines_in_columns(lines, schema, row_filter_keep_function, first_line_idx)
+
+
+def _concatenate_lists(schema, column_blocks):
+    """
+    Concatenate the blocks of each column (lists, or arrays if the schema has compact storage).
+
+    :param schema:          CsvSchema
+    :param column_blocks:   For each column, a list of column blocks
+
+    :return: Array of data column arrays
+    """
+    data_columns = schema.new_data_columns()
+    for j in range(len(schema.columns)):
+        for block_column in column_blocks[j]:
+            data_columns[j].extend(block_column)
+    return data_columns
+
+
+def _read_csv_byte_range(csv_filename, start_byte, end_byte, first_line_idx, schema, row_filter_keep_function,
+                         engine):
+    """
+    Read in the lines of a byte range of the CSV file (run in a worker process).
+
+    :return: Array of data column arrays (Python lists or NumPy arrays depending on the engine)
+    """
+    numpy = _import_numpy() if engine == "numpy" else None
+    data_columns = [[] for _ in schema.columns]
+    line_idx = first_line_idx
+    with open(csv_filename, "rb") as csv_file:
+        csv_file.seek(start_byte)
+        position = start_byte
+        while position < end_byte:
+            block = csv_file.read(min(end_byte - position, 64 * 1024 * 1024))
+            if block[-1:] != b"\n" and position + len(block) < end_byte:
+                block += csv_file.readline()
+            position += len(block)
+            columns = _parse_csv_block(block, line_idx, schema, row_filter_keep_function, engine)
+            line_idx += _count_block_lines(block)
+            for j in range(len(schema.columns)):
+                data_columns[j].append(columns[j])
+    if engine == "numpy":
+        return _concatenate_numpy(numpy, schema, data_columns)
+    return _concatenate_lists(schema, data_columns)
+
+
+def _read_csv_parallel_compressed(csv_filename, schema, row_filter_keep_function, engine, num_processes, start_byte,
+                                  block_size_byte=16 * 1024 * 1024):
+    """
+    Read in the entire compressed CSV file, of which the byte ranges cannot be accessed directly:
+    the file is decompressed in a stream in this process, and its line-aligned blocks are parsed
+    in parallel worker processes (with a bounded number of blocks in flight).
+
+    :return: List of the parse results of each block (in order)
+    """
+    results = []
+    with _open_csv(csv_filename) as csv_file, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=num_processes) as executor:
+        _skip_to(csv_file, start_byte)
+        in_flight = collections.deque()
+        line_idx = 0
+        for block in _iter_csv_blocks(csv_file, True, block_size_byte):
+            in_flight.append(executor.submit(
+                _parse_csv_block, block, line_idx, schema, row_filter_keep_function, engine
+            ))
+            line_idx += _count_block_lines(block)
+            if len(in_flight) >= 2 * num_processes:
+                results.append(in_flight.popleft().result())
+        while len(in_flight) > 0:
+            results.append(in_flight.popleft().result())
+    return results
+
+
+def _read_csv_parallel(csv_filename, schema, row_filter_keep_function, engine, num_processes, start_byte=0):
+    """
+    Read in the entire CSV file by parsing newline-aligned byte ranges in parallel worker processes.
+
+    :return: Array of data column arrays
+    """
+    if _csv_compression(csv_filename) is not None:
+        results = _read_csv_parallel_compressed(
+            csv_filename, schema, row_filter_keep_function, engine, num_processes, start_byte
+        )
+    else:
+        ranges = _csv_byte_ranges(csv_filename, num_processes, start_byte)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=num_processes) as executor:
+            futures = [
+                executor.submit(
+                    _read_csv_byte_range, csv_filename, start_byte, end_byte, first_line_idx, schema,
+                    row_filter_keep_function, engine
+                )
+                for start_byte, end_byte, first_line_idx in ranges
+            ]
+            results = [future.result() for future in futures]
+
+    # Concatenate in order
+    if engine == "numpy":
+        return _concatenate_numpy(
+            _import_numpy(), schema, [[r[j] for r in results] for j in range(len(schema.columns))]
+        )
+    return _concatenate_lists(schema, [[r[j] for r in results] for j in range(len(schema.columns))])
+
+
+def _csv_cache_dir(csv_filename, line_values_format):
+    """
+    Sidecar cache directory of the parsed columns of the CSV file with the line values format.
+
+    :param csv_filename:            CSV filename
+    :param line_values_format:      Line format
+
+    :return: Directory path ([csv_filename].exputil_cache/[hash of line format])
+    """
+    return os.path.join(
+        csv_filename + ".exputil_cache",
+        hashlib.sha256(line_values_format.encode("utf-8")).hexdigest()[:16]
+    )
+
+
+def _csv_cache_key(csv_filename, line_values_format, start_byte):
+    stat = os.stat(csv_filename)
+    return {
+        "path": os.path.abspath(csv_filename),
+        "size_byte": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "line_values_format": line_values_format,
+        "start_byte": start_byte
+    }
+
+
+def _load_csv_cache(numpy, csv_filename, line_values_format, start_byte, num_columns):
+    """
+    Load the parsed columns from the sidecar cache as memory-mapped arrays.
+
+    :return: List of column arrays, or None if there is no cache or it is stale
+    """
+    cache_dir = _csv_cache_dir(csv_filename, line_values_format)
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), "r") as f_in:
+            if json.load(f_in) != _csv_cache_key(csv_filename, line_values_format, start_byte):
+                return None
+        return [
+            numpy.load(os.path.join(cache_dir, "column_%d.npy" % j), mmap_mode="r", allow_pickle=False)
+            for j in range(num_columns)
+        ]
+    except (OSError, ValueError):
+        return None
+
+
+def _save_csv_cache(numpy, csv_filename, line_values_format, start_byte, data_columns):
+    """
+    Save the parsed columns into the sidecar cache (one .npy file per column).
+    The metadata file, which identifies the file version the columns belong to, is written last.
+
+    :return: True iff the cache was saved (False if it could not be written, e.g., in a read-only directory)
+    """
+    cache_dir = _csv_cache_dir(csv_filename, line_values_format)
+    meta_filename = os.path.join(cache_dir, "meta.json")
+    key = _csv_cache_key(csv_filename, line_values_format, start_byte)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        if os.path.exists(meta_filename):
+            os.remove(meta_filename)
+        for j in range(len(data_columns)):
+            numpy.save(os.path.join(cache_dir, "column_%d.npy" % j), data_columns[j], allow_pickle=False)
+        with open(meta_filename + ".temp", "w+") as f_out:
+            json.dump(key, f_out)
+        os.replace(meta_filename + ".temp", meta_filename)
+    except OSError:
+        return False
+    return True
+
+
+def _read_csv_cached(csv_filename, schema, row_filter_keep_function, engine, num_processes, start_byte):
+    """
+    Read in the entire CSV file using the sidecar cache, which is (re)created if it does not exist or is stale.
+    The cache always holds all columns, of which the selected ones are returned.
+
+    :return: Array of data column arrays
+    """
+    numpy = _import_numpy()
+    for j in range(len(schema.formats)):
+        if schema.numpy_dtype(j) is None:
+            raise ValueError("Value format %s cannot be cached (it has no NumPy dtype)" % schema.formats[j])
+    fmt = schema.line_values_format
+    data_columns = _load_csv_cache(numpy, csv_filename, fmt, start_byte, len(schema.formats))
+    if data_columns is None:
+        full_schema = CsvSchema(fmt)
+        if num_processes > 1:
+            data_columns = _read_csv_parallel(csv_filename, full_schema, None, "numpy", num_processes, start_byte)
+        else:
+            data_columns = _read_csv_numpy(csv_filename, full_schema, None, start_byte=start_byte)
+        # Without a (writable) cache, the parsed columns are returned as-is
+        if _save_csv_cache(numpy, csv_filename, fmt, start_byte, data_columns):
+            data_columns = _load_csv_cache(numpy, csv_filename, fmt, start_byte, len(schema.formats))
+    if schema.row_filter is not None:
+        keep = schema.row_filter.mask(numpy, [data_columns[j] for j in schema.filter_columns])
+        data_columns = [data_columns[j][keep] for j in schema.columns]
+    else:
+        data_columns = [data_columns[j] for j in schema.columns]
+    data_columns = _filter_columns_numpy(numpy, data_columns, row_filter_keep_function)
+    if engine == "python":
+        return [c.tolist() for c in data_columns]
+    elif engine == "compact":
+        compact_columns = schema.compact().new_data_columns()
+        for j in range(len(schema.columns)):
+            if isinstance(compact_columns[j], array.array):
+                compact_columns[j].frombytes(numpy.ascontiguousarray(data_columns[j]).tobytes())
+            elif schema.formats[schema.columns[j]] == "string":
+                compact_columns[j] = list(map(sys.intern, data_columns[j].tolist()))
+            else:
+                compact_columns[j] = data_columns[j].tolist()
+        return compact_columns
+    return data_columns
+
+
+def _read_csv_header(csv_filename):
+    """
+    Read the header line of the CSV file.
+
+    :param csv_filename:    CSV filename
+
+    :return: (List of column names, byte at which the first line after the header starts)
+    """
+    with _open_csv(csv_filename) as csv_file:
+        header_line = csv_file.readline()
+        return [name.strip() for name in header_line.decode("utf-8").split(",")], csv_file.tell()
+
+
+def _csv_projection(csv_filename, schema, columns, header, row_filters=None):
+    """
+    Project the schema onto the selected columns and the rows which are kept by the row filters.
+
+    :param csv_filename:    CSV filename
+    :param schema:          CsvSchema
+    :param columns:         List of column indices and/or names (None: all columns)
+    :param header:          True iff the first line of the CSV file is a header with the column names
+    :param row_filters:     Declarative row filter (None: keep all rows)
+
+    :return: (Projected CsvSchema, byte at which the first line after the header starts)
+    """
+    names = None
+    start_byte = 0
+    if header:
+        names, start_byte = _read_csv_header(csv_filename)
+        if len(names) != len(schema.formats):
+            raise ValueError(
+                "Header length does not match format length\nHeader: %s\nFormat: %s"
+                % (",".join(names), schema.line_values_format)
+            )
+    if row_filters is not None:
+        schema = schema.filter_rows(row_filters, names)
+    if columns is None:
+        return schema, start_byte
+    column_indices = []
+    for column in columns:
+        if isinstance(column, str):
+            if names is None:
+                raise ValueError("Columns can only be selected by name if there is a header: " + column)
+            if column not in names:
+                raise ValueError("Column name not in header: " + column)
+            column_indices.append(names.index(column))
+        else:
+            column_indices.append(column)
+    return schema.project(column_indices), start_byte
+
+
+def read_csv_direct_in_columns(csv_filename, line_values_format, row_filter_keep_function=None, engine="python",
+                               num_processes=1, cache=False, columns=None, header=False, row_filters=None):
     """
     Directly read in the entire CSV file.
 
     :param csv_filename:               CSV filename
     :param line_values_format:         Line format as such: "[int,idx_int,pos_int,float,pos_float,string]+",
                                        e.g., "idx_int,pos_int,float,string,int,pos_float"
+                                       (or a CsvSchema, which also supports additional value formats)
     :param row_filter_keep_function    function(row) -> True/False
                                        For each parsed row (provided as an array), it must return True or False.
                                        True iff to keep and add row split into the columns, else False to not add.
+    :param engine:                     "python" to return lists of Python values,
+                                       "numpy" to return typed NumPy arrays (int64, float64 or unicode strings)
+                                       which are parsed using bulk conversion (requires NumPy), or
+                                       "compact" to return int and float columns as array.array (typecode "q"
+                                       respectively "d") and string columns as lists of interned strings
+                                       (the other columns as lists), which does not require NumPy
+    :param num_processes:              Number of worker processes which each parse a newline-aligned byte range
+                                       of the file (if more than 1, the row filter function must be picklable,
+                                       i.e., a module-level function instead of a lambda)
+    :param cache:                      True iff to use a binary sidecar cache (requires NumPy) of the parsed columns
+                                       (in [csv_filename].exputil_cache/), which is keyed on the path, size,
+                                       modification time and line format, and is recreated automatically if stale.
+                                       The NumPy engine returns the cached columns memory-mapped (read-only).
+    :param columns:                    List of column indices, or column names if there is a header, to return
+                                       (None: all columns). The values of the other columns are skipped without
+                                       conversion, though the number of values on each line is still checked.
+                                       The row filter function is provided only the selected columns.
+    :param header:                     True iff the first line is a header with the column names (which is skipped,
+                                       the index integer constraint starts at 0 on the line after it)
+    :param row_filters:                Declarative row filter (see CsvSchema.filter_rows()), e.g.,
+                                       [(2, ">=", 0), ("or", [(3, "in", ["a", "b"]), (4, "between", (10, 20))])],
+                                       which is evaluated on the filter columns before the other columns are
+                                       converted (and in bulk by the NumPy engine). Columns are referred to by their
+                                       index in the line format (or by name if there is a header). If a row filter
+                                       function is given as well, it is applied to the rows which remain.
 
     :return: Array of data column arrays (e.g., [ array[idx_int], array[pos_int], array[float],
-             array[string], array[int], array[pos_float] ]
+             array[string], array[int], array[pos_float] ] (in the order of the selected columns)
     """
 
     # Determine the formats
-    formats = []
-    for f in line_values_format.split(","):
-        if f != "int" and f != "idx_int" and f != "pos_int" and f != "float" and f != "pos_float" and f != "string":
-            raise ValueError(
-                "Value format must be one of: int, idx_int, pos_int, float, pos_float, string"
-                " (separated by comma without whitespace)"
-            )
-        formats.append(f)
+    schema, start_byte = _csv_projection(
+        csv_filename, _to_csv_schema(line_values_format), columns, header, row_filters
+    )
+    if engine != "python" and engine != "numpy" and engine != "compact":
+        raise ValueError("Engine must be one of: python, numpy, compact")
+    if num_processes < 1:
+        raise ValueError("Number of processes must be at least 1: " + str(num_processes))
 
-    # Data will be stored in columns
-    data_columns = []
-    for i in range(len(formats)):
-        data_columns.append([])
+    # Sidecar cache
+    if cache:
+        return _read_csv_cached(csv_filename, schema, row_filter_keep_function, engine, num_processes, start_byte)
+
+    # Compact storage is parsed the same as the Python engine
+    if engine == "compact":
+        schema = schema.compact()
+        engine = "python"
+
+    # Parallel
+    if num_processes > 1:
+        return _read_csv_parallel(csv_filename, schema, row_filter_keep_function, engine, num_processes, start_byte)
+
+    # NumPy engine
+    if engine == "numpy":
+        return _read_csv_numpy(csv_filename, schema, row_filter_keep_function, start_byte=start_byte)
 
     # Read in the CSV file line-by-line
-    with open(csv_filename, "r") as csv_file:
-        i = 0
-        for line in csv_file:
-            spl = line.split(",")
+    with _open_csv(csv_filename, "r") as csv_file:
+        if header:
+            csv_file.readline()
+        return _read_lines_in_columns(csv_file, schema, row_filter_keep_function)
 
-            # Check split size
-            if len(spl) != len(formats):
-                raise ValueError(
-                    "Error on line %d: line split length does not match format length\nLine: %s\nFormat: %s"
-                    % (i, line.strip(), line_values_format)
+
+def read_csv_in_column_chunks(csv_filename, line_values_format, chunk_num_lines=100000,
+                              row_filter_keep_function=None, engine="python", columns=None, header=False,
+                              row_filters=None):
+    """
+    Read in the CSV file chunk-by-chunk, such that only one chunk at a time is held in memory.
+    The line format, filter and engine are the same as for read_csv_direct_in_columns(), and the
+    index integer constraint is checked across chunks.
+
+    :param csv_filename:               CSV filename
+    :param line_values_format:         Line format as such: "[int,idx_int,pos_int,float,pos_float,string]+"
+                                       (or a CsvSchema)
+    :param chunk_num_lines:            Number of lines read for each chunk (the last chunk can have fewer lines,
+                                       and a chunk has fewer rows if rows are filtered out)
+    :param row_filter_keep_function    function(row) -> True/False (see read_csv_direct_in_columns())
+    :param engine:                     "python" (lists of Python values), "numpy" (typed NumPy arrays) or
+                                       "compact" (array.array and interned strings)
+    :param columns:                    List of column indices or names to return (see read_csv_direct_in_columns())
+    :param header:                     True iff the first line is a header with the column names
+    :param row_filters:                Declarative row filter (see read_csv_direct_in_columns())
+
+    :return: Generator of arrays of data column arrays (one for each chunk)
+    """
+
+    # Determine the formats
+    schema, _ = _csv_projection(csv_filename, _to_csv_schema(line_values_format), columns, header, row_filters)
+    if chunk_num_lines < 1:
+        raise ValueError("Number of lines in a chunk must be at least 1: " + str(chunk_num_lines))
+    if engine == "numpy":
+        numpy = _import_numpy()
+    elif engine == "compact":
+        schema = schema.compact()
+    elif engine != "python":
+        raise ValueError("Engine must be one of: python, numpy, compact")
+
+    # Read in the CSV file chunk-by-chunk
+    line_idx = 0
+    with _open_csv(csv_filename, "rb" if engine == "numpy" else "r") as csv_file:
+        if header:
+            csv_file.readline()
+        while True:
+            lines = list(itertools.islice(csv_file, chunk_num_lines))
+            if len(lines) == 0:
+                return
+            if engine == "numpy":
+                data_columns = _filter_columns_numpy(
+                    numpy, _parse_block_numpy(numpy, b"".join(lines), schema, line_idx), row_filter_keep_function
                 )
+            else:
+                data_columns = _read_lines_in_columns(lines, schema, row_filter_keep_function, line_idx)
+            line_idx += len(lines)
+            yield data_columns
 
-            # Save into the data columns
-            row = []
-            for j in range(len(spl)):
-                if formats[j] == "int":
-                    row.append(parse_int(spl[j]))
-                elif formats[j] == "idx_int":
-                    int_val = int(spl[j])
-                    if int_val != i:
-                        raise ValueError("Index integer constraint violated on line %d" % i)
-                    row.append(int_val)
-                elif formats[j] == "pos_int":
-                    row.append(parse_positive_int(spl[j]))
-                elif formats[j] == "float":
-                    row.append(parse_float(spl[j]))
-                elif formats[j] == "pos_float":
-                    row.append(parse_positive_float(spl[j]))
-                else:
-                    row.append(spl[j].strip())
 
-            # Only add to columns if the filter function allows it
-            if row_filter_keep_function is None or row_filter_keep_function(row):
-                for j in range(len(spl)):
-                    data_columns[j].append(row[j])
+def _read_csv_file_or_error(csv_filename, read_arguments):
+    """
+    Read in a CSV file of a multi-file load (run in a worker process).
 
-            i += 1
+    :return: (Array of data column arrays, None), or (None, exception) if it failed
+    """
+    try:
+        return read_csv_direct_in_columns(csv_filename, **read_arguments), None
+    except Exception as e:
+        return None, e
 
-    return data_columns
+
+def read_csv_files_in_columns(csv_filenames, line_values_format, row_filter_keep_function=None, engine="python",
+                              num_processes=None, columns=None, header=False, row_filters=None,
+                              source_function=None):
+    """
+    Read in many CSV files of the same line format in parallel worker processes, and concatenate their columns.
+    A source column is appended, which for each row holds the file it came from (or a run identifier).
+    Errors of individual files are collected instead of aborting the whole load: a file with an error
+    does not contribute any rows.
+
+    :param csv_filenames:               List of CSV filenames, or a glob pattern (e.g., "runs/*/result.csv")
+                                        of which the matching files are read in sorted order
+    :param line_values_format:          Line format (or a CsvSchema), see read_csv_direct_in_columns()
+    :param row_filter_keep_function     function(row) -> True/False (if there is more than one process,
+                                        it must be picklable, i.e., a module-level function instead of a lambda)
+    :param engine:                      "python", "numpy" or "compact" (see read_csv_direct_in_columns())
+    :param num_processes:               Number of worker processes (None: number of CPUs), with 1 to read
+                                        all files in this process
+    :param columns:                     List of column indices or names to return
+    :param header:                      True iff the first line of each file is a header with the column names
+    :param row_filters:                 Declarative row filter (see read_csv_direct_in_columns())
+    :param source_function:             function(csv_filename) -> source value of its rows
+                                        (None: the filename itself), e.g., to extract a run identifier
+
+    :return: (Array of data column arrays with the source column last, dictionary of filename -> exception
+             of the files which could not be read)
+    """
+
+    # Files
+    if isinstance(csv_filenames, str):
+        csv_filenames = sorted(glob.glob(csv_filenames))
+    if num_processes is None:
+        num_processes = os.cpu_count() or 1
+    if num_processes < 1:
+        raise ValueError("Number of processes must be at least 1: " + str(num_processes))
+    if engine != "python" and engine != "numpy" and engine != "compact":
+        raise ValueError("Engine must be one of: python, numpy, compact")
+    read_arguments = {
+        "line_values_format": _to_csv_schema(line_values_format),
+        "row_filter_keep_function": row_filter_keep_function,
+        "engine": engine,
+        "columns": columns,
+        "header": header,
+        "row_filters": row_filters,
+    }
+
+    # Read in the files (multiple files are handed to a worker at once, as there can be many small files)
+    if num_processes == 1 or len(csv_filenames) <= 1:
+        results = [_read_csv_file_or_error(csv_filename, read_arguments) for csv_filename in csv_filenames]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=num_processes) as executor:
+            results = list(executor.map(
+                _read_csv_file_or_error, csv_filenames, itertools.repeat(read_arguments),
+                chunksize=max(1, len(csv_filenames) // (4 * num_processes))
+            ))
+
+    # Concatenate in order with the source column
+    errors = {}
+    column_blocks = None
+    sources = []
+    for csv_filename, (data_columns, error) in zip(csv_filenames, results):
+        if error is not None:
+            errors[csv_filename] = error
+            continue
+        if column_blocks is None:
+            column_blocks = [[] for _ in data_columns]
+        for j in range(len(data_columns)):
+            column_blocks[j].append(data_columns[j])
+        source = csv_filename if source_function is None else source_function(csv_filename)
+        sources.append((source, len(data_columns[0]) if len(data_columns) > 0 else 0))
+    if column_blocks is None:
+        column_blocks = [[] for _ in (
+            range(len(read_arguments["line_values_format"].formats)) if columns is None else columns
+        )]
+    if engine == "numpy":
+        numpy = _import_numpy()
+        data_columns = [
+            numpy.concatenate(blocks) if len(blocks) > 0 else numpy.array([], dtype=object) for blocks in column_blocks
+        ]
+        data_columns.append(numpy.repeat(
+            numpy.array([source for source, _ in sources]), numpy.array([n for _, n in sources], dtype=numpy.int64)
+        ))
+    else:
+        data_columns = []
+        for blocks in column_blocks:
+            data_columns.append(blocks[0] if len(blocks) > 0 else [])
+            for block in blocks[1:]:
+                data_columns[-1].extend(block)
+        data_columns.append([source for source, n in sources for _ in range(n)])
+    return data_columns, errors
+
+
+def _open_csv_for_writing(csv_filename, compression):
+    """
+    Open the CSV file for writing (in binary mode), with a large write buffer.
+
+    :param csv_filename:    CSV filename
+    :param compression:     None, "gzip", "bz2", "xz" or "zstd"
+
+    :return: Binary file object
+    """
+    if compression is None:
+        return open(csv_filename, "wb", buffering=1024 * 1024)
+    elif compression == "gzip":
+        return gzip.open(csv_filename, "wb", compresslevel=6)
+    elif compression == "bz2":
+        return bz2.open(csv_filename, "wb")
+    elif compression == "xz":
+        return lzma.open(csv_filename, "wb")
+    elif compression == "zstd":
+        try:
+            from compression import zstd
+            return zstd.open(csv_filename, "wb")
+        except ImportError:
+            pass
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("The zstandard module is required to write zstd-compressed files "
+                              "(python3 -m pip install zstandard)")
+        return zstandard.ZstdCompressor().stream_writer(open(csv_filename, "wb"), closefd=True)
+    else:
+        raise ValueError("Compression must be one of: None, gzip, bz2, xz, zstd")
+
+
+def _column_values(column, start, end):
+    """
+    :param column:  List, array.array or NumPy array
+    :param start:   Start index (inclusive)
+    :param end:     End index (exclusive)
+
+    :return: List of the Python values of the column in the range
+    """
+    values = column[start:end]
+    return values if isinstance(values, list) else values.tolist()
+
+
+def write_csv_columns(csv_filename, data_columns, line_values_format, header=None, compression=None,
+                      chunk_num_rows=100000):
+    """
+    Write the data columns into a CSV file, which can be read back by read_csv_direct_in_columns()
+    with the same line format. The values are checked against the line format and formatted in bulk,
+    column-by-column, for chunks of rows which are each written at once.
+
+    :param csv_filename:            CSV filename (overwritten if it exists)
+    :param data_columns:            Array of data columns (each a list, array.array or NumPy array of equal length)
+    :param line_values_format:      Line format (or a CsvSchema), see read_csv_direct_in_columns()
+    :param header:                  List of column names to write as header line (None: no header)
+    :param compression:             None, "gzip", "bz2", "xz" or "zstd" (the reader detects it automatically)
+    :param chunk_num_rows:          Number of rows formatted and written at once
+    """
+
+    # Check the columns
+    schema = _to_csv_schema(line_values_format)
+    if len(data_columns) != len(schema.formats):
+        raise ValueError("Number of columns (%d) does not match format length (%d)"
+                         % (len(data_columns), len(schema.formats)))
+    num_rows = len(data_columns[0])
+    for j in range(len(data_columns)):
+        if len(data_columns[j]) != num_rows:
+            raise ValueError("Column %d has %d values instead of %d" % (j, len(data_columns[j]), num_rows))
+    if header is not None and (
+            len(header) != len(schema.formats) or any("," in name or "\n" in name for name in header)
+    ):
+        raise ValueError("Header must have a name (without comma or newline) for each column: " + str(header))
+    if chunk_num_rows < 1:
+        raise ValueError("Number of rows in a chunk must be at least 1: " + str(chunk_num_rows))
+
+    # Write chunk-by-chunk
+    with _open_csv_for_writing(csv_filename, compression) as csv_file:
+        if header is not None:
+            csv_file.write((",".join(header) + "\n").encode("utf-8"))
+        for start in range(0, num_rows, chunk_num_rows):
+            end = min(num_rows, start + chunk_num_rows)
+            formatted_columns = [
+                schema.format_values(j, _column_values(data_columns[j], start, end), start)
+                for j in range(len(data_columns))
+            ]
+            csv_file.write(("\n".join(map(",".join, zip(*formatted_columns))) + "\n").encode("utf-8"))
 
 
 def plain_replace_in_file_in_place(target_filename: str, search_text: str, replace_text: str):
@@ -0,0 +1,190 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import glob
+from .shell import LocalShell, ShellExecWaiter, OutputRedirect
+
+
+def _parse_cpu_list(cpu_list):
+    """
+    Parse a Linux CPU list (e.g., "0-3,8,10-11").
+
+    :param cpu_list:    CPU list string
+
+    :return: List of CPU indices
+    """
+    cpus = []
+    for part in cpu_list.strip().split(","):
+        if len(part) == 0:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus += list(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def _usable_cores():
+    """
+    :return: Sorted list of the CPU indices this process may run on
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _core_slots(cores, cores_per_job, avoid_hyperthreads):
+    """
+    Partition the cores into slots of dedicated cores for each job.
+    A slot never spans multiple NUMA nodes.
+
+    :param cores:               List of usable CPU indices
+    :param cores_per_job:       Number of cores per slot
+    :param avoid_hyperthreads:  True iff to only use one logical CPU (hyperthread) of each physical core
+
+    :return: List of slots, each a list of CPU indices
+    """
+
+    # Only keep the first hyperthread of each physical core
+    if avoid_hyperthreads:
+        first_siblings = []
+        for cpu in cores:
+            try:
+                with open("/sys/devices/system/cpu/cpu%d/topology/thread_siblings_list" % cpu, "r") as f_in:
+                    siblings = [c for c in _parse_cpu_list(f_in.read()) if c in cores]
+            except OSError:
+                siblings = [cpu]
+            if siblings[0] == cpu:
+                first_siblings.append(cpu)
+        cores = first_siblings
+
+    # Group the cores by NUMA node (if unknown, all are considered to be in the same node)
+    nodes = []
+    for node_cpu_list in sorted(glob.glob("/sys/devices/system/node/node*/cpulist")):
+        with open(node_cpu_list, "r") as f_in:
+            node_cores = [c for c in _parse_cpu_list(f_in.read()) if c in cores]
+        if len(node_cores) > 0:
+            nodes.append(node_cores)
+    assigned = set(c for node_cores in nodes for c in node_cores)
+    unassigned = [c for c in cores if c not in assigned]
+    if len(unassigned) > 0:
+        nodes.append(unassigned)
+
+    # Slots of dedicated cores within each node
+    slots = []
+    for node_cores in nodes:
+        for i in range(0, len(node_cores) - cores_per_job + 1, cores_per_job):
+            slots.append(node_cores[i:(i + cores_per_job)])
+    return slots
+
+
+class LocalJobPool:
+
+    def __init__(self, max_jobs=None, pin=False, cores_per_job=1, avoid_hyperthreads=False,
+                 output_redirect=OutputRedirect.PIPE_VARIABLE):
+        """
+        Pool which runs many local commands, at most a limited number at once.
+
+        If pinning is enabled, each job is pinned (using taskset) to its own dedicated cores,
+        which never span multiple NUMA nodes.
+
+        :param max_jobs:            Maximum number of jobs running at once
+                                    (None: the number of usable cores, or of core slots if pinned)
+        :param pin:                 True iff to pin each job to dedicated cores
+        :param cores_per_job:       Number of cores dedicated to each job (only if pinned)
+        :param avoid_hyperthreads:  True iff to only use one hyperthread per physical core (only if pinned)
+        :param output_redirect:     Output redirection of each job (cannot be SIMPLE_STRING, as jobs are async)
+        """
+        if cores_per_job < 1:
+            raise ValueError("Number of cores per job must be at least 1: " + str(cores_per_job))
+        if output_redirect == OutputRedirect.SIMPLE_STRING:
+            raise ValueError("Output cannot be redirected to a simple string if async.")
+        self.shell = LocalShell()
+        self.output_redirect = output_redirect
+        if pin:
+            self.slots = _core_slots(_usable_cores(), cores_per_job, avoid_hyperthreads)
+            if len(self.slots) == 0:
+                raise ValueError("Not enough usable cores for %d cores per job" % cores_per_job)
+        else:
+            self.slots = None
+        if max_jobs is None:
+            max_jobs = len(self.slots) if pin else len(_usable_cores())
+        if max_jobs < 1:
+            raise ValueError("Maximum number of jobs must be at least 1: " + str(max_jobs))
+        if pin and max_jobs > len(self.slots):
+            raise ValueError(
+                "Maximum number of jobs %d exceeds the number of core slots %d" % (max_jobs, len(self.slots))
+            )
+        self.max_jobs = max_jobs
+
+    def _start(self, command, slot):
+        if slot is not None:
+            cores = ",".join(str(c) for c in slot)
+            if isinstance(command, str):
+                command = ["taskset", "-c", cores, "/bin/sh", "-c", command]
+            else:
+                command = ["taskset", "-c", cores] + list(command)
+        return self.shell.exec(command, sync=False, output_redirect=self.output_redirect)
+
+    def run_iter(self, commands):
+        """
+        Run the commands, yielding each one as soon as it finishes.
+
+        :param commands:    List of commands (each a string or argument vector)
+
+        :return: Generator of (index of the command, ShellExecResult with final return code and output)
+        """
+        free_slots = list(self.slots) if self.slots is not None else None
+        waiter = ShellExecWaiter()
+        running = {}
+        next_idx = 0
+        while next_idx < len(commands) or len(running) > 0:
+
+            # Start as many jobs as allowed
+            while next_idx < len(commands) and len(running) < self.max_jobs:
+                slot = free_slots.pop(0) if free_slots is not None else None
+                res = self._start(commands[next_idx], slot)
+                running[id(res)] = (next_idx, slot)
+                waiter.add(res)
+                next_idx += 1
+
+            # Wait for any to finish
+            for res in waiter.wait_any():
+                idx, slot = running.pop(id(res))
+                if slot is not None:
+                    free_slots.append(slot)
+                yield idx, res
+
+    def run(self, commands):
+        """
+        Run the commands.
+
+        :param commands:    List of commands (each a string or argument vector)
+
+        :return: List of ShellExecResult (in the same order as the commands)
+        """
+        results = [None] * len(commands)
+        for idx, res in self.run_iter(commands):
+            results[idx] = res
+        return results
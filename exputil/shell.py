@@ -21,11 +21,23 @@
 # SOFTWARE.
 
 import subprocess
+import functools
+import threading
+import hashlib
+import shutil
+import shlex
 import json
+import time
 import sys
 import re
+import os
+import errno
+import selectors
+import gzip
+from collections import deque
 from enum import Enum
 from abc import ABC, abstractmethod
+from .input_output import _to_csv_schema, _read_lines_in_columns
 
 
 class OutputRedirect(Enum):
@@ -50,6 +62,25 @@ class ShellExecResult:
         )
 
 
+class HostInfo:
+
+    def __init__(self, num_cores, load_avg, mem_available_byte, disk_free_byte, num_screens):
+        self.num_cores = num_cores
+        self.load_avg = load_avg
+        self.mem_available_byte = mem_available_byte
+        self.disk_free_byte = disk_free_byte
+        self.num_screens = num_screens
+
+    def __str__(self):
+        return "HostInfo(num_cores=%d, load_avg=%s, mem_available_byte=%d, disk_free_byte=%d, num_screens=%d)" % (
+            self.num_cores,
+            str(self.load_avg),
+            self.mem_available_byte,
+            self.disk_free_byte,
+            self.num_screens
+        )
+
+
 class InvalidCommandError(Exception):
     """
     Error raised for when the command was invalid meaning that the command return anything else than 0-100.
@@ -83,11 +114,251 @@ class FailedCommandError(Exception):
         self.sec = sec
 
 
+# Characters which require the command to be interpreted by a shell
+_SHELL_META_CHARACTERS = set("|&;<>()$`\\\"'*?[]#~=%{}!\n\t")
+
+# Commands which only exist as shell built-ins (and thus cannot be spawned directly)
+_SHELL_ONLY_BUILTINS = {
+    ".", ":", "alias", "bg", "break", "cd", "continue", "eval", "exec", "exit", "export", "fg", "getopts",
+    "hash", "jobs", "local", "read", "readonly", "return", "set", "shift", "source", "times", "trap",
+    "type", "ulimit", "umask", "unalias", "unset", "wait"
+}
+
+
+class ShellTracer:
+
+    # Approximate memory (in byte) taken by a span apart from its strings
+    SPAN_OVERHEAD_BYTE = 200
+
+    def __init__(self, max_spans=1000000, max_bytes=64 * 1024 * 1024, max_command_length=256):
+        """
+        In-memory buffer of spans of shell activity.
+        Once the buffer is full (either in number of spans or in approximate memory), the oldest spans are discarded.
+
+        :param max_spans:           Maximum number of spans retained
+        :param max_bytes:           Maximum approximate memory (in byte) taken by the retained spans
+        :param max_command_length:  Commands (or arguments) longer than this are truncated
+        """
+        if max_spans < 1:
+            raise ValueError("Maximum number of spans must be at least 1: " + str(max_spans))
+        if max_bytes < 1:
+            raise ValueError("Maximum number of bytes must be at least 1: " + str(max_bytes))
+        if max_command_length < 0:
+            raise ValueError("Maximum command length cannot be negative: " + str(max_command_length))
+        self.max_spans = max_spans
+        self.max_bytes = max_bytes
+        self.max_command_length = max_command_length
+        self.spans = deque()
+        self.num_bytes = 0
+        self.lock = threading.Lock()
+        self.epoch_perf_counter_s = time.perf_counter()
+        self.epoch_time_s = time.time()
+
+    def truncate(self, command):
+        """
+        Truncate the command to the maximum command length.
+
+        :param command:     Command string
+
+        :return: Command string, ending in "...[+N]" (N being the number of characters cut off) if truncated
+        """
+        if len(command) <= self.max_command_length:
+            return command
+        return "%s...[+%d]" % (command[:self.max_command_length], len(command) - self.max_command_length)
+
+    def record(self, host, method, command, start_s, end_s, result):
+        """
+        Record a span (a single call to a shell method).
+
+        :param host:        Host the method was called on
+        :param method:      Method name (e.g., "exec", "perfect_exec", "rsync")
+        :param command:     Command (for exec) or arguments (for the other methods), truncated if too long
+        :param start_s:     Start time (time.perf_counter())
+        :param end_s:       End time (time.perf_counter())
+        :param result:      Return code, or name of the raised exception, or None
+        """
+        command = self.truncate(command)
+        span_bytes = self.SPAN_OVERHEAD_BYTE + len(host) + len(method) + len(command)
+        with self.lock:
+            self.spans.append((host, method, command, start_s, end_s, result, threading.get_ident(), span_bytes))
+            self.num_bytes += span_bytes
+            while len(self.spans) > self.max_spans or (self.num_bytes > self.max_bytes and len(self.spans) > 1):
+                self.num_bytes -= self.spans.popleft()[7]
+
+    def clear(self):
+        with self.lock:
+            self.spans.clear()
+            self.num_bytes = 0
+
+    def get_spans(self):
+        """
+        Retrieve all recorded spans.
+
+        :return: List of dictionaries with keys: host, method, command, start_s, end_s, result, thread.
+                 Start and end are wall-clock UNIX timestamps in seconds.
+        """
+        offset_s = self.epoch_time_s - self.epoch_perf_counter_s
+        return [
+            {
+                "host": host,
+                "method": method,
+                "command": command,
+                "start_s": start_s + offset_s,
+                "end_s": end_s + offset_s,
+                "result": result,
+                "thread": thread
+            } for (host, method, command, start_s, end_s, result, thread, _) in list(self.spans)
+        ]
+
+    def export_json_lines(self, filename):
+        """
+        Export the spans as JSON-lines file (one span object per line).
+
+        :param filename:    Output filename
+        """
+        with open(filename, "w+") as f_out:
+            for span in self.get_spans():
+                f_out.write(json.dumps(span) + "\n")
+
+    def export_chrome_trace(self, filename):
+        """
+        Export the spans in the Chrome Trace Event JSON format (e.g., viewable in Perfetto).
+        Each host is shown as a separate process.
+
+        :param filename:    Output filename
+        """
+        host_pids = {}
+        events = []
+        for span in self.get_spans():
+            if span["host"] not in host_pids:
+                host_pids[span["host"]] = len(host_pids) + 1
+                events.append({
+                    "name": "process_name",
+                    "ph": "M",
+                    "pid": host_pids[span["host"]],
+                    "args": {"name": span["host"]}
+                })
+            events.append({
+                "name": span["method"],
+                "cat": "shell",
+                "ph": "X",
+                "ts": span["start_s"] * 1000000.0,
+                "dur": (span["end_s"] - span["start_s"]) * 1000000.0,
+                "pid": host_pids[span["host"]],
+                "tid": span["thread"],
+                "args": {"command": span["command"], "result": span["result"]}
+            })
+        with open(filename, "w+") as f_out:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f_out)
+
+
+# Active shell tracer (None if tracing is disabled, which is the default)
+_shell_tracer = None
+
+
+def enable_shell_tracing(tracer=None):
+    """
+    Enable tracing of all shell activity.
+
+    :param tracer:  ShellTracer to record into (if None, a new one is created)
+
+    :return: Active ShellTracer
+    """
+    global _shell_tracer
+    _shell_tracer = ShellTracer() if tracer is None else tracer
+    return _shell_tracer
+
+
+def disable_shell_tracing():
+    """
+    Disable tracing of shell activity.
+
+    :return: ShellTracer which was active (None if tracing was not enabled)
+    """
+    global _shell_tracer
+    tracer = _shell_tracer
+    _shell_tracer = None
+    return tracer
+
+
+def _traced(method):
+    """
+    Decorator which records a span of the shell method call into the active shell tracer (if any).
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        tracer = _shell_tracer
+        if tracer is None:
+            return method(self, *args, **kwargs)
+        if method.__name__ == "exec":
+            command = args[0] if len(args) > 0 else kwargs.get("command")
+            command = command if isinstance(command, str) else " ".join(shlex.quote(arg) for arg in command)
+        else:
+            # Cut off each argument early, as the complete string can be large (e.g., content of write_file)
+            limit = tracer.max_command_length + 1
+            command = " ".join([str(arg)[:limit] for arg in args] + ["%s=%s" % (k, str(v)[:limit])
+                                                                     for k, v in kwargs.items()])
+        start_s = time.perf_counter()
+        try:
+            res = method(self, *args, **kwargs)
+        except Exception as e:
+            tracer.record(_shell_host_key(self), method.__name__, command, start_s, time.perf_counter(),
+                          type(e).__name__)
+            raise
+        tracer.record(_shell_host_key(self), method.__name__, command, start_s, time.perf_counter(),
+                      res.return_code if isinstance(res, ShellExecResult) else None)
+        return res
+
+    return wrapper
+
+
+def _shell_host_key(shell):
+    """
+    Identifier of the host a shell runs on.
+
+    :param shell:   Shell
+
+    :return: "user@host" for a remote shell, else "localhost"
+    """
+    if isinstance(shell, RemoteShell):
+        return "%s@%s" % (shell.user, shell.host)
+    else:
+        return "localhost"
+
+
+def _direct_spawn_argv(command):
+    """
+    Determine the argument vector with which the command can be spawned directly (i.e., without a shell).
+
+    :param command:     Command string (e.g., "ls -l") or argument vector (e.g., ["ls", "-l"])
+
+    :return: 2-tuple of (1) argument vector and (2) resolved executable path,
+             or None if the command must go through the shell
+    """
+    if isinstance(command, str):
+        if any(c in _SHELL_META_CHARACTERS for c in command):
+            return None
+        # Like the shell, only split on spaces (tabs and newlines are meta-characters above)
+        argv = [arg for arg in command.split(" ") if arg]
+    else:
+        argv = list(command)
+    if len(argv) == 0 or argv[0] in _SHELL_ONLY_BUILTINS:
+        return None
+    executable = shutil.which(argv[0])
+    if executable is None:
+        return None
+    return argv, executable
+
+
 def local_shell_exec(command, sync=True, output_redirect=None, remote_exec_prefix_arr=None):
     """
     Execute the command in the local shell.
 
-    :param command:                        Command (e.g., "ls")
+    Commands given as an argument vector, or as a plain string without any shell meta-characters,
+    are spawned directly without an intermediate /bin/sh. Anything else goes through the shell.
+
+    :param command:                        Command (e.g., "ls" or ["ls", "-l"])
     :param sync:                           True iff synchronized (i.e., wait till completion)
     :param output_redirect:                Where should the output be directed to
     :param remote_exec_prefix_arr:         Array of ["ssh", "a@b"] to prefix
@@ -104,18 +375,31 @@ def local_shell_exec(command, sync=True, output_redirect=None, remote_exec_prefi
         else:
             output_redirect = OutputRedirect.PIPE_VARIABLE
 
+    # An argument vector is quoted into a single command string whenever a shell interprets it
+    if isinstance(command, str):
+        command_str = command
+    else:
+        command_str = " ".join(shlex.quote(arg) for arg in command)
+
     # Small safety built-in
-    stripped_command = command.strip()
+    stripped_command = command_str.strip()
     if stripped_command in ["rm -rf /", "rm -r /", "rm -rf ~", "rm -r ~", "rm -rf ~/", "rm -r ~/", "rm -rf *",
                             "rm -rf /*", "rm -rf ~/*", "rm -rf /*/", "rm -rf ~/*/", "rm -r *"]:
         raise ValueError("Refusal to remove root directory or home directory.")
 
     # Compose the actual command
+    executable = None
     if remote_exec_prefix_arr is None:
-        actual_command = command
-        enable_shell = True
+        direct = _direct_spawn_argv(command)
+        if direct is None:
+            actual_command = command_str
+            enable_shell = True
+        else:
+            actual_command, executable = direct
+            enable_shell = False
     else:
-        actual_command = remote_exec_prefix_arr + [command]
+        actual_command = remote_exec_prefix_arr + [command_str]
+        executable = shutil.which(remote_exec_prefix_arr[0])
         enable_shell = False
 
     # Determine output redirection
@@ -136,9 +420,20 @@ def local_shell_exec(command, sync=True, output_redirect=None, remote_exec_prefi
     else:
         raise ValueError("Invalid output redirect value: " + str(output_redirect))
 
+    # Directly spawned commands (including the remote prefix) do not need to close file descriptors, as Python
+    # only creates non-inheritable ones (PEP 446), which permits subprocess to use the faster posix_spawn()
+    close_fds = executable is None
+
     # Execute the command
     if sync:
-        proc = subprocess.run(actual_command, stdout=set_stdout, stderr=set_stderr, shell=enable_shell)
+        try:
+            proc = subprocess.run(actual_command, stdout=set_stdout, stderr=set_stderr, shell=enable_shell,
+                                  executable=executable, close_fds=close_fds)
+        except OSError as e:
+            # Executable without a shebang line, which only the shell runs (as a shell script)
+            if e.errno != errno.ENOEXEC or remote_exec_prefix_arr is not None:
+                raise
+            proc = subprocess.run(command_str, stdout=set_stdout, stderr=set_stderr, shell=True)
         if output_redirect == OutputRedirect.SIMPLE_STRING:
             output = proc.stdout.decode("utf-8")
         else:
@@ -146,10 +441,250 @@ def local_shell_exec(command, sync=True, output_redirect=None, remote_exec_prefi
         return ShellExecResult(proc.returncode, output, proc)
 
     else:
-        proc = subprocess.Popen(actual_command, stdout=set_stdout, stderr=set_stderr, shell=enable_shell)
+        try:
+            proc = subprocess.Popen(actual_command, stdout=set_stdout, stderr=set_stderr, shell=enable_shell,
+                                    executable=executable, close_fds=close_fds)
+        except OSError as e:
+            if e.errno != errno.ENOEXEC or remote_exec_prefix_arr is not None:
+                raise
+            proc = subprocess.Popen(command_str, stdout=set_stdout, stderr=set_stderr, shell=True)
         return ShellExecResult(-1, "", proc)
 
 
+class ShellExecWaiter:
+
+    def __init__(self, results=()):
+        """
+        Waiter for many asynchronously started commands (i.e., ShellExecResult of exec with sync=False).
+
+        It blocks (without busy-looping) until any or all processes have finished. Process termination is
+        detected using a pidfd (Linux 5.3+, Python 3.9+), else by polling with an increasing interval.
+        In the meanwhile, the PIPE_VARIABLE output of all processes is drained such that none block on a full pipe.
+        Once finished, the return code and output (stdout followed by stderr) of the ShellExecResult are filled in.
+
+        :param results:     Iterable of ShellExecResult
+        """
+        self.selector = selectors.DefaultSelector()
+        self.states = {}
+        for res in results:
+            self.add(res)
+
+    def add(self, res):
+        """
+        Add an asynchronously started command to wait for.
+
+        :param res:     ShellExecResult returned by an exec with sync=False
+        """
+        if not isinstance(res.process, subprocess.Popen):
+            raise ValueError("Result is not of an asynchronously started command: " + str(res))
+        if id(res) in self.states:
+            return
+        state = {"res": res, "open": 0, "stdout": [], "stderr": [], "pidfd": None}
+        self.states[id(res)] = state
+        for name, stream in [("stdout", res.process.stdout), ("stderr", res.process.stderr)]:
+            if stream is not None:
+                self.selector.register(stream.fileno(), selectors.EVENT_READ, (state, name))
+                state["open"] += 1
+        if hasattr(os, "pidfd_open") and res.process.returncode is None:
+            try:
+                state["pidfd"] = os.pidfd_open(res.process.pid)
+                self.selector.register(state["pidfd"], selectors.EVENT_READ, (state, "pidfd"))
+            except OSError:
+                state["pidfd"] = None
+
+    def pending(self):
+        """
+        :return: List of ShellExecResult which have not finished yet
+        """
+        return [state["res"] for state in self.states.values()]
+
+    def _finish_if_done(self, state, finished):
+        res = state["res"]
+        if state["open"] > 0:
+            return
+        if res.process.returncode is None:
+            if state["pidfd"] is not None or res.process.poll() is None:
+                return
+        res.return_code = res.process.returncode
+        res.output = b"".join(state["stdout"]).decode("utf-8") + b"".join(state["stderr"]).decode("utf-8")
+        del self.states[id(res)]
+        finished.append(res)
+
+    def _wait(self, until_any, timeout_s):
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        poll_interval_s = 0.001
+        finished = []
+        for state in list(self.states.values()):
+            self._finish_if_done(state, finished)
+        while len(self.states) > 0 and not (until_any and len(finished) > 0):
+
+            # Determine how long to block (polling only needed for processes without pidfd or pipes)
+            block_s = None
+            if any(state["pidfd"] is None and state["open"] == 0 for state in self.states.values()):
+                block_s = poll_interval_s
+                poll_interval_s = min(0.1, poll_interval_s * 2)
+            if deadline is not None:
+                remaining_s = max(0.0, deadline - time.monotonic())
+                block_s = remaining_s if block_s is None else min(block_s, remaining_s)
+
+            # Drain output and detect exits
+            for key, _ in self.selector.select(block_s):
+                state, name = key.data
+                if name == "pidfd":
+                    self.selector.unregister(state["pidfd"])
+                    os.close(state["pidfd"])
+                    state["pidfd"] = None
+                    state["res"].process.wait()
+                else:
+                    data = os.read(key.fd, 65536)
+                    if len(data) == 0:
+                        self.selector.unregister(key.fd)
+                        getattr(state["res"].process, name).close()
+                        state["open"] -= 1
+                    else:
+                        state[name].append(data)
+                self._finish_if_done(state, finished)
+            for state in list(self.states.values()):
+                if state["pidfd"] is None and state["open"] == 0:
+                    self._finish_if_done(state, finished)
+
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        return finished
+
+    def wait_any(self, timeout_s=None):
+        """
+        Wait until at least one of the pending commands has finished.
+
+        :param timeout_s:   Timeout in seconds (None: no timeout)
+
+        :return: List of ShellExecResult which finished (empty iff timed out or none pending)
+        """
+        return self._wait(True, timeout_s)
+
+    def wait_all(self, timeout_s=None):
+        """
+        Wait until all pending commands have finished.
+
+        :param timeout_s:   Timeout in seconds (None: no timeout)
+
+        :return: List of ShellExecResult which finished (in order of finishing);
+                 upon a timeout the remaining ones can be retrieved using pending()
+        """
+        return self._wait(False, timeout_s)
+
+
+def _host_info_command(work_dir):
+    """
+    Single command which prints all host information as key=value lines.
+
+    :param work_dir:    Work directory of which the free disk space is determined
+
+    :return: Command string
+    """
+    return (
+        "echo \"num_cores=$(nproc)\"; "
+        "echo \"load_avg=$(cut -d ' ' -f 1-3 /proc/loadavg)\"; "
+        "echo \"mem_available_kb=$(awk '/^MemAvailable:/ {print $2}' /proc/meminfo)\"; "
+        "echo \"disk_free_kb=$(df -Pk %s | awk 'NR==2 {print $4}')\"; "
+        "echo \"num_screens=$(screen -ls 2>/dev/null | grep -c '(Detached)')\"; "
+        "exit 0" % work_dir
+    )
+
+
+def _parse_host_info(output):
+    """
+    Parse the output of the host information command.
+
+    :param output:  Output of the command of _host_info_command()
+
+    :return: HostInfo
+    """
+    values = {}
+    for line in output.strip().split("\n"):
+        key_value = line.split("=")
+        if len(key_value) == 2:
+            values[key_value[0].strip()] = key_value[1].strip()
+    try:
+        return HostInfo(
+            int(values["num_cores"]),
+            tuple(float(x) for x in values["load_avg"].split()),
+            int(values["mem_available_kb"]) * 1024,
+            int(values["disk_free_kb"]) * 1024,
+            int(values["num_screens"])
+        )
+    except (KeyError, ValueError):
+        raise ValueError("Unable to parse host information from output: " + output)
+
+
+# Comparison operators supported by the CSV row filters which are pushed down to the host
+_CSV_PUSHDOWN_OPERATORS = ["==", "!=", "<", "<=", ">", ">="]
+
+
+def _csv_pushdown_command(csv_filename, formats, columns, row_filters, compress):
+    """
+    Command which projects and filters the CSV file on the host using awk.
+    The shape of each line, the index integer constraint and the positive constraints are checked as well.
+
+    :param csv_filename:    CSV filename (on the host)
+    :param formats:         List of formats (from CsvSchema.formats)
+    :param columns:         List of column indices to output
+    :param row_filters:     List of (column index, operator, value) which all must hold for a row to be output
+    :param compress:        True iff to compress the output using gzip
+
+    :return: Command string
+    """
+    variables = []
+    checks = []
+    for j in range(len(formats)):
+        if formats[j] == "idx_int":
+            checks.append(
+                "if ($%d + 0 != NR - 1) fail(\"Index integer constraint violated on line \" (NR - 1))" % (j + 1)
+            )
+        elif formats[j] == "pos_int" or formats[j] == "pos_float":
+            checks.append("if ($%d + 0 < 0) fail(\"Value is not positive on line \" (NR - 1))" % (j + 1))
+    conditions = []
+    for k, (j, operator, value) in enumerate(row_filters):
+        if j < 0 or j >= len(formats):
+            raise ValueError("Row filter column index out of range: " + str(j))
+        if operator not in _CSV_PUSHDOWN_OPERATORS:
+            raise ValueError("Row filter operator must be one of: " + ", ".join(_CSV_PUSHDOWN_OPERATORS))
+        variables.append("-v %s" % shlex.quote("v%d=%s" % (k, str(value))))
+        nullable = formats[j].startswith("nullable_")
+        if formats[j] in ("string", "nullable_string"):
+            # Concatenating "" forces a string comparison, even if both sides look like numbers
+            condition = "(trim($%d) \"\") %s (v%d \"\")" % (j + 1, operator, k)
+        else:
+            condition = "($%d + 0) %s (v%d + 0)" % (j + 1, operator, k)
+
+        # As when reading locally, a missing value (of a nullable column) does not match any ordering
+        if nullable and operator not in ("==", "!="):
+            condition = "(trim($%d) != \"\" && %s)" % (j + 1, condition)
+        conditions.append(condition)
+    program = (
+        "function trim(s) { gsub(/^[ \\t\\r]+|[ \\t\\r]+$/, \"\", s); return s } "
+        "function fail(m) { print \"exputil-error: \" m > \"/dev/stderr\"; exit 3 } "
+        "{ if ((NF == 0 ? 1 : NF) != %d) fail(\"line split length does not match format length on line \" (NR - 1)); "
+        "%s"
+        "if (%s) print %s }"
+    ) % (
+        len(formats),
+        "".join(check + "; " for check in checks),
+        " && ".join(conditions) if len(conditions) > 0 else "1",
+        " \",\" ".join("$%d" % (j + 1) for j in columns)
+    )
+    command = "awk -F, %s%s %s" % (
+        "".join(variable + " " for variable in variables),
+        shlex.quote(program),
+        csv_filename
+    )
+    if compress:
+        # The exit code of a pipeline is that of gzip, so a failure of awk is reported on stderr instead
+        # (as "set -o pipefail" is not available in every shell)
+        command = "{ %s || echo \"exputil-exit: $?\" >&2; } | gzip -c -1" % command
+    return command
+
+
 class Shell(ABC):
 
     @staticmethod
@@ -168,7 +703,7 @@ class Shell(ABC):
         """
         Execute the command.
 
-        :param command:           Bash command
+        :param command:           Bash command (or argument vector, e.g., ["ls", "-l"])
         :param sync:              True iff if the command should be done synchronously
         :param output_redirect:   Output redirection
 
@@ -176,6 +711,7 @@ class Shell(ABC):
         """
         pass  # Abstract method
     
+    @_traced
     def perfect_exec(self, command, output_redirect=OutputRedirect.SIMPLE_STRING) -> ShellExecResult:
         """
         Execute the command synchronously and by default with output.
@@ -194,6 +730,7 @@ class Shell(ABC):
         self._raise_if_invalid_or_fail(res)
         return res
 
+    @_traced
     def valid_exec(self, command, output_redirect=OutputRedirect.SIMPLE_STRING) -> ShellExecResult:
         """
         Execute the command synchronously and by default with output.
@@ -211,44 +748,57 @@ class Shell(ABC):
         self._raise_if_invalid(res)
         return res
 
+    @_traced
     def count_screens(self):
         res = self.valid_exec("screen -ls")
         return res.output.count("(Detached)")
 
+    @_traced
     def detached_exec(self, command, keep_alive=False):
         return self.perfect_exec("screen -d -m bash -c \"%s%s\"" % (json.dumps(command)[1:-1], "; exec bash;" if keep_alive else ""))
 
+    @_traced
     def killall(self, process_name):
         return self.valid_exec("killall %s" % process_name)
 
+    @_traced
     def make_dir(self, directory):
         return self.perfect_exec("mkdir %s" % directory)
 
+    @_traced
     def make_full_dir(self, directory):
         return self.perfect_exec("mkdir -p %s" % directory)
 
+    @_traced
     def write_file(self, file_path, content=""):
         return self.perfect_exec("echo \"%s\" > %s" % (json.dumps(content)[1:-1], file_path))
 
+    @_traced
     def read_file(self, file_path):
         res = self.perfect_exec("cat %s" % file_path)
         return res.output
 
+    @_traced
     def move(self, from_path, to_path):
         return self.perfect_exec("mv %s %s" % (from_path, to_path))
 
+    @_traced
     def remove(self, path):
         return self.perfect_exec("rm %s" % path)
 
+    @_traced
     def remove_force(self, path):
         return self.perfect_exec("rm -f %s" % path)
 
+    @_traced
     def remove_recursive(self, path):
         return self.perfect_exec("rm -r %s" % path)
 
+    @_traced
     def remove_force_recursive(self, path):
         return self.perfect_exec("rm -rf %s" % path)
 
+    @_traced
     def rsync(self, source_dir, target_dir, exclude=None, delete=False):
         exclude_str = ""
         if exclude is not None:
@@ -256,9 +806,11 @@ class Shell(ABC):
                 exclude_str += " --exclude %s" % exclude_value
         return self.perfect_exec("rsync -ravh %s %s%s%s" % (source_dir, target_dir, exclude_str, " --delete" if delete else ""))
 
+    @_traced
     def copy_file(self, source_file, target_path):
         return self.perfect_exec("scp %s %s" % (source_file, target_path))
 
+    @_traced
     def sed_replace_in_file_plain(self, target_file, search_term, replace_term):
         return self.perfect_exec("sed -i'.original' "
                                  "'s/"
@@ -267,14 +819,87 @@ class Shell(ABC):
                                  + replace_term.replace("\\", "\\\\").replace("/", "\\/").replace("&", "\\&")
                                  + "/g' " + target_file + "; rm " + target_file + ".original")
 
+    @_traced
     def path_exists(self, path):
         res = self.valid_exec("if [ -d \"%s\" ]; then exit 0; else exit 1; fi" % path.replace('"', '\\"'))
         return res.return_code == 0
 
+    @_traced
     def file_exists(self, file_path):
         res = self.valid_exec("if [ -f \"%s\" ]; then exit 0; else exit 1; fi" % file_path.replace('"', '\\"'))
         return res.return_code == 0
 
+    @_traced
+    def file_sha256(self, file_path):
+        return _parse_sha256sum(self.valid_exec("sha256sum %s" % file_path))
+
+    @_traced
+    def host_info(self, work_dir=".") -> HostInfo:
+        """
+        Retrieve the host information (core count, load average, available memory,
+        free disk space of the work directory and number of detached screens) in a single command.
+
+        :param work_dir:    Work directory of which the free disk space is determined
+
+        :return: HostInfo
+        """
+        return _parse_host_info(self.perfect_exec(_host_info_command(work_dir)).output)
+
+    @_traced
+    def read_csv_in_columns(self, csv_filename, line_values_format, columns=None, row_filters=None, compress=True):
+        """
+        Read in the CSV file on the host into columns, with the column selection and row filtering done on the host.
+        Only the reduced (and by default compressed) data is transferred back and parsed.
+
+        The shape of each line, the index integer constraint and positive constraints are checked for all columns,
+        however only the values of the selected columns are parsed (and as such checked to be well-formed).
+
+        :param csv_filename:        CSV filename (on the host)
+        :param line_values_format:  Line format as such: "[int,idx_int,pos_int,float,pos_float,string]+"
+                                    (or a CsvSchema, of which the additional value formats are parsed locally)
+        :param columns:             List of column indices to return (None: all columns)
+        :param row_filters:         List of (column index, operator, value) which must all hold for a row to be kept,
+                                    with operator one of: ==, !=, <, <=, >, >=
+                                    (e.g., [(2, ">=", 0), (3, "==", "abc")]).
+                                    String columns are compared as strings, others numerically.
+        :param compress:            True iff to compress the data using gzip for the transfer
+
+        :return: Array of data column arrays (in the order of the selected columns)
+        """
+        schema = _to_csv_schema(line_values_format)
+        formats = schema.formats
+        if columns is None:
+            columns = list(range(len(formats)))
+        for j in columns:
+            if j < 0 or j >= len(formats):
+                raise ValueError("Column index out of range: " + str(j))
+        command = _csv_pushdown_command(
+            csv_filename, formats, columns, [] if row_filters is None else row_filters, compress
+        )
+        res = self.exec(command, sync=True, output_redirect=OutputRedirect.PIPE_VARIABLE)
+        error = res.process.stderr.decode("utf-8")
+        res.output = error
+        self._raise_if_invalid(res)
+        if "exputil-error: " in error:
+            raise ValueError("Error in CSV file %s: %s" % (
+                csv_filename, error.split("exputil-error: ")[1].splitlines()[0].strip()
+            ))
+
+        # Other output on stderr (e.g., SSH warnings or login banners) is not an error by itself
+        if res.return_code != 0 or "exputil-exit: " in error:
+            raise FailedCommandError(error, res)
+        data = res.process.stdout
+        if compress:
+            data = gzip.decompress(data)
+
+        # The index integer constraint was checked on the host against the original line numbers
+        # (only split on newlines, as other line boundaries such as \r or \x0c can be part of a value)
+        lines = data.decode("utf-8").split("\n")
+        if data[-1:] == b"\n" or len(data) == 0:
+            lines.pop()
+        return _read_lines_in_columns(lines, schema.select(columns))
+
+    @_traced
     def get_direct_sub_dirs(self, target_dir):
         res = self.perfect_exec("for f in %s/*; do if [ -d \"$f\" ]; then echo ${f}; fi; done" % target_dir)
         if len(res.output.strip()) == 0:
@@ -288,6 +913,7 @@ class LocalShell(Shell):
     # def __init__(self):
     # For now, local shell is just default constructor
 
+    @_traced
     def exec(self, command, sync=True, output_redirect=None) -> ShellExecResult:
         return local_shell_exec(command, sync, output_redirect)
 
@@ -299,5 +925,175 @@ class RemoteShell(Shell):
         self.host = host
         self.remote = ["ssh", "%s@%s" % (self.user, self.host)]
 
+    @_traced
     def exec(self, command, sync=True, output_redirect=None) -> ShellExecResult:
         return local_shell_exec(command, sync, output_redirect, self.remote)
+
+    def _upload_argv(self, source_file, target_file):
+        """
+        Argument vector, run locally, which copies a local file to this host.
+
+        :param source_file:     Local source file
+        :param target_file:     Target file on this host
+
+        :return: Argument vector
+        """
+        return ["scp", source_file, "%s@%s:%s" % (self.user, self.host, target_file)]
+
+    def _forward_command(self, source_file, target_shell, target_file):
+        """
+        Command, run on this host, which copies a file of this host to another host.
+
+        :param source_file:     Source file on this host
+        :param target_shell:    RemoteShell of the other host
+        :param target_file:     Target file on the other host
+
+        :return: Command string
+        """
+        return "scp %s %s@%s:%s" % (source_file, target_shell.user, target_shell.host, target_file)
+
+
+def _parse_sha256sum(res):
+    """
+    Parse the SHA-256 hash out of the result of "sha256sum <file>".
+
+    :param res:     ShellExecResult
+
+    :return: Hexadecimal SHA-256 hash (None if the file could not be hashed)
+    """
+    if res.return_code != 0:
+        return None
+    return res.output.split()[0]
+
+
+def _broadcast_tree_levels(num_hosts, branching_factor):
+    """
+    Arrange hosts in a fan-out tree, in which host i forwards to hosts i * b + 1, ..., i * b + b.
+
+    :param num_hosts:           Number of hosts
+    :param branching_factor:    Branching factor b
+
+    :return: List of levels, each level a list of (parent index or None for the local node, child index)
+    """
+    levels = []
+    if num_hosts > 0:
+        levels.append([(None, 0)])
+    start = 0
+    end = 1
+    while end < num_hosts:
+        level = []
+        for parent in range(start, end):
+            for child in range(parent * branching_factor + 1, parent * branching_factor + branching_factor + 1):
+                if child < num_hosts:
+                    level.append((parent, child))
+        levels.append(level)
+        start = end
+        end = min(num_hosts, end + len(level))
+    return levels
+
+
+def broadcast_file(source_file, remote_shells, target_file, branching_factor=2):
+    """
+    Broadcast a local file to many remote hosts.
+
+    The file is uploaded only once from the local node. The hosts which received it forward it
+    to the next hosts (host-to-host scp) in a fan-out tree, such that the distribution time grows
+    logarithmically with the number of hosts. Hosts which already hold a file with the same
+    SHA-256 hash at the target path are skipped.
+
+    The hosts must be able to ssh into each other.
+
+    :param source_file:         Local source file
+    :param remote_shells:       List of RemoteShell instances
+    :param target_file:         Target file path (same on each host)
+    :param branching_factor:    Number of hosts each host forwards to (at least 1)
+
+    :return: Dictionary of "user@host" to True iff transferred (else False, it was skipped as it already held the file)
+    """
+    if branching_factor < 1:
+        raise ValueError("Branching factor must be at least 1: " + str(branching_factor))
+    for remote_shell in remote_shells:
+        if not isinstance(remote_shell, RemoteShell):
+            raise ValueError("Can only broadcast to remote shells: " + str(remote_shell))
+
+    # Content hash of the source file
+    sha256 = hashlib.sha256()
+    with open(source_file, "rb") as f_in:
+        for block in iter(lambda: f_in.read(1 << 20), b""):
+            sha256.update(block)
+    source_hash = sha256.hexdigest()
+
+    # Determine in parallel which hosts do not yet hold the file
+    hash_results = [
+        remote_shell.exec("sha256sum %s" % target_file, sync=False, output_redirect=OutputRedirect.PIPE_VARIABLE)
+        for remote_shell in remote_shells
+    ]
+    ShellExecWaiter(hash_results).wait_all()
+    status = {}
+    pending = []
+    for remote_shell, res in zip(remote_shells, hash_results):
+        Shell._raise_if_invalid(res)
+        if _parse_sha256sum(res) == source_hash:
+            status[_shell_host_key(remote_shell)] = False
+        else:
+            pending.append(remote_shell)
+
+    # Transfer level-by-level down the tree
+    for level in _broadcast_tree_levels(len(pending), branching_factor):
+        results = []
+        for parent, child in level:
+            if parent is None:
+                results.append(local_shell_exec(pending[child]._upload_argv(source_file, target_file), sync=False))
+            else:
+                results.append(pending[parent].exec(
+                    pending[parent]._forward_command(target_file, pending[child], target_file), sync=False
+                ))
+        ShellExecWaiter(results).wait_all()
+        for res in results:
+            Shell._raise_if_invalid_or_fail(res)
+        for _, child in level:
+            status[_shell_host_key(pending[child])] = True
+
+    return status
+
+
+class HostInfoCache:
+
+    def __init__(self, ttl_s=60.0, work_dir="."):
+        """
+        Cache of the host information of many shells, which is retrieved in parallel.
+
+        :param ttl_s:       Time-to-live (in seconds) of a cached host information
+        :param work_dir:    Work directory of which the free disk space is determined
+        """
+        if ttl_s < 0:
+            raise ValueError("Time-to-live cannot be negative: " + str(ttl_s))
+        self.ttl_s = ttl_s
+        self.work_dir = work_dir
+        self.entries = {}
+
+    def get(self, shells):
+        """
+        Retrieve the host information of each shell.
+        Only the hosts without a cached host information younger than the time-to-live are queried (in parallel).
+
+        :param shells:  List of shells
+
+        :return: List of HostInfo (in the same order as the shells)
+        """
+        now = time.monotonic()
+        stale = {}
+        for shell in shells:
+            key = _shell_host_key(shell)
+            if key not in stale and (key not in self.entries or now - self.entries[key][0] >= self.ttl_s):
+                stale[key] = shell.exec(
+                    _host_info_command(self.work_dir), sync=False, output_redirect=OutputRedirect.PIPE_VARIABLE
+                )
+        ShellExecWaiter(stale.values()).wait_all()
+        for key, res in stale.items():
+            Shell._raise_if_invalid_or_fail(res)
+            self.entries[key] = (time.monotonic(), _parse_host_info(res.output))
+        return [self.entries[_shell_host_key(shell)][1] for shell in shells]
+
+    def invalidate(self):
+        self.entries = {}
@@ -0,0 +1,90 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import shlex
+from .shell import RemoteShell
+
+
+class SimulatedRemoteShell(RemoteShell):
+
+    def __init__(self, user, host, root_dir, latency_s=0.0, bandwidth_byte_per_s=None, failure_rate=0.0):
+        """
+        Remote shell which does not connect over SSH, but instead runs the commands locally as if on the named host.
+        Each host has its own directory (root_dir/host), which is the working and home directory of the commands.
+        This makes it possible to test and benchmark remote shell functionality on a single machine.
+
+        Only the commands run via exec are simulated, as well as the copies of broadcast_file to the host
+        (which incur the latency and bandwidth of the host). Other transfers (e.g., rsync or scp) to
+        "user@host:path" are not.
+
+        :param user:                    User name
+        :param host:                    Simulated host name
+        :param root_dir:                Local directory in which the directory of each host is created
+        :param latency_s:               Connection setup latency (in seconds) injected before each command
+        :param bandwidth_byte_per_s:    Bandwidth (in byte/s) with which the output is returned and files are
+                                        copied to the host (None: unlimited)
+        :param failure_rate:            Probability in [0.0, 1.0] that the connection fails (with exit code 255)
+        """
+        super().__init__(user, host)
+        if latency_s < 0:
+            raise ValueError("Latency cannot be negative: " + str(latency_s))
+        if bandwidth_byte_per_s is not None and bandwidth_byte_per_s <= 0:
+            raise ValueError("Bandwidth must be positive: " + str(bandwidth_byte_per_s))
+        if failure_rate < 0.0 or failure_rate > 1.0:
+            raise ValueError("Failure rate is not in range [0.0, 1.0]: " + str(failure_rate))
+        self.host_dir = os.path.abspath(os.path.join(root_dir, host))
+        os.makedirs(self.host_dir, exist_ok=True)
+        self.simulator = [
+            sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "_ssh_simulator_exec.py"),
+            "--host", host,
+            "--host-dir", self.host_dir,
+            "--latency-s", str(latency_s),
+            "--bandwidth-byte-per-s", str(0 if bandwidth_byte_per_s is None else bandwidth_byte_per_s),
+            "--failure-rate", str(failure_rate)
+        ]
+
+        # The command follows after "--", such that it can start with a dash (as with ssh)
+        self.remote = self.simulator + ["--"]
+
+    def _copy_argv(self, source_file, target_file):
+        """
+        Argument vector which copies a file to this host over the simulated connection.
+
+        :param source_file:     Source file (relative to the working directory of whoever runs it)
+        :param target_file:     Target file on this host
+
+        :return: Argument vector
+        """
+        return self.simulator + [
+            "--copy-source", source_file,
+            "--copy-target", os.path.join(self.host_dir, target_file)
+        ]
+
+    def _upload_argv(self, source_file, target_file):
+        return self._copy_argv(source_file, target_file)
+
+    def _forward_command(self, source_file, target_shell, target_file):
+        if not isinstance(target_shell, SimulatedRemoteShell):
+            return super()._forward_command(source_file, target_shell, target_file)
+        return " ".join(shlex.quote(arg) for arg in target_shell._copy_argv(source_file, target_file))
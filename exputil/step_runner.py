@@ -0,0 +1,165 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import json
+import hashlib
+from .shell import Shell
+
+
+def _hash_local_path(sha256, path):
+    """
+    Update the hash with the path and the content of the local file, or of all files in the local directory.
+
+    :param sha256:  Hash object
+    :param path:    Local file or directory path
+    """
+    if os.path.isdir(path):
+        sha256.update(("dir:%s\n" % path).encode("utf-8"))
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                _hash_local_path(sha256, os.path.join(dir_path, file_name))
+    elif os.path.isfile(path):
+        sha256.update(("file:%s\n" % path).encode("utf-8"))
+        with open(path, "rb") as f_in:
+            for block in iter(lambda: f_in.read(1 << 20), b""):
+                sha256.update(block)
+    else:
+        raise ValueError("Input path does not exist: " + str(path))
+
+
+class StepRunner:
+
+    def __init__(self, shell, manifest_filename):
+        """
+        Runner of experiment steps, which skips a step if it was already done with the same inputs.
+
+        For each completed step, the hash of its inputs (and of its command, if it is a command string)
+        is stored in a local manifest file. A step is skipped iff this hash matches the one in the manifest
+        and all its outputs exist.
+
+        :param shell:               Shell on which the steps are run (and the outputs are checked)
+        :param manifest_filename:   Local manifest filename (JSON, created if it does not exist)
+        """
+        if not isinstance(shell, Shell):
+            raise ValueError("Shell must be a Shell: " + str(shell))
+        self.shell = shell
+        self.manifest_filename = manifest_filename
+        self.manifest = {}
+        if os.path.exists(manifest_filename):
+            with open(manifest_filename, "r") as f_in:
+                self.manifest = json.load(f_in)
+
+    def _save_manifest(self):
+        temp_filename = self.manifest_filename + ".temp"
+        with open(temp_filename, "w+") as f_out:
+            json.dump(self.manifest, f_out, indent=4, sort_keys=True)
+        os.replace(temp_filename, self.manifest_filename)
+
+    @staticmethod
+    def input_hash(input_paths=(), parameters=None, action=None):
+        """
+        Calculate the hash of the inputs of a step.
+
+        :param input_paths:     Local input file or directory paths
+        :param parameters:      JSON-serializable parameters (e.g., dictionary)
+        :param action:          Action of the step (only part of the hash if it is a command string)
+
+        :return: Hexadecimal SHA-256 hash
+        """
+        sha256 = hashlib.sha256()
+        sha256.update(json.dumps(parameters, sort_keys=True).encode("utf-8"))
+        if isinstance(action, str):
+            sha256.update(("command:%s\n" % action).encode("utf-8"))
+        for path in input_paths:
+            _hash_local_path(sha256, path)
+        return sha256.hexdigest()
+
+    def is_done(self, name, input_paths=(), parameters=None, output_paths=(), action=None):
+        """
+        Check whether a step is done, i.e., the hash of its inputs matches the manifest and all its outputs exist.
+
+        :param name:            Unique step name
+        :param input_paths:     Local input file or directory paths
+        :param parameters:      JSON-serializable parameters
+        :param output_paths:    Output file or directory paths (on the shell)
+        :param action:          Action of the step (only part of the hash if it is a command string)
+
+        :return: True iff the step is done
+        """
+        return self._is_done(name, self.input_hash(input_paths, parameters, action), output_paths)
+
+    def _is_done(self, name, step_hash, output_paths):
+        if self.manifest.get(name) != step_hash:
+            return False
+        for path in output_paths:
+            if not self.shell.file_exists(path) and not self.shell.path_exists(path):
+                return False
+        return True
+
+    def run(self, name, action, input_paths=(), parameters=None, output_paths=()):
+        """
+        Run a step, unless it is already done.
+
+        The inputs are hashed before the step is run. If they are different after the step (i.e., they were
+        modified by the step or by someone else meanwhile), the step is not recorded as done and will run again.
+        Files which the step itself modifies should thus be declared as outputs rather than inputs.
+
+        :param name:            Unique step name
+        :param action:          Command string (run using perfect_exec), or function(shell) performing the step
+        :param input_paths:     Local input file or directory paths
+        :param parameters:      JSON-serializable parameters
+        :param output_paths:    Output file or directory paths (on the shell)
+
+        :return: True iff the step was run, False iff it was skipped
+        """
+        step_hash = self.input_hash(input_paths, parameters, action)
+        if self._is_done(name, step_hash, output_paths):
+            return False
+
+        # The step is no longer done until it finishes successfully
+        if name in self.manifest:
+            del self.manifest[name]
+            self._save_manifest()
+        if isinstance(action, str):
+            self.shell.perfect_exec(action)
+        else:
+            action(self.shell)
+
+        # Only record the step if it was run on the inputs as they are now
+        if self.input_hash(input_paths, parameters, action) == step_hash:
+            self.manifest[name] = step_hash
+            self._save_manifest()
+        return True
+
+    def invalidate(self, name=None):
+        """
+        Invalidate a step such that it will be run again.
+
+        :param name:    Step name (if None, all steps are invalidated)
+        """
+        if name is None:
+            self.manifest = {}
+        elif name in self.manifest:
+            del self.manifest[name]
+        self._save_manifest()
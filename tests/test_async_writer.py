@@ -0,0 +1,207 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import io
+import sys
+import threading
+import subprocess
+import unittest
+from exputil import *
+
+
+def read_content(filename):
+    with open(filename, "r") as f_in:
+        return f_in.read()
+
+
+class StallingFile(io.StringIO):
+
+    def __init__(self):
+        super().__init__()
+        self.stall = threading.Event()
+        self.content = None
+
+    def write(self, s):
+        self.stall.wait()
+        return super().write(s)
+
+    def close(self):
+        self.content = self.getvalue()
+        super().close()
+
+
+class FailingFile(io.StringIO):
+
+    def write(self, s):
+        raise OSError("Disk is full")
+
+
+class TestAsyncWriter(unittest.TestCase):
+
+    def test_write(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+
+        # Write, checkpoint and close
+        writer = AsyncWriter(open("temp/test.txt", "w+"))
+        expected = ""
+        for i in range(1000):
+            self.assertTrue(writer.write(str(i) + "\n"))
+            expected += str(i) + "\n"
+        writer.checkpoint()
+        self.assertEqual(expected, read_content("temp/test.txt"))
+        self.assertEqual(0, writer.queue_depth)
+        writer.write("end")
+        writer.close()
+        self.assertEqual(expected + "end", read_content("temp/test.txt"))
+        self.assertEqual(1001, writer.num_writes)
+        self.assertEqual(0, writer.num_dropped_writes)
+        self.assertTrue(1 <= writer.num_batches <= 1001)
+        writer.close()
+        try:
+            writer.write("more")
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        # Binary, via an InstantWriter
+        with AsyncWriter(InstantWriter(open("temp/test.txt", "wb+"), flush_every_num_bytes=5),
+                         flush_after_each_batch=False) as writer:
+            writer.write(b"abc")
+            writer.write(b"def")
+        self.assertEqual("abcdef", read_content("temp/test.txt"))
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_backpressure(self):
+
+        # Block: the writes wait for space once the queue is full
+        f = StallingFile()
+        writer = AsyncWriter(f, max_queue_size=3, backpressure="block")
+        thread = threading.Thread(target=lambda: [writer.write(str(i)) for i in range(10)])
+        thread.start()
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
+        self.assertTrue(writer.queue_depth <= 3)
+        f.stall.set()
+        thread.join()
+        writer.close()
+        self.assertEqual("0123456789", f.content)
+        self.assertEqual(3, writer.max_queue_depth)
+        self.assertEqual(0, writer.num_dropped_writes)
+
+        # Drop: writes which do not fit are discarded
+        f = StallingFile()
+        writer = AsyncWriter(f, max_queue_size=3, backpressure="drop")
+        self.assertTrue(writer.write("a"))
+        while writer.queue_depth > 0:  # Wait until the background thread holds the first write
+            pass
+        results = [writer.write(c) for c in "bcdef"]
+        self.assertEqual([True, True, True, False, False], results)
+        self.assertEqual(2, writer.num_dropped_writes)
+        f.stall.set()
+        writer.close()
+        self.assertEqual("abcd", f.content)
+        self.assertEqual(6, writer.num_writes + writer.num_dropped_writes)
+
+        # Grow: the queue is never full
+        f = StallingFile()
+        writer = AsyncWriter(f, max_queue_size=3, backpressure="grow")
+        for i in range(10):
+            self.assertTrue(writer.write(str(i)))
+        self.assertTrue(writer.max_queue_depth >= 9)
+        f.stall.set()
+        writer.close()
+        self.assertEqual("0123456789", f.content)
+
+    def test_multiple_producers(self):
+        for backpressure, max_queue_size in [("block", 5), ("drop", 5), ("grow", 5)]:
+            f = StallingFile()
+            f.stall.set()
+            writer = AsyncWriter(f, max_queue_size=max_queue_size, backpressure=backpressure)
+            threads = [
+                threading.Thread(target=lambda t=t: [writer.write("%d,%d\n" % (t, i)) for i in range(2000)])
+                for t in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            writer.close()
+            lines = f.content.splitlines()
+            self.assertEqual(16000, writer.num_writes + writer.num_dropped_writes)
+            self.assertEqual(writer.num_writes, len(lines))
+            if backpressure != "drop":
+                self.assertEqual(16000, len(set(lines)))
+            if backpressure != "grow":
+                self.assertTrue(writer.max_queue_depth <= max_queue_size)
+
+    def test_flush_at_exit(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        program = (
+            "import exputil\n"
+            "class Writer:\n"
+            "    def checkpoint(self):\n"
+            "        open('temp/test.txt', 'w').write('checkpoint')\n"
+            "writer = Writer()\n"
+            "exputil.register_flush_at_exit(writer)\n"
+            "unregistered = Writer()\n"
+            "exputil.register_flush_at_exit(unregistered)\n"
+            "exputil.unregister_flush_at_exit(unregistered)\n"
+            "async_writer = exputil.AsyncWriter(open('temp/async.txt', 'w'), flush_after_each_batch=False)\n"
+            "async_writer.write('abc')\n"
+        )
+        subprocess.check_call([sys.executable, "-c", program])
+        self.assertEqual("checkpoint", read_content("temp/test.txt"))
+        self.assertEqual("abc", read_content("temp/async.txt"))
+        local_shell.remove_force_recursive("temp")
+
+    def test_invalid(self):
+        for kwargs in [
+            {"backpressure": "abc"},
+            {"max_queue_size": 0},
+        ]:
+            try:
+                AsyncWriter(io.StringIO(), **kwargs)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        # Errors of the background thread surface in the caller
+        writer = AsyncWriter(FailingFile())
+        writer.write("abc")
+        try:
+            writer.checkpoint()
+            self.fail()
+        except OSError:
+            self.assertTrue(True)
+        try:
+            writer.write("abc")
+            self.fail()
+        except OSError:
+            self.assertTrue(True)
+        try:
+            writer.close()
+            self.fail()
+        except OSError:
+            self.assertTrue(True)
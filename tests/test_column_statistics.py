@@ -0,0 +1,187 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+import random
+import statistics
+from exputil import *
+
+
+class TestColumnStatistics(unittest.TestCase):
+
+    def test_quantile_sketch(self):
+        random.seed(12345)
+        values = [random.random() for _ in range(100000)]
+        sorted_values = sorted(values)
+
+        # One-by-one and in bulk
+        sketch_one = QuantileSketch(k=200)
+        for v in values:
+            sketch_one.add(v)
+        sketch_bulk = QuantileSketch(k=200)
+        for i in range(0, 100000, 7777):
+            sketch_bulk.extend(values[i:i + 7777])
+
+        # Merged from parts
+        parts = []
+        for i in range(10):
+            part = QuantileSketch(k=200, seed=i)
+            part.extend(values[i * 10000:(i + 1) * 10000])
+            parts.append(part)
+        sketch_merged = QuantileSketch(k=200)
+        for part in parts:
+            sketch_merged.merge(part)
+
+        for sketch in [sketch_one, sketch_bulk, sketch_merged]:
+            self.assertEqual(100000, sketch.count)
+            self.assertTrue(sum(len(level) for level in sketch.levels) < 3 * 200)
+            for q in [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]:
+                rank = sorted_values.index(sketch.quantile(q))
+                self.assertTrue(abs(rank - q * 100000) < 0.02 * 100000)
+
+        # Empty and invalid
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+        for k in [-1, 0, 1]:
+            try:
+                QuantileSketch(k=k)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+        for q in [-0.1, 1.1]:
+            try:
+                sketch_one.quantile(q)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+    def test_column_statistics(self):
+        random.seed(54321)
+        values = [random.randint(-1000, 1000) for _ in range(10000)]
+
+        # Updated in chunks, and merged from parts
+        stats_chunks = ColumnStatistics(histogram_bin_edges=[-1000, 0, 500, 1000])
+        for i in range(0, 10000, 3000):
+            stats_chunks.update(values[i:i + 3000])
+        stats_merged = ColumnStatistics(histogram_bin_edges=[-1000, 0, 500, 1000])
+        for i in range(0, 10000, 4000):
+            part = ColumnStatistics(histogram_bin_edges=[-1000, 0, 500, 1000])
+            part.update(values[i:i + 4000])
+            stats_merged.merge(part)
+        stats_merged.merge(ColumnStatistics(histogram_bin_edges=[-1000, 0, 500, 1000]))
+
+        for stats in [stats_chunks, stats_merged]:
+            self.assertEqual(10000, stats.count)
+            self.assertEqual(0, stats.num_missing)
+            self.assertEqual(min(values), stats.min)
+            self.assertEqual(max(values), stats.max)
+            self.assertAlmostEqual(statistics.mean(values), stats.mean)
+            self.assertAlmostEqual(statistics.pvariance(values), stats.variance())
+            self.assertAlmostEqual(statistics.variance(values), stats.variance(ddof=1))
+            self.assertAlmostEqual(statistics.stdev(values), stats.std(ddof=1))
+            self.assertEqual(min(values), stats.quantile(0.0))
+            self.assertEqual(max(values), stats.quantile(1.0))
+            self.assertTrue(abs(statistics.median(values) - stats.quantile(0.5)) < 50)
+            self.assertEqual([
+                len([v for v in values if -1000 <= v < 0]),
+                len([v for v in values if 0 <= v < 500]),
+                len([v for v in values if 500 <= v <= 1000]),
+            ], stats.histogram_counts)
+
+        # Missing values and no values
+        stats = ColumnStatistics()
+        stats.update([None, None])
+        self.assertEqual((0, 2, None, None, None, None), (
+            stats.count, stats.num_missing, stats.min, stats.mean, stats.variance(), stats.quantile(0.5)
+        ))
+        stats.update([None, 3.0])
+        self.assertEqual((1, 3, 3.0, 3.0, 0.0, None), (
+            stats.count, stats.num_missing, stats.max, stats.mean, stats.variance(), stats.variance(ddof=1)
+        ))
+
+        # Non-numeric
+        stats = ColumnStatistics(numeric=False)
+        stats.update(["b", "a", "c"])
+        self.assertEqual((3, "a", "c", None, None, None), (
+            stats.count, stats.min, stats.max, stats.mean, stats.variance(), stats.quantile(0.5)
+        ))
+
+        # Invalid
+        for edges in [[1], [1, 1], [2, 1, 3]]:
+            try:
+                ColumnStatistics(histogram_bin_edges=edges)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+        try:
+            ColumnStatistics().merge(ColumnStatistics(numeric=False))
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+    def test_csv_column_statistics(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        random.seed(999)
+        values = [[random.random() * 100.0 for _ in range(5000)], [random.choice(["a", "b"]) for _ in range(5000)]]
+        with open("temp/test.csv", "w+") as f_out:
+            f_out.write("id,value,name,extra\n")
+            for i in range(5000):
+                f_out.write("%d,%s,%s,%s\n" % (i, str(values[0][i]), values[1][i], "" if i % 10 == 0 else "1"))
+        line_values_format = CsvSchema("idx_int,pos_float,string,nullable_int")
+
+        all_stats = compute_csv_column_statistics("temp/test.csv", line_values_format, header=True,
+                                                  chunk_num_lines=999)
+        self.assertEqual(4, len(all_stats))
+        self.assertEqual([True, True, False, True], [s.numeric for s in all_stats])
+        self.assertEqual((5000, 0, 4999), (all_stats[0].count, all_stats[0].min, all_stats[0].max))
+        self.assertAlmostEqual(statistics.mean(values[0]), all_stats[1].mean)
+        self.assertAlmostEqual(statistics.pvariance(values[0]), all_stats[1].variance())
+        self.assertEqual(("a", "b"), (all_stats[2].min, all_stats[2].max))
+        self.assertEqual((4500, 500, 1.0), (all_stats[3].count, all_stats[3].num_missing, all_stats[3].mean))
+
+        # Selected columns, filters and histograms
+        value_stats, = compute_csv_column_statistics(
+            "temp/test.csv", line_values_format, lambda row: row[0] >= 10.0, columns=["value"], header=True,
+            row_filters=("name", "==", "a"), histogram_bin_edges=[[0.0, 50.0, 100.0]]
+        )
+        selected = [v for v, name in zip(values[0], values[1]) if name == "a" and v >= 10.0]
+        self.assertEqual(len(selected), value_stats.count)
+        self.assertAlmostEqual(statistics.mean(selected), value_stats.mean)
+        self.assertEqual([len([v for v in selected if v < 50.0]), len([v for v in selected if v >= 50.0])],
+                         value_stats.histogram_counts)
+        self.assertTrue(abs(statistics.median(selected) - value_stats.quantile(0.5)) < 2.0)
+
+        # Empty file
+        local_shell.write_file("temp/test.csv", "id,value,name,extra")
+        self.assertEqual([0, 0], [s.count for s in compute_csv_column_statistics(
+            "temp/test.csv", line_values_format, columns=[0, 1], header=True
+        )])
+
+        # Invalid histogram bin edges
+        try:
+            compute_csv_column_statistics("temp/test.csv", line_values_format, header=True,
+                                          histogram_bin_edges=[None])
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
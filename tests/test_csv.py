@@ -22,7 +22,55 @@
 
 import unittest
 import random
+import array
+import datetime
+import gzip
+import bz2
+import lzma
 from exputil import *
+from exputil.input_output import _read_csv_numpy
+
+try:
+    import numpy
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+try:
+    import zstandard
+    HAS_ZSTANDARD = True
+except ImportError:
+    HAS_ZSTANDARD = False
+
+
+def write_big_csv(filename, num_lines, seed):
+    random.seed(seed)
+    values = [[], [], [], [], [], []]
+    with open(filename, "w+") as f_out:
+        for i in range(num_lines):
+            values[0].append(i)
+            values[1].append(random.randint(-99999, 999999))
+            values[2].append(random.random() * 10000000.0 - 5000000.0)
+            values[3].append("a" * random.randint(0, 30))
+            values[4].append(random.randint(0, 999999))
+            values[5].append(random.random() * 10000000.0)
+            f_out.write(str(values[0][i]) + "," + str(values[1][i]) + "," + str(values[2][i]) + "," + values[3][i]
+                        + "," + str(values[4][i]) + "," + str(values[5][i]) + "\n")
+    return values
+
+
+def parse_percentage(str_value):
+    stripped = str_value.strip()
+    if not stripped.endswith("%"):
+        raise ValueError("Not a percentage: " + str_value)
+    return float(stripped[:-1]) / 100.0
+
+
+def format_percentage(value):
+    return str(value * 100.0) + "%"
+
+
+def run_identifier(csv_filename):
+    return int(csv_filename.split("/")[1].split("_")[1])
 
 
 class TestCsv(unittest.TestCase):
@@ -286,3 +334,808 @@ class TestCsv(unittest.TestCase):
         except ValueError:
             self.assertTrue(True)
 
+    @unittest.skipIf(not HAS_NUMPY, "NumPy is not installed")
+    def test_csv_numpy_engine(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+
+        # Normal
+        local_shell.write_file("temp/test.csv", "a,b,10,-9.3\nabc,def ,-100000,30.24")
+        data_columns = read_csv_direct_in_columns("temp/test.csv", "string,string,int,float", engine="numpy")
+        self.assertEqual(numpy.int64, data_columns[2].dtype)
+        self.assertEqual(numpy.float64, data_columns[3].dtype)
+        self.assertEqual(
+            read_csv_direct_in_columns("temp/test.csv", "string,string,int,float"),
+            [c.tolist() for c in data_columns]
+        )
+
+        # Empty line and empty file
+        local_shell.write_file("temp/test.csv", "")
+        self.assertEqual([[""]], [c.tolist() for c in read_csv_direct_in_columns(
+            "temp/test.csv", "string", engine="numpy"
+        )])
+        with open("temp/test.csv", "w+"):
+            pass
+        self.assertEqual([[], []], [c.tolist() for c in read_csv_direct_in_columns(
+            "temp/test.csv", "idx_int,float", engine="numpy"
+        )])
+
+        # Big with filter
+        values = write_big_csv("temp/test.csv", 100000, 99999999)
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+        data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format, engine="numpy")
+        self.assertEqual(values, [c.tolist() for c in data_columns])
+
+        # Many small blocks
+        data_columns = _read_csv_numpy("temp/test.csv", CsvSchema(line_values_format), None, block_size_byte=1000)
+        self.assertEqual(values, [c.tolist() for c in data_columns])
+
+        data_columns = read_csv_direct_in_columns(
+            "temp/test.csv", line_values_format, lambda row: row[2] >= 0 and len(row[3]) <= 5, engine="numpy"
+        )
+        self.assertEqual([i for i in range(100000) if values[2][i] >= 0 and len(values[3][i]) <= 5],
+                         data_columns[0].tolist())
+
+        local_shell.remove_force_recursive("temp")
+
+    @unittest.skipIf(not HAS_NUMPY, "NumPy is not installed")
+    def test_csv_numpy_engine_negative(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        for content, line_values_format in [
+            ("", "int"),
+            ("-9.3,56", "int,int"),
+            ("-9.3,56,abc", "string,int,float"),
+            ("-0.00001", "pos_float"),
+            ("-1", "pos_int"),
+            ("1", "idx_int"),
+            ("0\n1\n3", "idx_int"),
+            ("-9.3,56,abc,9", "float,int,string"),
+            ("-9.3,56\n-9.3", "float,int"),
+            ("99999999999999999999999", "int"),
+        ]:
+            local_shell.write_file("temp/test.csv", content)
+            try:
+                read_csv_direct_in_columns("temp/test.csv", line_values_format, engine="numpy")
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        # Invalid engine
+        try:
+            read_csv_direct_in_columns("temp/test.csv", "int", engine="invalid")
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_chunks(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        values = write_big_csv("temp/test.csv", 10000, 123456789)
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+        engines = ["python", "numpy"] if HAS_NUMPY else ["python"]
+
+        for engine in engines:
+
+            # All in chunks
+            chunks = list(read_csv_in_column_chunks("temp/test.csv", line_values_format, 3000, engine=engine))
+            self.assertEqual([3000, 3000, 3000, 1000], [len(chunk[0]) for chunk in chunks])
+            for j in range(6):
+                self.assertEqual(values[j], [v for chunk in chunks for v in list(chunk[j])])
+
+            # Filtered
+            chunks = list(read_csv_in_column_chunks(
+                "temp/test.csv", line_values_format, 777, lambda row: row[2] >= 0, engine=engine
+            ))
+            self.assertEqual(
+                [i for i in range(10000) if values[2][i] >= 0],
+                [v for chunk in chunks for v in list(chunk[0])]
+            )
+
+        # Empty file has no chunks
+        with open("temp/test.csv", "w+"):
+            pass
+        for engine in engines:
+            self.assertEqual([], list(read_csv_in_column_chunks("temp/test.csv", "int", engine=engine)))
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_chunks_negative(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        engines = ["python", "numpy"] if HAS_NUMPY else ["python"]
+
+        # Index integer continuity across chunks
+        local_shell.write_file("temp/test.csv", "0\n1\n2\n4\n5")
+        for engine in engines:
+            chunks = read_csv_in_column_chunks("temp/test.csv", "idx_int", 2, engine=engine)
+            self.assertEqual([0, 1], list(next(chunks)[0]))
+            try:
+                next(chunks)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        # Invalid arguments
+        for args in [("int", 0, None, "python"), ("int", 10, None, "invalid"), ("intt", 10, None, "python")]:
+            try:
+                list(read_csv_in_column_chunks("temp/test.csv", *args))
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_parallel(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        values = write_big_csv("temp/test.csv", 10000, 55555)
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+        engines = ["python", "numpy"] if HAS_NUMPY else ["python"]
+
+        for engine in engines:
+            for num_processes in [2, 3, 7]:
+                data_columns = read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine, num_processes=num_processes
+                )
+                self.assertEqual(values, [list(c) for c in data_columns])
+
+        # Fewer lines than processes, and empty file
+        local_shell.write_file("temp/test.csv", "0,a\n1,b")
+        for engine in engines:
+            data_columns = read_csv_direct_in_columns("temp/test.csv", "idx_int,string", engine=engine,
+                                                      num_processes=8)
+            self.assertEqual([[0, 1], ["a", "b"]], [list(c) for c in data_columns])
+        with open("temp/test.csv", "w+"):
+            pass
+        for engine in engines:
+            data_columns = read_csv_direct_in_columns("temp/test.csv", "idx_int,string", engine=engine,
+                                                      num_processes=2)
+            self.assertEqual([[], []], [list(c) for c in data_columns])
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_parallel_negative(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        engines = ["python", "numpy"] if HAS_NUMPY else ["python"]
+
+        # Line numbers are global
+        with open("temp/test.csv", "w+") as f_out:
+            for i in range(1000):
+                f_out.write("%d,%d\n" % (i if i != 900 else 0, i))
+        for engine in engines:
+            try:
+                read_csv_direct_in_columns("temp/test.csv", "idx_int,int", engine=engine, num_processes=4)
+                self.fail()
+            except ValueError as e:
+                self.assertEqual("Index integer constraint violated on line 900", str(e))
+
+        # Invalid number of processes
+        try:
+            read_csv_direct_in_columns("temp/test.csv", "idx_int,int", num_processes=0)
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    @unittest.skipIf(not HAS_NUMPY, "NumPy is not installed")
+    def test_csv_cache(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        values = write_big_csv("temp/test.csv", 1000, 7777)
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+
+        # Created on first read, used on later reads
+        self.assertEqual(values, read_csv_direct_in_columns("temp/test.csv", line_values_format, cache=True))
+        self.assertTrue(local_shell.path_exists("temp/test.csv.exputil_cache"))
+        data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format, engine="numpy", cache=True)
+        self.assertTrue(isinstance(data_columns[0], numpy.memmap))
+        self.assertEqual(values, [c.tolist() for c in data_columns])
+        self.assertEqual(values, read_csv_direct_in_columns("temp/test.csv", line_values_format, cache=True))
+
+        # Filter is applied after loading
+        self.assertEqual(
+            [i for i in range(1000) if values[2][i] >= 0],
+            read_csv_direct_in_columns("temp/test.csv", line_values_format, lambda row: row[2] >= 0, cache=True)[0]
+        )
+
+        # Another format has its own cache
+        self.assertEqual(
+            [[str(v) for v in values[0]], values[1], values[2], values[3], values[4], values[5]],
+            read_csv_direct_in_columns("temp/test.csv", "string,int,float,string,pos_int,pos_float", cache=True)
+        )
+
+        # Stale cache is recreated
+        local_shell.write_file("temp/test.csv", "0,a\n1,b")
+        self.assertEqual([[0, 1], ["a", "b"]], read_csv_direct_in_columns("temp/test.csv", "idx_int,string",
+                                                                          cache=True))
+        values = write_big_csv("temp/test.csv", 10, 8888)
+        self.assertEqual(values, read_csv_direct_in_columns("temp/test.csv", line_values_format, cache=True))
+        self.assertEqual(values, read_csv_direct_in_columns("temp/test.csv", line_values_format, cache=True,
+                                                            num_processes=2))
+
+        # Cache which cannot be written (e.g., read-only directory) is skipped
+        values = write_big_csv("temp/unwritable.csv", 10, 9999)
+        local_shell.write_file("temp/unwritable.csv.exputil_cache", "Not a directory")
+        for engine in ["python", "numpy", "compact"]:
+            data_columns = read_csv_direct_in_columns("temp/unwritable.csv", line_values_format, engine=engine,
+                                                      cache=True)
+            self.assertEqual(values, [list(c) for c in data_columns])
+
+        # Parse errors are not cached
+        local_shell.write_file("temp/test.csv", "1,a")
+        for _ in range(2):
+            try:
+                read_csv_direct_in_columns("temp/test.csv", "idx_int,string", cache=True)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_schema(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+
+        # Additional value formats
+        local_shell.write_file("temp/test.csv", "0,true,ff,0.5,2021-03-04T05:06:07,a\n1,0,-1A,1.0,2021-03-04,")
+        schema = CsvSchema("idx_int,bool,hex_int,float_0_1,timestamp,nullable_string")
+        self.assertEqual(
+            [[0, 1], [True, False], [255, -26], [0.5, 1.0],
+             [datetime.datetime(2021, 3, 4, 5, 6, 7), datetime.datetime(2021, 3, 4)], ["a", None]],
+            read_csv_direct_in_columns("temp/test.csv", schema)
+        )
+
+        # Nullable values
+        local_shell.write_file("temp/test.csv", "0,,1.5\n1,3,")
+        schema = CsvSchema("idx_int,nullable_int,nullable_pos_float")
+        self.assertEqual([[0, 1], [None, 3], [1.5, None]], read_csv_direct_in_columns("temp/test.csv", schema))
+
+        # Schema is reusable across files
+        local_shell.write_file("temp/test2.csv", "0,4,")
+        self.assertEqual([[0], [4], [None]], read_csv_direct_in_columns("temp/test2.csv", schema))
+        self.assertEqual([[[0], [None], [1.5]], [[1], [3], [None]]],
+                         list(read_csv_in_column_chunks("temp/test.csv", schema, chunk_num_lines=1)))
+
+        # Invalid values
+        for line_values_format, content in [
+            ("bool", "yes"),
+            ("hex_int", "0xz"),
+            ("float_0_1", "1.1"),
+            ("timestamp", "2021-13-01"),
+            ("nullable_pos_int", "-1"),
+            ("int", ""),
+        ]:
+            local_shell.write_file("temp/test.csv", content)
+            try:
+                read_csv_direct_in_columns("temp/test.csv", CsvSchema(line_values_format))
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        # Invalid formats
+        for line_values_format in ["abc", "int,nullable_idx_int", "nullable_", "int, float"]:
+            try:
+                CsvSchema(line_values_format)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_schema_register_format(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+
+        # Register a new format
+        CsvSchema.register_format("percentage", parse_percentage, "float64")
+        local_shell.write_file("temp/test.csv", "0,50%\n1,7.5%")
+        schema = CsvSchema("idx_int,percentage")
+        self.assertEqual([[0, 1], [0.5, 0.075]], read_csv_direct_in_columns("temp/test.csv", schema))
+        self.assertEqual([[0, 1], [0.5, 0.075]], read_csv_direct_in_columns("temp/test.csv", "idx_int,percentage"))
+        self.assertEqual([[0, 1], [0.5, 0.075]], read_csv_direct_in_columns("temp/test.csv", schema,
+                                                                            num_processes=2))
+        local_shell.write_file("temp/test.csv", "0,50")
+        try:
+            read_csv_direct_in_columns("temp/test.csv", schema)
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        # Invalid registrations
+        for name in ["int", "string", "", "a,b", "nullable_abc", " abc"]:
+            try:
+                CsvSchema.register_format(name, parse_percentage)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    @unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+    def test_csv_schema_numpy_engine(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+
+        local_shell.write_file("temp/test.csv", "0,true,ff,0.5,2021-03-04,a,\n1,0,-1A,1.0,2021-03-05,b,2")
+        schema = CsvSchema("idx_int,bool,hex_int,float_0_1,timestamp,string,nullable_int")
+        data_columns = read_csv_direct_in_columns("temp/test.csv", schema, engine="numpy")
+        self.assertEqual(
+            [[0, 1], [True, False], [255, -26], [0.5, 1.0],
+             [datetime.datetime(2021, 3, 4), datetime.datetime(2021, 3, 5)], ["a", "b"], [None, 2]],
+            [c.tolist() for c in data_columns]
+        )
+        self.assertEqual(
+            ["int64", "bool", "int64", "float64", "object", "object"],
+            [str(data_columns[j].dtype) for j in [0, 1, 2, 3, 4, 6]]
+        )
+
+        # Only columns with a NumPy dtype can be cached
+        try:
+            read_csv_direct_in_columns("temp/test.csv", schema, cache=True)
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+        local_shell.write_file("temp/test.csv", "0,true,ff")
+        self.assertEqual([[0], [True], [255]],
+                         read_csv_direct_in_columns("temp/test.csv", CsvSchema("idx_int,bool,hex_int"), cache=True))
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_columns(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        values = write_big_csv("temp/test.csv", 1000, 4444)
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+        engines = ["python", "numpy"] if HAS_NUMPY else ["python"]
+
+        # By index, in any order
+        for engine in engines:
+            for num_processes in [1, 2]:
+                data_columns = read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine, num_processes=num_processes, columns=[4, 1]
+                )
+                self.assertEqual([values[4], values[1]], [list(c) for c in data_columns])
+                data_columns = read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine, num_processes=num_processes, columns=[3]
+                )
+                self.assertEqual([values[3]], [list(c) for c in data_columns])
+
+            # The row filter function is provided only the selected columns
+            data_columns = read_csv_direct_in_columns(
+                "temp/test.csv", line_values_format, lambda row: row[1] >= 0, engine=engine, columns=[0, 2]
+            )
+            self.assertEqual([i for i in range(1000) if values[2][i] >= 0], list(data_columns[0]))
+
+            # Chunks
+            chunks = list(read_csv_in_column_chunks("temp/test.csv", line_values_format, 300, engine=engine,
+                                                    columns=[5, 0]))
+            self.assertEqual([300, 300, 300, 100], [len(chunk[0]) for chunk in chunks])
+            self.assertEqual(values[5], [v for chunk in chunks for v in list(chunk[0])])
+
+        # Cache holds all columns
+        if HAS_NUMPY:
+            self.assertEqual([values[2]], read_csv_direct_in_columns("temp/test.csv", line_values_format, cache=True,
+                                                                     columns=[2]))
+            self.assertEqual([values[0], values[3]], read_csv_direct_in_columns(
+                "temp/test.csv", line_values_format, cache=True, columns=[0, 3]
+            ))
+
+        # Values of columns which are not selected are not converted, but the line shape is still checked
+        local_shell.write_file("temp/test.csv", "0,abc,1\n1,,2")
+        for engine in engines:
+            self.assertEqual([[1, 2]], [list(c) for c in read_csv_direct_in_columns(
+                "temp/test.csv", "idx_int,int,int", engine=engine, columns=[2]
+            )])
+        local_shell.write_file("temp/test.csv", "0,abc,1\n1,2")
+        for engine in engines:
+            try:
+                read_csv_direct_in_columns("temp/test.csv", "idx_int,int,int", engine=engine, columns=[2])
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        # Invalid selections
+        for columns in [[3], [-1], ["a"], [0, "b"]]:
+            try:
+                read_csv_direct_in_columns("temp/test.csv", "idx_int,int,int", columns=columns)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_header(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        values = write_big_csv("temp/data.csv", 1000, 5555)
+        with open("temp/test.csv", "w+") as f_out:
+            f_out.write("id,x,y,name,count,size\n")
+            with open("temp/data.csv", "r") as f_in:
+                f_out.write(f_in.read())
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+        engines = ["python", "numpy"] if HAS_NUMPY else ["python"]
+
+        for engine in engines:
+            for num_processes in [1, 2]:
+                data_columns = read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine, num_processes=num_processes, header=True
+                )
+                self.assertEqual(values, [list(c) for c in data_columns])
+                data_columns = read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, engine=engine, num_processes=num_processes, header=True,
+                    columns=["name", 0, "size"]
+                )
+                self.assertEqual([values[3], values[0], values[5]], [list(c) for c in data_columns])
+            chunks = list(read_csv_in_column_chunks("temp/test.csv", line_values_format, 400, engine=engine,
+                                                    header=True, columns=["y"]))
+            self.assertEqual(values[2], [v for chunk in chunks for v in list(chunk[0])])
+        if HAS_NUMPY:
+            self.assertEqual([values[1]], read_csv_direct_in_columns("temp/test.csv", line_values_format, cache=True,
+                                                                     header=True, columns=["x"]))
+            self.assertEqual([values[1]], read_csv_direct_in_columns("temp/data.csv", line_values_format, cache=True,
+                                                                     columns=[1]))
+
+        # Header only
+        local_shell.write_file("temp/test.csv", "a,b")
+        self.assertEqual([[], []], read_csv_direct_in_columns("temp/test.csv", "int,int", header=True))
+
+        # Invalid headers and names
+        for content, columns in [
+            ("a,b\n0,1", ["c"]),
+            ("a,b,c\n0,1", None),
+            ("a\n0,1", None),
+        ]:
+            local_shell.write_file("temp/test.csv", content)
+            try:
+                read_csv_direct_in_columns("temp/test.csv", "int,int", header=True, columns=columns)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_row_filters(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        values = write_big_csv("temp/test.csv", 1000, 6666)
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+        engines = ["python", "numpy"] if HAS_NUMPY else ["python"]
+
+        for row_filters, keep_function in [
+            ((2, ">=", 0), lambda i: values[2][i] >= 0),
+            ([(2, "<", 0), (1, "!=", values[1][3])], lambda i: values[2][i] < 0 and values[1][i] != values[1][3]),
+            ((3, "in", ["a", "aaa"]), lambda i: values[3][i] in ["a", "aaa"]),
+            ((3, "not in", ["", "a"]), lambda i: values[3][i] not in ["", "a"]),
+            ((4, "between", (1000, 500000)), lambda i: 1000 <= values[4][i] <= 500000),
+            (("or", [(0, "==", 7), ("not", (5, ">", 1000.0))]), lambda i: i == 7 or not values[5][i] > 1000.0),
+            (("and", [(0, "<=", 500), ("or", [(1, ">", 0), (3, "==", "")])]),
+             lambda i: i <= 500 and (values[1][i] > 0 or values[3][i] == "")),
+            ((0, ">", 5000), lambda i: False),
+        ]:
+            expected = [i for i in range(1000) if keep_function(i)]
+            for engine in engines:
+                for num_processes in [1, 2]:
+                    data_columns = read_csv_direct_in_columns(
+                        "temp/test.csv", line_values_format, engine=engine, num_processes=num_processes,
+                        row_filters=row_filters
+                    )
+                    self.assertEqual([[values[j][i] for i in expected] for j in range(6)],
+                                     [list(c) for c in data_columns])
+
+                # With column selection (filter columns do not need to be selected) and a filter function
+                data_columns = read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, lambda row: row[0] % 2 == 0, engine=engine,
+                    columns=[0, 3], row_filters=row_filters
+                )
+                self.assertEqual([i for i in expected if i % 2 == 0], list(data_columns[0]))
+                chunks = list(read_csv_in_column_chunks("temp/test.csv", line_values_format, 300, engine=engine,
+                                                        columns=[0], row_filters=row_filters))
+                self.assertEqual(expected, [v for chunk in chunks for v in list(chunk[0])])
+
+            if HAS_NUMPY:
+                self.assertEqual([expected], read_csv_direct_in_columns(
+                    "temp/test.csv", line_values_format, cache=True, columns=[0], row_filters=row_filters
+                ))
+
+        # By name with a header
+        local_shell.write_file("temp/test.csv", "id,name\n0,a\n1,b\n2,c")
+        for engine in engines:
+            self.assertEqual([[0, 2]], [list(c) for c in read_csv_direct_in_columns(
+                "temp/test.csv", "idx_int,string", engine=engine, header=True, columns=["id"],
+                row_filters=("name", "!=", "b")
+            )])
+
+        # Rows which are filtered out are not converted beyond their filter columns
+        local_shell.write_file("temp/test.csv", "0,1,2\n1,0,abc\n2,1,3")
+        for engine in engines:
+            self.assertEqual([[0, 2], [2, 3]], [list(c) for c in read_csv_direct_in_columns(
+                "temp/test.csv", "idx_int,int,int", engine=engine, columns=[0, 2], row_filters=(1, "==", 1)
+            )])
+
+        # A missing value of a nullable column does not match any ordering
+        local_shell.write_file("temp/test.csv", "0,5\n1,\n2,7")
+        for row_filters, expected in [
+            ((1, ">=", 6), [2]),
+            ((1, "<", 6), [0]),
+            ((1, "between", (4, 8)), [0, 2]),
+            (("not", (1, "<", 6)), [1, 2]),
+            ((1, "==", None), [1]),
+            ((1, "!=", 5), [1, 2]),
+        ]:
+            for engine in engines:
+                self.assertEqual([expected], [list(c) for c in read_csv_direct_in_columns(
+                    "temp/test.csv", "idx_int,nullable_int", engine=engine, columns=[0], row_filters=row_filters
+                )])
+
+        # Invalid row filters
+        for row_filters in [
+            (3, "==", 0),
+            ("a", "==", 0),
+            (0, "~", 0),
+            (0, "between", (0, 1, 2)),
+            ("xor", [(0, "==", 0)]),
+            ("and", []),
+            [],
+            "abc",
+        ]:
+            try:
+                read_csv_direct_in_columns("temp/test.csv", "idx_int,int,int", row_filters=row_filters)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_compressed(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        values = write_big_csv("temp/test.csv", 1000, 7777)
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+        engines = ["python", "numpy"] if HAS_NUMPY else ["python"]
+        with open("temp/test.csv", "rb") as f_in:
+            content = f_in.read()
+        compressed_files = [
+            ("temp/test.csv.gz", gzip.compress(content)),
+            ("temp/test.csv.bz2", bz2.compress(content)),
+            ("temp/test.csv.xz", lzma.compress(content)),
+            ("temp/test.csv.gz2", gzip.compress(content[:20000]) + gzip.compress(content[20000:])),
+        ]
+        if HAS_ZSTANDARD:
+            compressed_files.append(("temp/test.csv.zst", zstandard.ZstdCompressor().compress(content)))
+        for filename, compressed_content in compressed_files:
+            with open(filename, "wb") as f_out:
+                f_out.write(compressed_content)
+
+            for engine in engines:
+                for num_processes in [1, 2]:
+                    data_columns = read_csv_direct_in_columns(
+                        filename, line_values_format, engine=engine, num_processes=num_processes
+                    )
+                    self.assertEqual(values, [list(c) for c in data_columns])
+                data_columns = read_csv_direct_in_columns(
+                    filename, line_values_format, engine=engine, num_processes=2, columns=[3, 0],
+                    row_filters=(2, ">=", 0)
+                )
+                self.assertEqual([i for i in range(1000) if values[2][i] >= 0], list(data_columns[1]))
+                chunks = list(read_csv_in_column_chunks(filename, line_values_format, 300, engine=engine))
+                self.assertEqual(values[5], [v for chunk in chunks for v in list(chunk[5])])
+            if HAS_NUMPY:
+                self.assertEqual(values, read_csv_direct_in_columns(filename, line_values_format, cache=True))
+
+        # With a header (also for streams which cannot seek)
+        header_files = [("temp/test.csv.gz", gzip.compress(b"a,b\n0,x\n1,y"))]
+        if HAS_ZSTANDARD:
+            header_files.append(("temp/test.csv.zst", zstandard.ZstdCompressor().compress(b"a,b\n0,x\n1,y")))
+        for filename, compressed_content in header_files:
+            with open(filename, "wb") as f_out:
+                f_out.write(compressed_content)
+            for engine in engines:
+                for num_processes in [1, 2]:
+                    self.assertEqual([["x", "y"]], [list(c) for c in read_csv_direct_in_columns(
+                        filename, "idx_int,string", engine=engine, num_processes=num_processes, header=True,
+                        columns=["b"]
+                    )])
+
+        # Errors are reported with the line number
+        with lzma.open("temp/test.csv.xz", "wb") as f_out:
+            f_out.write(b"0,x\n1,y\n3,z")
+        for engine in engines:
+            for num_processes in [1, 2]:
+                try:
+                    read_csv_direct_in_columns("temp/test.csv.xz", "idx_int,string", engine=engine,
+                                               num_processes=num_processes)
+                    self.fail()
+                except ValueError as e:
+                    self.assertTrue("line 2" in str(e))
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_compact(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        values = write_big_csv("temp/test.csv", 1000, 8888)
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+
+        for num_processes in [1, 2]:
+            data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format, engine="compact",
+                                                      num_processes=num_processes)
+            self.assertEqual(values, [list(c) for c in data_columns])
+            self.assertEqual(["q", "q", "d", None, "q", "d"],
+                             [c.typecode if isinstance(c, array.array) else None for c in data_columns])
+            self.assertTrue(isinstance(data_columns[3], list))
+
+        # Strings are interned
+        local_shell.write_file("temp/test.csv", "0,abc\n1,a" + "bc")
+        data_columns = read_csv_direct_in_columns("temp/test.csv", "idx_int,string", engine="compact")
+        self.assertTrue(data_columns[1][0] is data_columns[1][1])
+
+        # Other formats are stored as lists
+        local_shell.write_file("temp/test.csv", "0,true,ff,,0.5\n1,false,a,3,1.0")
+        data_columns = read_csv_direct_in_columns(
+            "temp/test.csv", CsvSchema("idx_int,bool,hex_int,nullable_int,float_0_1"), engine="compact",
+            columns=[4, 2, 3, 1], row_filters=(0, "<", 5)
+        )
+        self.assertEqual([array.array("d", [0.5, 1.0]), array.array("q", [255, 10]), [None, 3], [True, False]],
+                         data_columns)
+
+        # Chunks
+        values = write_big_csv("temp/test.csv", 1000, 8889)
+        chunks = list(read_csv_in_column_chunks("temp/test.csv", line_values_format, 300, engine="compact"))
+        self.assertEqual(values[2], [v for chunk in chunks for v in chunk[2]])
+        self.assertEqual("d", chunks[0][2].typecode)
+
+        # From the cache
+        if HAS_NUMPY:
+            for _ in range(2):
+                data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format, engine="compact",
+                                                          cache=True)
+                self.assertEqual(values, [list(c) for c in data_columns])
+                self.assertEqual("q", data_columns[4].typecode)
+
+        # Out of range of a 64-bit integer
+        local_shell.write_file("temp/test.csv", "0,1\n1,99999999999999999999")
+        try:
+            read_csv_direct_in_columns("temp/test.csv", "idx_int,int", engine="compact")
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_files(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+        engines = ["python", "numpy", "compact"] if HAS_NUMPY else ["python", "compact"]
+        all_values = []
+        for k in range(7):
+            local_shell.make_full_dir("temp/run_%d" % k)
+        for k in range(5):
+            all_values.append(write_big_csv("temp/run_%d/result.csv" % k, 100 * k, 100 + k))
+        local_shell.write_file("temp/run_5/result.csv", "0,1,2.0,a,3,4.0\n2,1,2.0,a,3,4.0")
+        local_shell.write_file("temp/run_6/result.csv", "0,1,2.0,a,3")
+        filenames = ["temp/run_%d/result.csv" % k for k in range(5)]
+
+        for engine in engines:
+            for num_processes in [1, 2]:
+
+                # Glob pattern, with the files which have an error collected
+                data_columns, errors = read_csv_files_in_columns(
+                    "temp/run_*/result.csv", line_values_format, engine=engine, num_processes=num_processes
+                )
+                self.assertEqual(7, len(data_columns))
+                for j in range(6):
+                    self.assertEqual([v for values in all_values for v in values[j]], list(data_columns[j]))
+                self.assertEqual([f for k in range(5) for f in [filenames[k]] * (100 * k)], list(data_columns[6]))
+                self.assertEqual(["temp/run_5/result.csv", "temp/run_6/result.csv"], sorted(errors.keys()))
+                self.assertTrue("Index integer constraint violated on line 1" in str(errors["temp/run_5/result.csv"]))
+                self.assertTrue(isinstance(errors["temp/run_6/result.csv"], ValueError))
+
+            # List of files with a run identifier as source, column selection and row filter
+            data_columns, errors = read_csv_files_in_columns(
+                list(reversed(filenames)) + ["temp/does_not_exist.csv"], line_values_format, engine=engine,
+                num_processes=2, columns=[0], row_filters=(0, "<", 150),
+                source_function=run_identifier
+            )
+            self.assertEqual(
+                [i for k in reversed(range(5)) for i in range(min(100 * k, 150))], list(data_columns[0])
+            )
+            self.assertEqual(
+                [k for k in reversed(range(5)) for _ in range(min(100 * k, 150))], list(data_columns[1])
+            )
+            self.assertEqual(["temp/does_not_exist.csv"], list(errors.keys()))
+
+        # No files
+        self.assertEqual(([[], [], []], {}), read_csv_files_in_columns([], "int,int"))
+        self.assertEqual(([[], []], {}), read_csv_files_in_columns("temp/*.abc", "int,int", columns=[1]))
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_csv_write(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        values = write_big_csv("temp/test.csv", 1000, 9999)
+        line_values_format = "idx_int,int,float,string,pos_int,pos_float"
+
+        # Lists, in chunks
+        write_csv_columns("temp/out.csv", values, line_values_format, chunk_num_rows=333)
+        with open("temp/test.csv", "r") as f_in_expected, open("temp/out.csv", "r") as f_in:
+            self.assertEqual(f_in_expected.read(), f_in.read())
+        self.assertEqual(values, read_csv_direct_in_columns("temp/out.csv", line_values_format))
+
+        # Arrays (also of the compact engine), with header and compression
+        for compression in [None, "gzip", "bz2", "xz"] + (["zstd"] if HAS_ZSTANDARD else []):
+            data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format, engine="compact")
+            write_csv_columns("temp/out.csv", data_columns, line_values_format, header=["a", "b", "c", "d", "e", "f"],
+                              compression=compression)
+            self.assertEqual(values, read_csv_direct_in_columns("temp/out.csv", line_values_format, header=True))
+        if HAS_NUMPY:
+            data_columns = read_csv_direct_in_columns("temp/test.csv", line_values_format, engine="numpy")
+            write_csv_columns("temp/out.csv", data_columns, line_values_format)
+            self.assertEqual(values, read_csv_direct_in_columns("temp/out.csv", line_values_format))
+            write_csv_columns("temp/out.csv", [numpy.arange(3), numpy.array([0.5, 1e-20, float("inf")])],
+                              "idx_int,pos_float")
+            self.assertEqual([[0, 1, 2], [0.5, 1e-20, float("inf")]],
+                             read_csv_direct_in_columns("temp/out.csv", "idx_int,pos_float"))
+
+        # Other value formats
+        data_columns = [
+            [0, 1, 2],
+            [True, False, True],
+            [255, -26, 0],
+            [0.0, 1, 0.25],
+            [datetime.datetime(2021, 3, 4, 5, 6, 7), datetime.datetime(2021, 3, 4), datetime.datetime(1, 1, 1)],
+            [None, "a", ""],
+            [1, None, None],
+        ]
+        schema = CsvSchema("idx_int,bool,hex_int,float_0_1,timestamp,nullable_string,nullable_pos_int")
+        write_csv_columns("temp/out.csv", data_columns, schema)
+        data_columns[5][2] = None
+        self.assertEqual(data_columns, read_csv_direct_in_columns("temp/out.csv", schema))
+        CsvSchema.register_format("percentage_written", parse_percentage, "float64", format_percentage)
+        write_csv_columns("temp/out.csv", [[0.5, 0.25]], "percentage_written")
+        self.assertEqual([[0.5, 0.25]], read_csv_direct_in_columns("temp/out.csv", "percentage_written"))
+
+        # Empty
+        write_csv_columns("temp/out.csv", [[], []], "int,string")
+        self.assertEqual([[], []], read_csv_direct_in_columns("temp/out.csv", "int,string"))
+
+        # Invalid
+        for data_columns, line_values_format, header in [
+            ([[0, 1]], "int,int", None),
+            ([[0, 1], [0]], "int,int", None),
+            ([[0, 1.5]], "int", None),
+            ([[True]], "int", None),
+            ([["1"]], "float", None),
+            ([[-1]], "pos_int", None),
+            ([[-0.5]], "pos_float", None),
+            ([[1.5]], "float_0_1", None),
+            ([[0, 2]], "idx_int", None),
+            ([[1]], "idx_int", None),
+            ([["a,b"]], "string", None),
+            ([["a\nb"]], "string", None),
+            ([[" a"]], "string", None),
+            ([["b", "a "]], "string", None),
+            ([[1]], "string", None),
+            ([[None]], "int", None),
+            ([[1]], "bool", None),
+            ([[1]], "int", ["a", "b"]),
+            ([[1]], "int", ["a,b"]),
+        ]:
+            try:
+                write_csv_columns("temp/out.csv", data_columns, line_values_format, header=header)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+        try:
+            write_csv_columns("temp/out.csv", [[1]], "int", compression="abc")
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
@@ -0,0 +1,131 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+import gzip
+import os
+from exputil import *
+
+try:
+    import numpy
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+class TestCsvRowIndex(unittest.TestCase):
+
+    def test_build(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        with open("temp/test.csv", "w+") as f_out:
+            for i in range(1000):
+                f_out.write("%d,%d\n" % (i, i * i))
+
+        index = CsvRowIndex.build("temp/test.csv", every_num_rows=7)
+        self.assertEqual(1000, index.num_rows)
+        self.assertEqual(143, len(index.offsets))
+        with open("temp/test.csv", "rb") as f_in:
+            lines = f_in.readlines()
+        for k in range(len(index.offsets)):
+            self.assertEqual(sum(len(line) for line in lines[:7 * k]), index.offsets[k])
+        self.assertTrue(os.path.exists("temp/test.csv.exputil_index"))
+
+        # Loaded from the sidecar file, or rebuilt if it is stale
+        loaded = CsvRowIndex.load_or_build("temp/test.csv", every_num_rows=7)
+        self.assertEqual((1000, list(index.offsets)), (loaded.num_rows, list(loaded.offsets)))
+        self.assertEqual(100, len(CsvRowIndex.load_or_build("temp/test.csv", every_num_rows=10).offsets))
+        with open("temp/test.csv", "a") as f_out:
+            f_out.write("1000,0")
+        self.assertEqual(1001, CsvRowIndex.load_or_build("temp/test.csv", every_num_rows=10).num_rows)
+
+        # Header and empty files
+        local_shell.write_file("temp/test.csv", "a,b\n0,1\n1,2")
+        self.assertEqual((2, [4]), (CsvRowIndex.build("temp/test.csv", 5, header=True).num_rows,
+                                    list(CsvRowIndex.build("temp/test.csv", 5, header=True).offsets)))
+        local_shell.write_file("temp/test.csv", "a,b")
+        self.assertEqual(0, CsvRowIndex.build("temp/test.csv", header=True).num_rows)
+        with open("temp/test.csv", "w+"):
+            pass
+        self.assertEqual(0, CsvRowIndex.build("temp/test.csv").num_rows)
+
+        # Invalid
+        with gzip.open("temp/test.csv.gz", "wb") as f_out:
+            f_out.write(b"0,1\n")
+        try:
+            CsvRowIndex.build("temp/test.csv.gz")
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+        try:
+            CsvRowIndex.build("temp/test.csv", every_num_rows=0)
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_read_rows(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        with open("temp/test.csv", "w+") as f_out:
+            f_out.write("id,square,name\n")
+            for i in range(1000):
+                f_out.write("%d,%d,n%d" % (i, i * i, i % 3) + ("\n" if i < 999 else ""))
+        engines = ["python", "numpy", "compact"] if HAS_NUMPY else ["python", "compact"]
+
+        for engine in engines:
+            for start_row, end_row in [(0, 1), (0, 1000), (13, 14), (99, 250), (995, 2000), (500, 500), (1000, 1001)]:
+                data_columns = read_csv_rows_in_columns(
+                    "temp/test.csv", "idx_int,int,string", start_row, end_row, engine=engine, header=True,
+                    every_num_rows=10
+                )
+                expected = list(range(start_row, min(end_row, 1000)))
+                self.assertEqual([expected, [i * i for i in expected], ["n%d" % (i % 3) for i in expected]],
+                                 [list(c) for c in data_columns])
+
+            # Column selection and filters
+            data_columns = read_csv_rows_in_columns(
+                "temp/test.csv", "idx_int,int,string", 100, 200, lambda row: row[1] % 2 == 0, engine=engine,
+                columns=["square", "id"], header=True, row_filters=("name", "==", "n1"), every_num_rows=10
+            )
+            expected = [i for i in range(100, 200) if i % 3 == 1 and i % 2 == 0]
+            self.assertEqual([[i * i for i in expected], expected], [list(c) for c in data_columns])
+
+        # Errors are reported with the row number
+        local_shell.write_file("temp/test.csv", "0,1\n1,1\n2,x\n3,1")
+        try:
+            read_csv_rows_in_columns("temp/test.csv", "idx_int,int", 1, 3, every_num_rows=2)
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+        self.assertEqual([[3], [1]], read_csv_rows_in_columns("temp/test.csv", "idx_int,int", 3, 4, every_num_rows=2))
+
+        # Invalid ranges
+        for start_row, end_row in [(-1, 2), (3, 2)]:
+            try:
+                read_csv_rows_in_columns("temp/test.csv", "idx_int,int", start_row, end_row)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
@@ -0,0 +1,112 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+from exputil import *
+
+try:
+    import numpy
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+def write(filename, content):
+    with open(filename, "w+") as f_out:
+        f_out.write(content)
+
+
+def append(filename, content):
+    with open(filename, "a") as f_out:
+        f_out.write(content)
+
+
+class TestCsvTailReader(unittest.TestCase):
+
+    def test_tail(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        engines = ["python", "numpy", "compact"] if HAS_NUMPY else ["python", "compact"]
+
+        for engine in engines:
+            local_shell.remove_force_recursive("temp/test.csv")
+            reader = CsvTailReader("temp/test.csv", "idx_int,float,string", engine=engine)
+
+            # File does not exist yet
+            self.assertIsNone(reader.read_new())
+
+            # Only complete lines are read
+            append("temp/test.csv", "0,1.5,a\n1,2.5,b\n2,3.")
+            self.assertEqual([[0, 1], [1.5, 2.5], ["a", "b"]], [list(c) for c in reader.read_new()])
+            self.assertEqual([[], [], []], [list(c) for c in reader.read_new()])
+            append("temp/test.csv", "5,c")
+            self.assertEqual([[], [], []], [list(c) for c in reader.read_new()])
+            append("temp/test.csv", "\n3,4.5,d\n")
+            self.assertEqual([[2, 3], [3.5, 4.5], ["c", "d"]], [list(c) for c in reader.read_new()])
+            self.assertEqual((4, 32), (reader.line_idx, reader.byte_offset))
+
+            # The index integer constraint continues across calls
+            append("temp/test.csv", "5,5.5,e\n")
+            try:
+                reader.read_new()
+                self.fail()
+            except ValueError as e:
+                self.assertTrue("line 4" in str(e))
+
+            # A last line without newline is read if final
+            write("temp/test.csv", "0,1.0,a\n1,2.0,b")
+            reader.reset()
+            self.assertEqual([[0], [1.0], ["a"]], [list(c) for c in reader.read_new()])
+            self.assertEqual([[1], [2.0], ["b"]], [list(c) for c in reader.read_new(final=True)])
+
+            # Replaced by a smaller file: read from the start
+            write("temp/test.csv", "0,9.0,z\n")
+            self.assertEqual([[0], [9.0], ["z"]], [list(c) for c in reader.read_new()])
+
+        # Header, column selection and filters
+        local_shell.remove_force_recursive("temp/test.csv")
+        reader = CsvTailReader("temp/test.csv", "idx_int,int", lambda row: row[0] > 1, columns=["v"], header=True,
+                               row_filters=("i", "!=", 2))
+        append("temp/test.csv", "i,v")
+        self.assertIsNone(reader.read_new())
+        append("temp/test.csv", "\n0,1\n1,2\n2,3\n")
+        self.assertEqual([[2]], reader.read_new())
+        append("temp/test.csv", "3,4\n4,0\n")
+        self.assertEqual([[4]], reader.read_new())
+
+        # Compressed files are not supported
+        local_shell.write_file("temp/test.csv", "0,1")
+        local_shell.perfect_exec("gzip -f temp/test.csv")
+        try:
+            CsvTailReader("temp/test.csv.gz", "idx_int,int").read_new()
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        # Invalid engine
+        try:
+            CsvTailReader("temp/test.csv", "idx_int,int", engine="abc")
+            self.fail()
+        except ValueError:
+            self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
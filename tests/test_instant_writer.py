@@ -0,0 +1,153 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import time
+import unittest
+import subprocess
+from exputil import *
+
+
+def read_content(filename):
+    with open(filename, "r") as f_in:
+        return f_in.read()
+
+
+class TestInstantWriter(unittest.TestCase):
+
+    def test_flush_every_write(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        with open("temp/test.txt", "w+") as f:
+            writer = InstantWriter(f)
+            writer.write("abc")
+            self.assertEqual("abc", read_content("temp/test.txt"))
+            writer.write("def\n")
+            self.assertEqual("abcdef\n", read_content("temp/test.txt"))
+        local_shell.remove_force_recursive("temp")
+
+    def test_flush_policies(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+
+        # Every number of bytes
+        writer = InstantWriter(open("temp/test.txt", "w+"), flush_every_num_bytes=10)
+        writer.write("abcd")
+        writer.write("efgh")
+        self.assertEqual("", read_content("temp/test.txt"))
+        writer.write("ij")
+        self.assertEqual("abcdefghij", read_content("temp/test.txt"))
+        writer.write("k")
+        self.assertEqual("abcdefghij", read_content("temp/test.txt"))
+        writer.checkpoint()
+        self.assertEqual("abcdefghijk", read_content("temp/test.txt"))
+        writer.write("l")
+        writer.close()
+        self.assertEqual("abcdefghijkl", read_content("temp/test.txt"))
+
+        # On newline
+        with InstantWriter(open("temp/test.txt", "w+"), flush_on_newline=True) as writer:
+            writer.write("a,b")
+            self.assertEqual("", read_content("temp/test.txt"))
+            writer.write(",c\n")
+            self.assertEqual("a,b,c\n", read_content("temp/test.txt"))
+            writer.write("d")
+        self.assertEqual("a,b,c\nd", read_content("temp/test.txt"))
+
+        # Binary file handle
+        with InstantWriter(open("temp/test.txt", "wb+"), flush_on_newline=True) as writer:
+            writer.write(b"a,b")
+            self.assertEqual("", read_content("temp/test.txt"))
+            writer.write(bytearray(b",c\n"))
+            self.assertEqual("a,b,c\n", read_content("temp/test.txt"))
+            writer.write(b"d")
+        self.assertEqual("a,b,c\nd", read_content("temp/test.txt"))
+        with InstantWriter(open("temp/test.txt", "wb+"), flush_every_num_bytes=3, flush_every_ms=50) as writer:
+            writer.write(b"ab")
+            self.assertEqual("", read_content("temp/test.txt"))
+            writer.write(bytearray(b"c"))
+            self.assertEqual("abc", read_content("temp/test.txt"))
+
+        # Every number of milliseconds
+        with InstantWriter(open("temp/test.txt", "w+"), flush_every_ms=100) as writer:
+            time.sleep(0.15)
+            writer.write("a")
+            self.assertEqual("a", read_content("temp/test.txt"))
+            writer.write("b")
+            self.assertEqual("a", read_content("temp/test.txt"))
+
+        # Every number of milliseconds, without any further write
+        with InstantWriter(open("temp/test.txt", "w+"), flush_every_ms=50) as writer:
+            writer.write("a")
+            writer.write("b")
+            self.assertEqual("", read_content("temp/test.txt"))
+            time.sleep(0.3)
+            self.assertEqual("ab", read_content("temp/test.txt"))
+            writer.write("c")
+            time.sleep(0.3)
+            self.assertEqual("abc", read_content("temp/test.txt"))
+        writers = [InstantWriter(open("temp/test%d.txt" % i, "w+"), flush_every_ms=50 * (i + 1)) for i in range(3)]
+        for i, writer in enumerate(writers):
+            writer.write(str(i))
+        time.sleep(0.4)
+        for i, writer in enumerate(writers):
+            self.assertEqual(str(i), read_content("temp/test%d.txt" % i))
+            writer.close()
+
+        # With fsync
+        with InstantWriter(open("temp/test.txt", "w+"), flush_every_num_bytes=2, fsync_every_ms=0) as writer:
+            writer.write("ab")
+            self.assertEqual("ab", read_content("temp/test.txt"))
+            writer.write("c")
+            writer.checkpoint(fsync=True)
+            self.assertEqual("abc", read_content("temp/test.txt"))
+        with InstantWriter(open("temp/test.txt", "w+"), fsync_every_ms=1000) as writer:
+            writer.write("a")
+            self.assertEqual("a", read_content("temp/test.txt"))
+
+        # Invalid
+        for kwargs in [
+            {"flush_every_num_bytes": 0},
+            {"flush_every_num_bytes": -5},
+            {"flush_every_ms": -1},
+            {"fsync_every_ms": -1},
+        ]:
+            try:
+                InstantWriter(open("temp/test.txt", "w+"), **kwargs)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        local_shell.remove_force_recursive("temp")
+
+    def test_flush_at_exit(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        program = (
+            "import exputil\n"
+            "writer = exputil.InstantWriter(open('temp/test.txt', 'w+'), flush_every_num_bytes=1000000)\n"
+            "writer.write('abc')\n"
+        )
+        subprocess.check_call([sys.executable, "-c", program], cwd=os.getcwd())
+        self.assertEqual("abc", read_content("temp/test.txt"))
+        local_shell.remove_force_recursive("temp")
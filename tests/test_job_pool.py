@@ -0,0 +1,79 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from exputil import *
+from exputil.job_pool import _parse_cpu_list, _usable_cores
+import time
+import unittest
+
+
+class TestJobPool(unittest.TestCase):
+
+    def test_parse_cpu_list(self):
+        self.assertEqual([0], _parse_cpu_list("0\n"))
+        self.assertEqual([0, 1, 2, 3, 8, 10, 11], _parse_cpu_list("0-3,8,10-11"))
+        self.assertEqual([], _parse_cpu_list(""))
+
+    def test_run(self):
+        pool = LocalJobPool(max_jobs=2)
+        results = pool.run(["echo %d; exit %d" % (i, i) for i in range(5)] + [["echo", "argv"]])
+        self.assertEqual(6, len(results))
+        for i in range(5):
+            self.assertEqual(i, results[i].return_code)
+            self.assertEqual("%d\n" % i, results[i].output)
+        self.assertEqual("argv\n", results[5].output)
+
+        # Default is the number of usable cores
+        self.assertEqual(len(_usable_cores()), LocalJobPool().max_jobs)
+
+    def test_concurrency_limit(self):
+        start = time.time()
+        LocalJobPool(max_jobs=2).run(["sleep 0.2"] * 4)
+        # With at most two at once, the four jobs need at least two rounds
+        self.assertTrue(time.time() - start >= 0.4)
+
+        # Finished order
+        order = [idx for idx, _ in LocalJobPool(max_jobs=3).run_iter(["sleep 0.4", "sleep 0.2", "exit 0"])]
+        self.assertEqual([2, 1, 0], order)
+
+    def test_pin(self):
+        pool = LocalJobPool(pin=True)
+        self.assertEqual(len(_usable_cores()), pool.max_jobs)
+        results = pool.run(["taskset -p $$"] * (pool.max_jobs + 1) + [["sh", "-c", "taskset -p $$"]])
+        for res in results:
+            self.assertEqual(0, res.return_code)
+            self.assertTrue("affinity" in res.output)
+        self.assertTrue(len(LocalJobPool(pin=True, avoid_hyperthreads=True).slots) >= 1)
+
+    def test_invalid(self):
+        for kwargs in [
+            {"max_jobs": 0},
+            {"cores_per_job": 0},
+            {"pin": True, "cores_per_job": len(_usable_cores()) + 1},
+            {"pin": True, "max_jobs": len(_usable_cores()) + 1},
+            {"output_redirect": OutputRedirect.SIMPLE_STRING},
+        ]:
+            try:
+                LocalJobPool(**kwargs)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
@@ -21,6 +21,7 @@
 # SOFTWARE.
 
 from exputil import *
+import os
 import unittest
 
 
@@ -71,6 +72,56 @@ class TestBasic(unittest.TestCase):
         # Remove file (clean-up)
         self.assertTrue(local_shell.exec("rm -f abcdef.txt").return_code <= 100)
 
+    def test_local_shell_argv(self):
+        local_shell = LocalShell()
+
+        # Argument vector is spawned directly
+        res = local_shell.exec(["echo", "Hello  world", "$HOME"])
+        self.assertEqual(0, res.return_code)
+        self.assertEqual("Hello  world $HOME", res.output.strip())
+
+        # Plain string without meta-characters is spawned directly
+        res = local_shell.exec("echo Hello world")
+        self.assertEqual(0, res.return_code)
+        self.assertEqual("Hello world", res.output.strip())
+        for command in ["echo a\u00a0b", "echo a\x0cb", "echo a\rb", "echo a b\r"]:
+            self.assertEqual(
+                local_shell.exec(["sh", "-c", command]).output,
+                local_shell.exec(command).output
+            )
+
+        # Shell built-ins and meta-characters still go through the shell
+        self.assertEqual(3, local_shell.exec("exit 3").return_code)
+        self.assertEqual("a b", local_shell.exec("echo a | cat; echo b | cat").output.replace("\n", " ").strip())
+
+        # Executable script without a shebang line is run by the shell
+        local_shell.make_full_dir("temp")
+        with open("temp/run.sh", "w+") as f_out:
+            f_out.write("echo Script $1\n")
+        os.chmod("temp/run.sh", 0o755)
+        self.assertEqual("Script a", local_shell.perfect_exec("./temp/run.sh a").output.strip())
+        self.assertEqual("Script b", local_shell.perfect_exec(["./temp/run.sh", "b"]).output.strip())
+        res = local_shell.exec("./temp/run.sh c", sync=False)
+        out, _ = res.process.communicate()
+        self.assertEqual("Script c", out.decode("utf-8").strip())
+        local_shell.remove_recursive("temp")
+
+        # Non-existent executable in argument vector
+        res = local_shell.exec(["abcd", "efg"])
+        self.assertFalse(res.return_code <= 100)
+
+        # Asynchronous argument vector
+        res = local_shell.exec(["cat", "/dev/null"], sync=False)
+        res.process.communicate()
+        self.assertEqual(0, res.process.returncode)
+
+        # Safety also applies to argument vectors
+        try:
+            local_shell.exec(["rm", "-rf", "/"])
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+
     def test_failing_commands(self):
         local_shell = LocalShell()
         self.assertFalse(local_shell.exec("/dev/null").return_code <= 100)
@@ -0,0 +1,164 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from exputil import *
+from exputil.shell import _broadcast_tree_levels
+import hashlib
+import time
+import unittest
+
+
+ENABLE_REMOTE_TEST = False
+REMOTE_USER = "user"
+REMOTE_HOSTS = ["machine1", "machine2", "machine3"]
+
+
+class TestBroadcast(unittest.TestCase):
+
+    def test_file_sha256(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        local_shell.write_file("temp/test.txt", "Test")
+        self.assertEqual(hashlib.sha256(b"Test\n").hexdigest(), local_shell.file_sha256("temp/test.txt"))
+        self.assertIsNone(local_shell.file_sha256("temp/does_not_exist.txt"))
+        local_shell.remove_recursive("temp")
+
+    def test_tree_levels(self):
+        self.assertEqual([], _broadcast_tree_levels(0, 2))
+        self.assertEqual([[(None, 0)]], _broadcast_tree_levels(1, 2))
+        self.assertEqual(
+            [[(None, 0)], [(0, 1), (0, 2)], [(1, 3), (1, 4), (2, 5), (2, 6)]],
+            _broadcast_tree_levels(7, 2)
+        )
+        self.assertEqual(
+            [[(None, 0)], [(0, 1), (0, 2), (0, 3)], [(1, 4), (1, 5)]],
+            _broadcast_tree_levels(6, 3)
+        )
+        self.assertEqual([[(None, 0)], [(0, 1)], [(1, 2)], [(2, 3)]], _broadcast_tree_levels(4, 1))
+
+        # Every host is reached exactly once
+        for num_hosts in range(50):
+            for branching_factor in range(1, 5):
+                children = []
+                for level in _broadcast_tree_levels(num_hosts, branching_factor):
+                    children += [child for _, child in level]
+                self.assertEqual(list(range(num_hosts)), sorted(children))
+
+    def test_invalid(self):
+        try:
+            broadcast_file("temp/test.txt", [], "test.txt", branching_factor=0)
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+
+        try:
+            broadcast_file("temp/test.txt", [LocalShell()], "test.txt")
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+
+    def test_simulated_broadcast(self):
+        local_shell = LocalShell()
+        local_shell.remove_force_recursive("temp")
+        local_shell.make_full_dir("temp")
+        local_shell.write_file("temp/test.txt", "Test")
+        hosts = ["machine%d" % i for i in range(7)]
+        remote_shells = [SimulatedRemoteShell("user", host, "temp/hosts") for host in hosts]
+
+        # Uploaded once, after which the hosts forward to each other
+        tracer = enable_shell_tracing()
+        try:
+            status = broadcast_file("temp/test.txt", remote_shells, "test.txt", branching_factor=2)
+        finally:
+            disable_shell_tracing()
+        self.assertEqual({"user@" + host: True for host in hosts}, status)
+        for host in hosts:
+            self.assertEqual("Test", local_shell.read_file("temp/hosts/%s/test.txt" % host).strip())
+        forwards = [
+            span for span in tracer.get_spans() if span["method"] == "exec" and "--copy-source" in span["command"]
+        ]
+        self.assertEqual(6, len(forwards))
+        self.assertEqual(
+            ["user@machine0", "user@machine0", "user@machine1", "user@machine1", "user@machine2", "user@machine2"],
+            sorted(span["host"] for span in forwards)
+        )
+
+        # Hosts which already hold the file are skipped
+        local_shell.write_file("temp/hosts/machine3/test.txt", "Other")
+        local_shell.remove("temp/hosts/machine5/test.txt")
+        status = broadcast_file("temp/test.txt", remote_shells, "test.txt", branching_factor=2)
+        self.assertEqual({"user@" + host: host in ["machine3", "machine5"] for host in hosts}, status)
+        for host in hosts:
+            self.assertEqual("Test", local_shell.read_file("temp/hosts/%s/test.txt" % host).strip())
+
+        # Different users on the same host are distinguished
+        remote_shells = [SimulatedRemoteShell(user, "machine0", "temp/hosts") for user in ["a", "b"]]
+        status = broadcast_file("temp/test.txt", remote_shells, "test.txt")
+        self.assertEqual({"a@machine0": False, "b@machine0": False}, status)
+
+        local_shell.remove_recursive("temp")
+
+    def test_simulated_broadcast_bandwidth(self):
+        local_shell = LocalShell()
+        local_shell.remove_force_recursive("temp")
+        local_shell.make_full_dir("temp")
+        with open("temp/test.bin", "wb+") as f_out:
+            f_out.write(b"x" * 20000)
+
+        # In a chain, each of the three copies takes at least 0.2s at 100 kB/s
+        remote_shells = [
+            SimulatedRemoteShell("user", "machine%d" % i, "temp/hosts", bandwidth_byte_per_s=100000)
+            for i in range(3)
+        ]
+        start = time.time()
+        broadcast_file("temp/test.bin", remote_shells, "test.bin", branching_factor=1)
+        self.assertTrue(time.time() - start >= 0.6)
+        for i in range(3):
+            with open("temp/hosts/machine%d/test.bin" % i, "rb") as f_in:
+                self.assertEqual(b"x" * 20000, f_in.read())
+
+        # Copies fail like the connection does
+        remote_shells = [SimulatedRemoteShell("user", "machine9", "temp/hosts", failure_rate=1.0)]
+        try:
+            broadcast_file("temp/test.bin", remote_shells, "test.bin")
+            self.fail()
+        except (FailedCommandError, InvalidCommandError):
+            self.assertTrue(True)
+
+        local_shell.remove_recursive("temp")
+
+    def test_remote_broadcast(self):
+        if ENABLE_REMOTE_TEST:
+            local_shell = LocalShell()
+            local_shell.make_full_dir("temp")
+            local_shell.write_file("temp/test.txt", "Test")
+            remote_shells = [RemoteShell(REMOTE_USER, host) for host in REMOTE_HOSTS]
+            for remote_shell in remote_shells:
+                remote_shell.remove_force("broadcast_test.txt")
+            status = broadcast_file("temp/test.txt", remote_shells, "broadcast_test.txt")
+            self.assertEqual({REMOTE_USER + "@" + host: True for host in REMOTE_HOSTS}, status)
+            status = broadcast_file("temp/test.txt", remote_shells, "broadcast_test.txt")
+            self.assertEqual({REMOTE_USER + "@" + host: False for host in REMOTE_HOSTS}, status)
+            for remote_shell in remote_shells:
+                self.assertEqual("Test", remote_shell.read_file("broadcast_test.txt").strip())
+                remote_shell.remove("broadcast_test.txt")
+            local_shell.remove_recursive("temp")
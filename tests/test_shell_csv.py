@@ -0,0 +1,189 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from exputil import *
+import random
+import unittest
+
+
+class TestShellCsv(unittest.TestCase):
+
+    def test_read_csv_in_columns(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+        local_shell.write_file("temp/test.csv", "0,a,10,-9.3\n1,abc ,-100000,30.24\n2,ghi,-1440000, -1294898294")
+
+        # Everything
+        self.assertEqual(
+            read_csv_direct_in_columns("temp/test.csv", "idx_int,string,int,float"),
+            local_shell.read_csv_in_columns("temp/test.csv", "idx_int,string,int,float")
+        )
+
+        # Projection and filtering
+        for compress in [True, False]:
+            data_columns = local_shell.read_csv_in_columns(
+                "temp/test.csv", "idx_int,string,int,float",
+                columns=[3, 0],
+                row_filters=[(2, ">=", -100000)],
+                compress=compress
+            )
+            self.assertEqual([[-9.3, 30.24], [0, 1]], data_columns)
+        self.assertEqual(
+            [["abc"]],
+            local_shell.read_csv_in_columns("temp/test.csv", "idx_int,string,int,float", columns=[1],
+                                            row_filters=[(1, "==", "abc")])
+        )
+        self.assertEqual(
+            [[2]],
+            local_shell.read_csv_in_columns("temp/test.csv", "idx_int,string,int,float", columns=[0],
+                                            row_filters=[(2, "<", 0), (3, "!=", 30.24), (0, ">", 0)])
+        )
+        self.assertEqual(
+            [[]],
+            local_shell.read_csv_in_columns("temp/test.csv", "idx_int,string,int,float", columns=[0],
+                                            row_filters=[(0, ">", 2)])
+        )
+
+        # String columns are compared as strings, even if they look like numbers
+        local_shell.write_file("temp/test.csv", "0,1.0\n1,1\n2, 1 \n3,01")
+        for compress in [True, False]:
+            self.assertEqual(
+                read_csv_direct_in_columns("temp/test.csv", "idx_int,string", row_filters=[(1, "==", "1")]),
+                local_shell.read_csv_in_columns("temp/test.csv", "idx_int,string", row_filters=[(1, "==", "1")],
+                                                compress=compress)
+            )
+        self.assertEqual(
+            [[1, 2], ["1", "1"]],
+            local_shell.read_csv_in_columns("temp/test.csv", "idx_int,string", row_filters=[(1, "==", "1")])
+        )
+        self.assertEqual(
+            [[3]],
+            local_shell.read_csv_in_columns("temp/test.csv", "idx_int,string", columns=[0],
+                                            row_filters=[(1, "<", "1")])
+        )
+
+        # Nullable columns
+        local_shell.write_file("temp/test.csv", "0,5,1\n1,,\n2,-7,01")
+        for row_filters in [[(1, ">=", -10)], [(1, "<", 6)], [(2, "==", "1")], [(2, "<", "1")], [(2, ">", "0")]]:
+            self.assertEqual(
+                read_csv_direct_in_columns("temp/test.csv", "idx_int,nullable_int,nullable_string", columns=[0],
+                                           row_filters=row_filters),
+                local_shell.read_csv_in_columns("temp/test.csv", "idx_int,nullable_int,nullable_string",
+                                                columns=[0], row_filters=row_filters)
+            )
+
+        # Only newlines separate lines
+        with open("temp/test.csv", "w+", newline="") as f_out:
+            f_out.write("0,a\x0cb,5\r\n1,c\rd,6\r\n2,e\u2028f,7\r\n")
+        for compress in [True, False]:
+            self.assertEqual(
+                [[5, 6, 7], [0, 1, 2]],
+                local_shell.read_csv_in_columns("temp/test.csv", "idx_int,string,int", columns=[2, 0],
+                                                compress=compress)
+            )
+            self.assertEqual(
+                [["a\x0cb", "c\rd", "e\u2028f"]],
+                local_shell.read_csv_in_columns("temp/test.csv", "idx_int,string,int", columns=[1],
+                                                compress=compress)
+            )
+
+        local_shell.remove_recursive("temp")
+
+    def test_read_csv_in_columns_simulated_remote(self):
+        local_shell = LocalShell()
+        local_shell.remove_force_recursive("temp")
+        remote_shell = SimulatedRemoteShell("user", "machine", "temp")
+
+        # Write a lot into the CSV file
+        random.seed(123456789)
+        values = [[], [], []]
+        with open("temp/machine/test.csv", "w+") as f_out:
+            for i in range(10000):
+                values[0].append(i)
+                values[1].append(random.randint(-99999, 999999))
+                values[2].append(random.random() * 10000000.0)
+                f_out.write("%d,%d,%s\n" % (values[0][i], values[1][i], str(values[2][i])))
+
+        data_columns = remote_shell.read_csv_in_columns(
+            "test.csv", "idx_int,int,pos_float", columns=[0, 2], row_filters=[(1, ">=", 0)]
+        )
+        passing_idxs = [i for i in range(10000) if values[1][i] >= 0]
+        self.assertEqual(passing_idxs, data_columns[0])
+        self.assertEqual([values[2][i] for i in passing_idxs], data_columns[1])
+
+        # Output of the connection on stderr (e.g., SSH warnings) is not an error
+        remote_shell.remote = [
+            "sh", "-c", "echo \"Warning: Permanently added 'machine' to the list of known hosts.\" >&2; exec \"$@\"",
+            "sh"
+        ] + remote_shell.remote
+        for compress in [True, False]:
+            self.assertEqual(
+                [passing_idxs],
+                remote_shell.read_csv_in_columns("test.csv", "idx_int,int,pos_float", columns=[0],
+                                                 row_filters=[(1, ">=", 0)], compress=compress)
+            )
+        try:
+            remote_shell.read_csv_in_columns("does_not_exist.csv", "idx_int,int,pos_float")
+            self.fail()
+        except FailedCommandError:
+            self.assertTrue(True)
+
+        local_shell.remove_recursive("temp")
+
+    def test_read_csv_in_columns_negative(self):
+        local_shell = LocalShell()
+        local_shell.make_full_dir("temp")
+
+        for content, line_values_format in [
+            ("1", "idx_int"),
+            ("0,-1", "idx_int,pos_int"),
+            ("0,-0.1", "int,pos_float"),
+            ("0,1", "int"),
+            ("0", "int,int"),
+            ("a", "int"),
+            ("0", "floatint"),
+        ]:
+            local_shell.write_file("temp/test.csv", content)
+            try:
+                local_shell.read_csv_in_columns("temp/test.csv", line_values_format)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        # Invalid arguments
+        local_shell.write_file("temp/test.csv", "0,1")
+        for kwargs in [{"columns": [2]}, {"row_filters": [(2, "==", 0)]}, {"row_filters": [(0, "=", 0)]}]:
+            try:
+                local_shell.read_csv_in_columns("temp/test.csv", "int,int", **kwargs)
+                self.fail()
+            except ValueError:
+                self.assertTrue(True)
+
+        # Non-existent file
+        for compress in [True, False]:
+            try:
+                local_shell.read_csv_in_columns("temp/does_not_exist.csv", "int", compress=compress)
+                self.fail()
+            except FailedCommandError:
+                self.assertTrue(True)
+
+        local_shell.remove_recursive("temp")
@@ -0,0 +1,93 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from exputil import *
+from exputil.shell import _parse_host_info
+import unittest
+
+
+ENABLE_REMOTE_TEST = False
+REMOTE_USER = "user"
+REMOTE_HOST = "machine"
+
+
+class TestHostInfo(unittest.TestCase):
+
+    def test_local_host_info(self):
+        local_shell = LocalShell()
+        info = local_shell.host_info()
+        self.assertTrue(info.num_cores >= 1)
+        self.assertEqual(3, len(info.load_avg))
+        self.assertTrue(info.mem_available_byte > 0)
+        self.assertTrue(info.disk_free_byte > 0)
+        self.assertTrue(info.num_screens >= 0)
+        self.assertIsNotNone(str(info))
+
+    def test_parse(self):
+        info = _parse_host_info(
+            "num_cores=8\nload_avg=0.50 1.25 2.00\nmem_available_kb=1000\ndisk_free_kb=2000\nnum_screens=3\n"
+        )
+        self.assertEqual(8, info.num_cores)
+        self.assertEqual((0.5, 1.25, 2.0), info.load_avg)
+        self.assertEqual(1024000, info.mem_available_byte)
+        self.assertEqual(2048000, info.disk_free_byte)
+        self.assertEqual(3, info.num_screens)
+
+        try:
+            _parse_host_info("num_cores=8\nload_avg=0.50 1.25 2.00\n")
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+
+        try:
+            _parse_host_info("num_cores=abc\nload_avg=0.50 1.25 2.00\nmem_available_kb=1\ndisk_free_kb=2\nnum_screens=3")
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+
+    def test_cache(self):
+        local_shell = LocalShell()
+        cache = HostInfoCache(ttl_s=3600)
+        infos = cache.get([local_shell, LocalShell()])
+        self.assertEqual(2, len(infos))
+        self.assertIs(infos[0], infos[1])
+        self.assertIs(infos[0], cache.get([local_shell])[0])
+        cache.invalidate()
+        self.assertIsNot(infos[0], cache.get([local_shell])[0])
+
+        # Zero time-to-live always retrieves anew
+        cache = HostInfoCache(ttl_s=0)
+        self.assertIsNot(cache.get([local_shell])[0], cache.get([local_shell])[0])
+
+        try:
+            HostInfoCache(ttl_s=-1)
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+
+    def test_remote_host_info(self):
+        if ENABLE_REMOTE_TEST:
+            remote_shell = RemoteShell(REMOTE_USER, REMOTE_HOST)
+            info = remote_shell.host_info()
+            self.assertTrue(info.num_cores >= 1)
+            cache = HostInfoCache()
+            self.assertEqual(2, len(cache.get([remote_shell, LocalShell()])))
@@ -0,0 +1,108 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from exputil import *
+import os
+import time
+import unittest
+
+
+class TestSimulator(unittest.TestCase):
+
+    def test_exec(self):
+        local_shell = LocalShell()
+        local_shell.remove_force_recursive("temp")
+        remote_shell = SimulatedRemoteShell("user", "machine1", "temp")
+        host_dir = os.path.abspath("temp/machine1")
+        self.assertTrue(os.path.isdir(host_dir))
+
+        # Commands run in the host directory
+        self.assertEqual(host_dir, remote_shell.perfect_exec("pwd").output.strip())
+        self.assertEqual(host_dir, remote_shell.perfect_exec("echo $HOME").output.strip())
+        self.assertEqual(3, remote_shell.exec("exit 3").return_code)
+        self.assertFalse(remote_shell.exec("illegal_command").return_code <= 100)
+
+        # Helper methods
+        remote_shell.write_file("test.txt", "Test")
+        self.assertTrue(local_shell.file_exists("temp/machine1/test.txt"))
+        self.assertEqual("Test", remote_shell.read_file("test.txt").strip())
+        self.assertFalse(SimulatedRemoteShell("user", "machine2", "temp").file_exists("test.txt"))
+
+        # Commands starting with a dash are passed on as-is
+        res = remote_shell.exec("--help")
+        self.assertEqual(local_shell.exec("--help").return_code, res.return_code)
+        self.assertNotIn("usage:", res.output)
+
+        # Asynchronous
+        res = remote_shell.exec("cat test.txt", sync=False)
+        out, err = res.process.communicate()
+        self.assertEqual("Test", out.decode("utf-8").strip())
+        self.assertEqual(0, res.process.returncode)
+
+        local_shell.remove_recursive("temp")
+
+    def test_latency_bandwidth_failure(self):
+        local_shell = LocalShell()
+        local_shell.remove_force_recursive("temp")
+
+        # Latency
+        start = time.time()
+        SimulatedRemoteShell("user", "machine1", "temp", latency_s=0.2).perfect_exec("exit 0")
+        self.assertTrue(time.time() - start >= 0.2)
+
+        # Bandwidth
+        start = time.time()
+        res = SimulatedRemoteShell("user", "machine1", "temp", bandwidth_byte_per_s=50000).perfect_exec(
+            "head -c 10000 /dev/zero"
+        )
+        self.assertEqual(10000, len(res.output))
+        self.assertTrue(time.time() - start >= 0.2)
+
+        # Failure
+        try:
+            SimulatedRemoteShell("user", "machine1", "temp", failure_rate=1.0).perfect_exec("exit 0")
+            self.assertTrue(False)
+        except InvalidCommandError as e:
+            self.assertEqual(255, e.sec.return_code)
+
+        # Invalid arguments
+        for kwargs in [{"latency_s": -1}, {"bandwidth_byte_per_s": 0}, {"failure_rate": 1.1}]:
+            try:
+                SimulatedRemoteShell("user", "machine1", "temp", **kwargs)
+                self.assertTrue(False)
+            except ValueError:
+                self.assertTrue(True)
+
+        local_shell.remove_recursive("temp")
+
+    def test_host_info_cache(self):
+        local_shell = LocalShell()
+        local_shell.remove_force_recursive("temp")
+        remote_shells = [SimulatedRemoteShell("user", "machine%d" % i, "temp", latency_s=0.2) for i in range(5)]
+
+        # Hosts are queried in parallel
+        start = time.time()
+        infos = HostInfoCache().get(remote_shells)
+        self.assertEqual(5, len(infos))
+        self.assertTrue(time.time() - start < 0.2 * 5)
+
+        local_shell.remove_recursive("temp")
@@ -0,0 +1,149 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from exputil import *
+import json
+import unittest
+
+
+class TestTracing(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(disable_shell_tracing())
+        LocalShell().exec("echo Hello")
+
+    def test_tracing(self):
+        local_shell = LocalShell()
+        tracer = enable_shell_tracing()
+        try:
+            local_shell.exec("echo Hello")
+            local_shell.make_full_dir("temp")
+            self.assertTrue(local_shell.path_exists("temp"))
+            try:
+                local_shell.perfect_exec("exit 1")
+                self.assertTrue(False)
+            except FailedCommandError:
+                self.assertTrue(True)
+            local_shell.remove_recursive("temp")
+        finally:
+            self.assertIs(tracer, disable_shell_tracing())
+
+        # Spans are recorded when the call finishes, so inner exec spans come first
+        spans = tracer.get_spans()
+        self.assertEqual(
+            ["exec", "exec", "perfect_exec", "make_full_dir", "exec", "valid_exec", "path_exists",
+             "exec", "perfect_exec", "exec", "perfect_exec", "remove_recursive"],
+            [span["method"] for span in spans]
+        )
+        self.assertEqual("localhost", spans[0]["host"])
+        self.assertEqual("echo Hello", spans[0]["command"])
+        self.assertEqual(0, spans[0]["result"])
+        self.assertEqual("temp", spans[3]["command"])
+        self.assertIsNone(spans[6]["result"])
+        self.assertEqual(1, spans[7]["result"])
+        self.assertEqual("FailedCommandError", spans[8]["result"])
+        for span in spans:
+            self.assertTrue(span["start_s"] <= span["end_s"])
+
+        # Nothing is recorded anymore after disabling
+        local_shell.exec("echo Hello")
+        self.assertEqual(len(spans), len(tracer.get_spans()))
+
+        # Export
+        local_shell.make_full_dir("temp")
+        tracer.export_json_lines("temp/trace.jsonl")
+        with open("temp/trace.jsonl", "r") as f_in:
+            lines = [json.loads(line) for line in f_in]
+        self.assertEqual(spans, lines)
+        tracer.export_chrome_trace("temp/trace.json")
+        with open("temp/trace.json", "r") as f_in:
+            trace = json.load(f_in)
+        self.assertEqual(1, len([e for e in trace["traceEvents"] if e["ph"] == "M"]))
+        self.assertEqual(len(spans), len([e for e in trace["traceEvents"] if e["ph"] == "X"]))
+        local_shell.remove_recursive("temp")
+
+        # Clear
+        tracer.clear()
+        self.assertEqual([], tracer.get_spans())
+
+    def test_buffer_limit(self):
+        tracer = enable_shell_tracing(ShellTracer(max_spans=2))
+        try:
+            local_shell = LocalShell()
+            local_shell.exec("echo 1")
+            local_shell.exec("echo 2")
+            local_shell.exec("echo 3")
+        finally:
+            disable_shell_tracing()
+        self.assertEqual(["echo 2", "echo 3"], [span["command"] for span in tracer.get_spans()])
+
+        # All helper methods are traced
+        tracer = enable_shell_tracing()
+        try:
+            local_shell = LocalShell()
+            local_shell.make_full_dir("temp/a")
+            self.assertEqual(["temp/a"], local_shell.get_direct_sub_dirs("temp"))
+            local_shell.remove_recursive("temp")
+        finally:
+            disable_shell_tracing()
+        spans = [span for span in tracer.get_spans() if span["method"] == "get_direct_sub_dirs"]
+        self.assertEqual(1, len(spans))
+        self.assertEqual("temp", spans[0]["command"])
+
+        # Long commands and arguments are truncated
+        tracer = enable_shell_tracing(ShellTracer(max_command_length=20))
+        try:
+            local_shell = LocalShell()
+            local_shell.make_full_dir("temp")
+            local_shell.write_file("temp/test.txt", "a" * 100000)
+            local_shell.exec("echo " + "b" * 100, output_redirect=OutputRedirect.SILENT)
+        finally:
+            disable_shell_tracing()
+        self.assertEqual(100001, len(local_shell.read_file("temp/test.txt")))
+        local_shell.remove_recursive("temp")
+        spans = tracer.get_spans()
+        self.assertEqual(["exec", "perfect_exec", "write_file", "exec"], [span["method"] for span in spans[-4:]])
+        for span in spans:
+            self.assertTrue(len(span["command"]) <= 20 + len("...[+100000]"))
+        self.assertEqual("temp/test.txt aaaaaa...[+15]", spans[-2]["command"])
+        self.assertEqual("echo " + "b" * 15 + "...[+85]", spans[-1]["command"])
+        self.assertTrue(tracer.num_bytes < 10000)
+
+        # Memory limit
+        tracer = enable_shell_tracing(ShellTracer(max_bytes=ShellTracer.SPAN_OVERHEAD_BYTE * 2 + 100))
+        try:
+            local_shell = LocalShell()
+            for i in range(5):
+                local_shell.exec("echo %d" % i)
+        finally:
+            disable_shell_tracing()
+        self.assertEqual(["echo 3", "echo 4"], [span["command"] for span in tracer.get_spans()])
+        self.assertTrue(tracer.num_bytes <= tracer.max_bytes)
+        tracer.clear()
+        self.assertEqual(0, tracer.num_bytes)
+
+        for kwargs in [{"max_spans": 0}, {"max_bytes": 0}, {"max_command_length": -1}]:
+            try:
+                ShellTracer(**kwargs)
+                self.assertTrue(False)
+            except ValueError:
+                self.assertTrue(True)
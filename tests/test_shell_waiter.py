@@ -0,0 +1,84 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from exputil import *
+import time
+import unittest
+
+
+class TestWaiter(unittest.TestCase):
+
+    def test_wait_all(self):
+        local_shell = LocalShell()
+        results = [
+            local_shell.exec("sleep %.1f; echo %d; echo error >&2; exit %d" % (0.1 * i, i, i), sync=False)
+            for i in range(5)
+        ]
+        waiter = ShellExecWaiter(results)
+        self.assertEqual(5, len(waiter.pending()))
+        finished = waiter.wait_all()
+        self.assertEqual(5, len(finished))
+        self.assertEqual([], waiter.pending())
+        for i in range(5):
+            self.assertEqual(i, results[i].return_code)
+            self.assertEqual("%d\nerror\n" % i, results[i].output)
+
+        # Nothing left to wait for
+        self.assertEqual([], waiter.wait_all())
+        self.assertEqual([], waiter.wait_any())
+
+    def test_wait_any_and_timeout(self):
+        local_shell = LocalShell()
+        fast = local_shell.exec("echo fast", sync=False)
+        slow = local_shell.exec("sleep 0.5", sync=False, output_redirect=OutputRedirect.SILENT)
+        waiter = ShellExecWaiter([fast, slow])
+        self.assertEqual([fast], waiter.wait_any())
+        self.assertEqual("fast\n", fast.output)
+
+        # Timeout
+        start = time.time()
+        self.assertEqual([], waiter.wait_all(timeout_s=0.1))
+        self.assertTrue(time.time() - start < 0.4)
+        self.assertEqual([slow], waiter.pending())
+        self.assertEqual(-1, slow.return_code)
+
+        # Remainder
+        self.assertEqual([slow], waiter.wait_any())
+        self.assertEqual(0, slow.return_code)
+
+    def test_large_output(self):
+        local_shell = LocalShell()
+        results = [local_shell.exec("head -c 1000000 /dev/zero", sync=False) for _ in range(3)]
+        waiter = ShellExecWaiter()
+        for res in results:
+            waiter.add(res)
+        waiter.wait_all()
+        for res in results:
+            self.assertEqual(0, res.return_code)
+            self.assertEqual(1000000, len(res.output))
+
+    def test_invalid(self):
+        try:
+            ShellExecWaiter([LocalShell().exec("echo Hello")])
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
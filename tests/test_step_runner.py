@@ -0,0 +1,135 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2019 snkas
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from exputil import *
+import unittest
+
+
+class TestStepRunner(unittest.TestCase):
+
+    def test_skip_and_rerun(self):
+        local_shell = LocalShell()
+        local_shell.remove_force_recursive("temp")
+        local_shell.make_full_dir("temp/in")
+        local_shell.write_file("temp/in/a.txt", "A")
+        local_shell.write_file("temp/b.txt", "B")
+
+        counter = [0]
+
+        def action(shell):
+            counter[0] += 1
+            shell.perfect_exec("cat temp/in/a.txt temp/b.txt > temp/out.txt")
+
+        def run(runner, parameters):
+            return runner.run("concat", action, input_paths=["temp/in", "temp/b.txt"],
+                              parameters=parameters, output_paths=["temp/out.txt"])
+
+        # First run, then skipped
+        runner = StepRunner(local_shell, "temp/manifest.json")
+        self.assertTrue(run(runner, {"x": 1}))
+        self.assertFalse(run(runner, {"x": 1}))
+        self.assertEqual(1, counter[0])
+
+        # Manifest is persisted
+        runner = StepRunner(local_shell, "temp/manifest.json")
+        self.assertFalse(run(runner, {"x": 1}))
+        self.assertEqual(1, counter[0])
+
+        # Changed parameters
+        self.assertTrue(run(runner, {"x": 2}))
+        self.assertEqual(2, counter[0])
+
+        # Changed input file in directory
+        local_shell.write_file("temp/in/a.txt", "A2")
+        self.assertTrue(run(runner, {"x": 2}))
+        self.assertFalse(run(runner, {"x": 2}))
+        self.assertEqual(3, counter[0])
+
+        # Missing output
+        local_shell.remove("temp/out.txt")
+        self.assertTrue(run(runner, {"x": 2}))
+        self.assertEqual(4, counter[0])
+        self.assertEqual("A2\nB", local_shell.read_file("temp/out.txt").strip())
+
+        # Invalidation
+        runner.invalidate("concat")
+        self.assertTrue(run(runner, {"x": 2}))
+        runner.invalidate()
+        self.assertTrue(run(runner, {"x": 2}))
+        self.assertEqual(6, counter[0])
+
+        local_shell.remove_recursive("temp")
+
+    def test_command_and_failure(self):
+        local_shell = LocalShell()
+        local_shell.remove_force_recursive("temp")
+        local_shell.make_full_dir("temp")
+        runner = StepRunner(local_shell, "temp/manifest.json")
+
+        # Command string action
+        self.assertTrue(runner.run("touch", "touch temp/touched.txt", output_paths=["temp/touched.txt"]))
+        self.assertFalse(runner.run("touch", "touch temp/touched.txt", output_paths=["temp/touched.txt"]))
+        self.assertTrue(runner.is_done("touch", output_paths=["temp/touched.txt"], action="touch temp/touched.txt"))
+
+        # Changed command string
+        self.assertTrue(runner.run("touch", "touch temp/touched.txt temp/other.txt",
+                                   output_paths=["temp/touched.txt"]))
+        self.assertTrue(local_shell.file_exists("temp/other.txt"))
+        self.assertFalse(runner.run("touch", "touch temp/touched.txt temp/other.txt",
+                                    output_paths=["temp/touched.txt"]))
+        self.assertTrue(runner.run("touch", "touch temp/touched.txt", output_paths=["temp/touched.txt"]))
+
+        # Input modified while the step runs: the step is not recorded as done
+        local_shell.write_file("temp/input.txt", "A")
+
+        def modify_input(shell):
+            shell.write_file("temp/input.txt", "B")
+
+        self.assertTrue(runner.run("modify", modify_input, input_paths=["temp/input.txt"]))
+        self.assertFalse(runner.is_done("modify", input_paths=["temp/input.txt"]))
+        self.assertTrue(runner.run("modify", modify_input, input_paths=["temp/input.txt"]))
+        self.assertTrue(runner.run("modify", "echo B > temp/input.txt", input_paths=["temp/input.txt"]))
+        self.assertFalse(runner.run("modify", "echo B > temp/input.txt", input_paths=["temp/input.txt"]))
+
+        # Failed step is not recorded
+        try:
+            runner.run("fail", "exit 1")
+            self.assertTrue(False)
+        except FailedCommandError:
+            self.assertTrue(True)
+        self.assertFalse(runner.is_done("fail"))
+
+        # Non-existent input
+        try:
+            runner.run("missing", "exit 0", input_paths=["temp/does_not_exist.txt"])
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+
+        # Invalid shell
+        try:
+            StepRunner("not a shell", "temp/manifest.json")
+            self.assertTrue(False)
+        except ValueError:
+            self.assertTrue(True)
+
+        local_shell.remove_recursive("temp")